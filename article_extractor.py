@@ -0,0 +1,82 @@
+# article_extractor.py
+import io
+import logging
+import threading
+import urllib.parse
+from collections import OrderedDict
+from bs4 import BeautifulSoup
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Сколько байт статьи читать максимум
+MAX_ARTICLE_BYTES = 512 * 1024
+# Абзацы короче этого обычно подписи, меню и т.п.
+MIN_PARAGRAPH_LENGTH = 60
+
+IMAGE_META = ('og:image', 'twitter:image')
+
+def strip_html(text):
+    """Убирает HTML-разметку из фрагмента (описания в RSS)"""
+    if not text or '<' not in text:
+        return (text or '').strip()
+    return BeautifulSoup(text, 'lxml').get_text(' ', strip=True)
+
+def extract_article(data, base_url, max_chars=600):
+    """Основной текст и главное изображение страницы.
+
+    Страница не строится в полное дерево: iterparse отдает только <meta>
+    и <p>, разобранные элементы сразу очищаются, а разбор прекращается,
+    как только набран текст нужной длины.
+    """
+    image_url = None
+    paragraphs = []
+    length = 0
+    
+    events = etree.iterparse(
+        io.BytesIO(data), events=('end',), tag=('meta', 'p'),
+        html=True, recover=True, no_network=True
+    )
+    for _, element in events:
+        if element.tag == 'meta':
+            key = element.get('property') or element.get('name')
+            if not image_url and key in IMAGE_META and element.get('content'):
+                image_url = urllib.parse.urljoin(base_url, element.get('content'))
+        else:
+            text = ' '.join(''.join(element.itertext()).split())
+            if len(text) >= MIN_PARAGRAPH_LENGTH:
+                paragraphs.append(text)
+                length += len(text)
+        element.clear()
+        if length >= max_chars:
+            break
+    
+    text = '\n\n'.join(paragraphs)
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(' ', 1)[0] + '...'
+    return text, image_url
+
+class ArticleExtractor:
+    """Извлечение статей с LRU-кэшем по URL"""
+
+    def __init__(self, cache_size=512, max_chars=600):
+        self.cache_size = cache_size
+        self.max_chars = max_chars
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, url, download):
+        """Возвращает (текст, изображение) статьи; download(url) -> bytes"""
+        with self.lock:
+            if url in self.cache:
+                self.cache.move_to_end(url)
+                return self.cache[url]
+        
+        data = download(url)
+        result = extract_article(data, url, self.max_chars) if data else ('', None)
+        
+        with self.lock:
+            self.cache[url] = result
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
@@ -0,0 +1,258 @@
+# benchmarks/fake_telegram.py
+"""Локальный заменитель Telegram Bot API для нагрузочного тестирования.
+
+Бот направляется на сервер через TELEGRAM_API_URL=http://127.0.0.1:8081.
+Можно добавить задержку ответов, долю ответов 429 с retry_after и долю ошибок.
+
+    python -m benchmarks.fake_telegram --port 8081 --latency 0.05 --rate-429 0.01
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeTelegramState:
+    """Очередь обновлений, счетчики вызовов и настройки отказов"""
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_429=0.0, retry_after=1, failure_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.failure_rate = failure_rate
+        
+        self.updates = []
+        self.next_update_id = 1
+        self.next_message_id = 1
+        self.condition = threading.Condition()
+        
+        self.calls = {}
+        self.errors = {}
+        # (время, метод, chat_id, параметры) каждого успешного вызова
+        self.sent = []
+        self.listeners = []
+
+    def push_update(self, update):
+        """Добавляет обновление в очередь getUpdates; возвращает update_id"""
+        with self.condition:
+            update = dict(update, update_id=self.next_update_id)
+            self.next_update_id += 1
+            self.updates.append(update)
+            self.condition.notify_all()
+            return update['update_id']
+
+    def get_updates(self, offset=0, limit=100, timeout=0):
+        with self.condition:
+            deadline = time.monotonic() + timeout
+            while True:
+                # Подтвержденные обновления удаляются, как в настоящем API
+                self.updates = [u for u in self.updates if u['update_id'] >= offset]
+                if self.updates:
+                    return self.updates[:limit]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self.condition.wait(remaining)
+
+    def count(self, table, method):
+        with self.condition:
+            table[method] = table.get(method, 0) + 1
+
+    def record(self, method, params):
+        chat_id = params.get('chat_id')
+        with self.condition:
+            self.sent.append((time.monotonic(), method, chat_id, params))
+            message_id = self.next_message_id
+            self.next_message_id += 1
+        self.notify(method, chat_id, params, True)
+        return message_id
+
+    def record_error(self, method, params):
+        self.count(self.errors, method)
+        self.notify(method, params.get('chat_id'), params, False)
+
+    def notify(self, method, chat_id, params, ok):
+        for listener in list(self.listeners):
+            listener(method, chat_id, params, ok)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'calls': dict(self.calls),
+                'errors': dict(self.errors),
+                'pending_updates': len(self.updates),
+            }
+
+def message_result(message_id, chat_id, text=None):
+    """Объект Message в формате Bot API"""
+    try:
+        chat_id = int(chat_id)
+    except (TypeError, ValueError):
+        pass
+    result = {
+        'message_id': message_id,
+        'date': int(time.time()),
+        'chat': {'id': chat_id, 'type': 'private' if isinstance(chat_id, int) and chat_id > 0 else 'channel'},
+        'from': {'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot'},
+    }
+    if text is not None:
+        result['text'] = text
+    return result
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_api()
+
+    def do_POST(self):
+        self.handle_api()
+
+    def read_params(self):
+        parsed = urllib.parse.urlparse(self.path)
+        params = {key: values[-1] for key, values in urllib.parse.parse_qs(parsed.query).items()}
+        
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        content_type = self.headers.get('Content-Type', '')
+        if body and content_type.startswith('application/json'):
+            params.update(json.loads(body))
+        elif body and content_type.startswith('application/x-www-form-urlencoded'):
+            params.update({k: v[-1] for k, v in urllib.parse.parse_qs(body.decode()).items()})
+        elif body:
+            # multipart с файлом: содержимое не разбираем, важен только размер
+            params['_upload_bytes'] = len(body)
+        return parsed.path, params
+
+    def respond(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_api(self):
+        state = self.state
+        path, params = self.read_params()
+        
+        if path == '/stats':
+            return self.respond(200, state.stats())
+        
+        parts = path.strip('/').split('/')
+        if len(parts) != 2 or not parts[0].startswith('bot'):
+            return self.respond(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+        method = parts[1]
+        state.count(state.calls, method)
+        
+        if method == 'getUpdates':
+            updates = state.get_updates(
+                offset=int(params.get('offset', 0)),
+                limit=int(params.get('limit', 100)),
+                timeout=float(params.get('timeout', 0)),
+            )
+            return self.respond(200, {'ok': True, 'result': updates})
+        
+        if state.latency or state.jitter:
+            time.sleep(state.latency + random.random() * state.jitter)
+        
+        if random.random() < state.rate_429:
+            state.record_error(method, params)
+            return self.respond(429, {
+                'ok': False, 'error_code': 429,
+                'description': f"Too Many Requests: retry after {state.retry_after}",
+                'parameters': {'retry_after': state.retry_after},
+            })
+        if random.random() < state.failure_rate:
+            state.record_error(method, params)
+            return self.respond(500, {'ok': False, 'error_code': 500, 'description': 'Internal Server Error'})
+        
+        handler = METHODS.get(method)
+        if handler is None:
+            return self.respond(400, {'ok': False, 'error_code': 400, 'description': f"Bad Request: method {method} not supported"})
+        return self.respond(200, {'ok': True, 'result': handler(state, params)})
+
+def send_message(state, params):
+    message_id = state.record('sendMessage', params)
+    return message_result(message_id, params.get('chat_id'), params.get('text'))
+
+def send_photo(state, params):
+    message_id = state.record('sendPhoto', params)
+    result = message_result(message_id, params.get('chat_id'))
+    result['photo'] = [{'file_id': f"photo-{message_id}", 'file_unique_id': f"u{message_id}", 'width': 500, 'height': 500}]
+    if params.get('caption'):
+        result['caption'] = params['caption']
+    return result
+
+def send_media_group(state, params):
+    media = json.loads(params.get('media', '[]'))
+    messages = []
+    for _ in media:
+        message_id = state.record('sendMediaGroup', params)
+        messages.append(message_result(message_id, params.get('chat_id')))
+    return messages
+
+def edit_message_text(state, params):
+    state.record('editMessageText', params)
+    return message_result(int(params.get('message_id', 0)), params.get('chat_id'), params.get('text'))
+
+def answer_callback_query(state, params):
+    state.record('answerCallbackQuery', params)
+    return True
+
+def get_me(state, params):
+    return {'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot'}
+
+def delete_webhook(state, params):
+    return True
+
+METHODS = {
+    'getMe': get_me,
+    'deleteWebhook': delete_webhook,
+    'sendMessage': send_message,
+    'sendPhoto': send_photo,
+    'sendMediaGroup': send_media_group,
+    'editMessageText': edit_message_text,
+    'answerCallbackQuery': answer_callback_query,
+}
+
+def start_server(state, host='127.0.0.1', port=0):
+    """Запускает сервер в фоновом потоке; возвращает (server, базовый URL)"""
+    handler = type('Handler', (FakeTelegramHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Локальный заменитель Telegram Bot API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help='задержка ответа, с')
+    parser.add_argument('--jitter', type=float, default=0.0, help='случайная добавка к задержке, с')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='доля ответов 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='доля ответов 500')
+    args = parser.parse_args()
+    
+    state = FakeTelegramState(
+        latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+        retry_after=args.retry_after, failure_rate=args.failure_rate,
+    )
+    server, url = start_server(state, args.host, args.port)
+    print(f"Fake Bot API: {url} (TELEGRAM_API_URL={url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+# benchmarks/fakes.py
+import base64
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+
+from dedup import FingerprintSet, content_fingerprint
+from http_cassette import CassetteSession
+
+class FakeDatabase:
+    """Заменитель DatabaseManager в памяти для бенчмарков"""
+
+    def __init__(self, rows=0, pending_posts=0):
+        titles = (f"Архивный заголовок {i}" for i in range(rows))
+        self.fingerprints = sorted(content_fingerprint(title) for title in titles)
+        self.titles = set()
+        self.cursors = {}
+        self.candidates = []
+        self.crawl_runs = {}
+        self.deliveries = {}
+        # Все посты уже просрочены (с запасом на часовой пояс бота)
+        past = datetime.now() - timedelta(days=1)
+        self.posts = [
+            (i, f"Запланированный пост {i}", past - timedelta(minutes=pending_posts - i), None, None)
+            for i in range(1, pending_posts + 1)
+        ]
+        self.published = set()
+        self.failed = set()
+        self.queries = 0
+
+    def iter_content_fingerprints(self, chunk_size=10000):
+        self.queries += 1
+        return iter(self.fingerprints)
+
+    def get_all_content_hashes(self):
+        return FingerprintSet().load(self.iter_content_fingerprints())
+
+    def get_max_content_id(self):
+        return len(self.fingerprints)
+
+    def get_fingerprints_since(self, last_id):
+        return []
+
+    def has_similar_title(self, title_fragment):
+        self.queries += 1
+        return title_fragment in self.titles
+
+    def get_source_cursor(self, source):
+        return self.cursors.get(source)
+
+    def save_source_cursor(self, source, last_guid, last_published):
+        self.cursors[source] = (last_guid, last_published)
+
+    def get_content_candidates(self):
+        return list(self.candidates)
+
+    def replace_content_candidates(self, candidates):
+        self.candidates = [payload for fingerprint, payload, score in candidates]
+        return True
+
+    def get_crawl_runs(self):
+        return dict(self.crawl_runs)
+
+    def save_crawl_run(self, source, last_run, next_run):
+        self.crawl_runs[source] = (last_run, next_run)
+
+    def get_channels(self):
+        return []
+
+    def get_finished_deliveries(self, ref, max_attempts):
+        return {chat_id: status for (delivered_ref, chat_id), (status, attempts) in self.deliveries.items()
+                if delivered_ref == ref and (status == 'sent' or attempts >= max_attempts)}
+
+    def save_deliveries(self, ref, statuses):
+        for chat_id, status, error in statuses:
+            attempts = self.deliveries.get((ref, chat_id), (None, 0))[1]
+            self.deliveries[ref, chat_id] = (status, attempts + 1)
+
+    def get_pending_posts(self):
+        self.queries += 1
+        return [post for post in self.posts if post[0] not in self.published and post[0] not in self.failed]
+
+    def mark_as_published(self, post_id):
+        self.queries += 1
+        self.published.add(post_id)
+
+    def reschedule_post(self, post_id, next_time, published=True):
+        self.queries += 1
+
+    def mark_post_failed(self, post_id):
+        self.queries += 1
+        self.failed.add(post_id)
+
+class FakeMessage:
+    def __init__(self, message_id, chat_id):
+        self.message_id = message_id
+        self.chat = type('Chat', (), {'id': chat_id})()
+
+class FakeBot:
+    """Заменитель telebot.TeleBot: считает вызовы API, опционально с задержкой"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.next_id = 0
+
+    def _call(self, method, chat_id=None):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.next_id += 1
+            return FakeMessage(self.next_id, chat_id)
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self._call('sendMessage', chat_id)
+
+    def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        return self._call('sendPhoto', chat_id)
+
+    def send_media_group(self, chat_id, media, **kwargs):
+        return [self._call('sendMediaGroup', chat_id)]
+
+    def edit_message_text(self, text=None, chat_id=None, message_id=None, **kwargs):
+        return self._call('editMessageText', chat_id)
+
+    def answer_callback_query(self, callback_query_id, text=None, **kwargs):
+        return self._call('answerCallbackQuery')
+
+    def reply_to(self, message, text, **kwargs):
+        return self._call('sendMessage', message.chat.id)
+
+def build_rss(name, entries, keyword_every=3):
+    """RSS-документ с entries записями; каждая keyword_every-я релевантна"""
+    now = datetime.now().astimezone()
+    items = []
+    for i in range(entries):
+        word = 'Первое открытие' if i % keyword_every == 0 else 'Обычная новость'
+        published = format_datetime(now - timedelta(minutes=i))
+        items.append(
+            f"<item><title>{word} {name} #{i}</title>"
+            f"<link>https://{name}.example/news/{i}</link>"
+            f"<guid>{name}-{i}</guid>"
+            f"<pubDate>{published}</pubDate>"
+            f"<description><![CDATA[<p>Ученые сообщили о научном результате {i}. "
+            f"Разработана новая технология.</p>]]></description></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{name}</title>" + ''.join(items) + '</channel></rss>'
+    ).encode('utf-8')
+
+def write_cassette(directory, url, body, content_type='application/rss+xml; charset=utf-8', params=None):
+    """Кладет в кассету ответ на GET url"""
+    session = CassetteSession('replay', directory)
+    entry = {
+        'method': 'GET',
+        'url': url,
+        'params': params,
+        'status_code': 200,
+        'headers': {'Content-Type': content_type},
+        'body': base64.b64encode(body).decode('ascii'),
+    }
+    with open(session.path_for('GET', url, params), 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
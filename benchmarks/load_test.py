@@ -0,0 +1,159 @@
+# benchmarks/load_test.py
+"""Нагрузочный тест публикации через локальный заменитель Bot API.
+
+Поднимает benchmarks.fake_telegram, направляет на него бота, заваливает его
+обновлениями и очередью запланированных постов и выводит перцентили задержек.
+
+    python -m benchmarks.load_test --updates 500 --posts 1000 --latency 0.02 --rate-429 0.01
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from benchmarks.fake_telegram import FakeTelegramState, start_server
+from benchmarks.fakes import FakeDatabase
+from fanout import FanoutPublisher
+
+def percentiles(values):
+    """p50/p95/p99/max в миллисекундах"""
+    if not values:
+        return {}
+    values = sorted(values)
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+    return {'count': len(values), 'p50_ms': pick(0.50), 'p95_ms': pick(0.95),
+            'p99_ms': pick(0.99), 'max_ms': round(values[-1] * 1000, 2)}
+
+def run_updates(bot_module, state, count, wait):
+    """Время от появления обновления до ответа бота в тот же чат"""
+    injected = {}
+    replied = {}
+    failed = set()
+    done = threading.Event()
+    
+    def on_send(method, chat_id, params, ok):
+        chat_id = int(chat_id) if chat_id is not None else None
+        if chat_id not in injected or chat_id in replied or chat_id in failed:
+            return
+        if ok:
+            replied[chat_id] = time.monotonic()
+        else:
+            failed.add(chat_id)
+        if len(replied) + len(failed) == count:
+            done.set()
+    state.listeners.append(on_send)
+    
+    polling = threading.Thread(
+        target=bot_module.bot.polling,
+        kwargs={'none_stop': True, 'interval': 0, 'timeout': 5},
+        daemon=True,
+    )
+    polling.start()
+    
+    started = time.monotonic()
+    for i in range(count):
+        chat_id = 1_000_000 + i
+        injected[chat_id] = time.monotonic()
+        state.push_update({'message': {
+            'message_id': i + 1,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Load'},
+            'text': '/start',
+        }})
+    done.wait(wait)
+    elapsed = time.monotonic() - started
+    
+    bot_module.bot.stop_polling()
+    state.listeners.remove(on_send)
+    
+    latencies = [replied[chat_id] - injected[chat_id] for chat_id in replied]
+    return {
+        'name': 'updates_round_trip',
+        'updates': count,
+        'answered': len(replied),
+        'failed': len(failed),
+        'seconds': round(elapsed, 3),
+        'latency': percentiles(latencies),
+    }
+
+def run_scheduled(bot_module, count):
+    """Публикация очереди запланированных постов: задержки вызовов sendMessage"""
+    fake_db = FakeDatabase(pending_posts=count)
+    bot_module.db = fake_db
+    # Лимиты Telegram на канал и на бота не нужны: измеряется сам путь публикации
+    bot_module.fanout = FanoutPublisher(global_rate=0, channel_rate=0)
+    
+    latencies = []
+    send_message = bot_module.bot.send_message
+    def timed_send(*args, **kwargs):
+        started = time.monotonic()
+        try:
+            return send_message(*args, **kwargs)
+        finally:
+            latencies.append(time.monotonic() - started)
+    bot_module.bot.send_message = timed_send
+    
+    started = time.monotonic()
+    try:
+        bot_module.publish_scheduled_posts()
+    finally:
+        bot_module.bot.send_message = send_message
+    elapsed = time.monotonic() - started
+    
+    return {
+        'name': 'publish_scheduled_posts',
+        'posts': count,
+        'published': len(fake_db.published),
+        'failed': count - len(fake_db.published),
+        'seconds': round(elapsed, 3),
+        'posts_per_second': round(len(fake_db.published) / elapsed, 1) if elapsed else None,
+        'latency': percentiles(latencies),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест публикации')
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--wait', type=float, default=60.0, help='сколько ждать ответов на обновления, с')
+    parser.add_argument('--output', help='файл для JSON с результатами (по умолчанию stdout)')
+    args = parser.parse_args()
+    
+    logging.disable(logging.CRITICAL)
+    
+    state = FakeTelegramState(
+        latency=args.latency, jitter=args.jitter,
+        rate_429=args.rate_429, failure_rate=args.failure_rate,
+    )
+    server, url = start_server(state)
+    
+    # bot.py читает настройки при импорте
+    os.environ['TELEGRAM_API_URL'] = url
+    os.environ.setdefault('BOT_TOKEN', '123456:loadtest')
+    os.environ.setdefault('CHANNEL_ID', '-1001')
+    import bot as bot_module
+    
+    results = [
+        run_updates(bot_module, state, args.updates, args.wait),
+        run_scheduled(bot_module, args.posts),
+    ]
+    report = {'server': state.stats(), 'results': results}
+    server.shutdown()
+    
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    sys.exit(main())
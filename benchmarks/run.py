@@ -0,0 +1,154 @@
+# benchmarks/run.py
+"""Бенчмарки конвейера контента и планировщика без сети и PostgreSQL.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --quick
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# bot.py читает токен при импорте; для бенчмарков подойдет любой корректный
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ.pop('HTTP_CASSETTE_MODE', None)
+
+from benchmarks.fakes import FakeBot, FakeDatabase, build_rss, write_cassette
+from dedup import FingerprintSet, content_fingerprint
+from fanout import FanoutPublisher
+from http_cassette import CassetteSession
+from sources import Source
+
+def measure(func, repeat):
+    """Время выполнения func() (секунды) за repeat повторов"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def result(name, params, timings, operations=1, **extra):
+    best = min(timings)
+    return {
+        'name': name,
+        'params': params,
+        'min_seconds': round(best, 6),
+        'median_seconds': round(statistics.median(timings), 6),
+        'ops_per_second': round(operations / best, 1) if best else None,
+        **extra,
+    }
+
+def bench_search_content(repeat, sources_count=3, entries=200):
+    """ContentFinder.search_content от начала до конца на записанных лентах"""
+    from content_finder import ContentFinder
+    
+    with tempfile.TemporaryDirectory() as directory:
+        sources = []
+        for i in range(sources_count):
+            name = f"feed{i}"
+            url = f"https://{name}.example/rss"
+            write_cassette(directory, url, build_rss(name, entries))
+            sources.append({'name': name, 'type': 'rss', 'url': url,
+                            'category': 'science', 'max_entries': entries})
+        
+        def run():
+            session = CassetteSession('replay', directory)
+            finder = ContentFinder(
+                db_manager=FakeDatabase(),
+                sources=[Source(**config) for config in sources],
+                session=session,
+            )
+            finder.search_content(max_posts=10, force=True)
+        
+        timings = measure(run, repeat)
+    return result('search_content', {'sources': sources_count, 'entries': entries}, timings)
+
+def bench_dedup(rows, lookups=100000):
+    """Загрузка отпечатков и проверка дубликатов при rows записях в found_content"""
+    db = FakeDatabase(rows=rows)
+    
+    started = time.perf_counter()
+    hashes = FingerprintSet().load(db.iter_content_fingerprints())
+    load_seconds = time.perf_counter() - started
+    
+    probes = [content_fingerprint(f"Новый заголовок {i}") for i in range(lookups)]
+    timings = measure(lambda: sum(1 for probe in probes if probe in hashes), 3)
+    
+    return result(
+        'dedup_lookup', {'rows': rows, 'lookups': lookups}, timings, operations=lookups,
+        load_seconds=round(load_seconds, 6),
+        memory_bytes=hashes.memory_bytes(),
+    )
+
+def bench_publish_scheduled(backlog):
+    """publish_scheduled_posts на очереди из backlog просроченных постов"""
+    import bot as bot_module
+    
+    timings = []
+    for _ in range(3):
+        fake_bot = FakeBot()
+        bot_module.db = FakeDatabase(pending_posts=backlog)
+        bot_module.bot = fake_bot
+        bot_module.fanout = FanoutPublisher(global_rate=0, channel_rate=0)
+        timings.extend(measure(bot_module.publish_scheduled_posts, 1))
+        assert fake_bot.calls.get('sendMessage') == backlog
+    return result('publish_scheduled_posts', {'backlog': backlog}, timings, operations=backlog)
+
+def bench_preview(count):
+    """Пропускная способность format_for_preview"""
+    from content_finder import ContentFinder
+    
+    finder = ContentFinder(sources=[], session=CassetteSession('replay', tempfile.gettempdir()))
+    contents = [
+        {'title': f"Заголовок {i}", 'summary': finder.format_science_post(f"Заголовок {i}", 'Текст ' * 50),
+         'image_url': 'https://example.com/image.jpg'}
+        for i in range(count)
+    ]
+    timings = measure(lambda: [finder.format_for_preview(content) for content in contents], 5)
+    return result('format_for_preview', {'count': count}, timings, operations=count)
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки бота')
+    parser.add_argument('--output', help='файл для JSON с результатами (по умолчанию stdout)')
+    parser.add_argument('--quick', action='store_true', help='без прогона на 1M записей')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+    
+    rows_sizes = [10_000, 100_000] if args.quick else [10_000, 100_000, 1_000_000]
+    results = [bench_search_content(repeat=5)]
+    results += [bench_dedup(rows) for rows in rows_sizes]
+    results += [bench_publish_scheduled(backlog) for backlog in (1_000, 10_000)]
+    results.append(bench_preview(10_000))
+    
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,14 +4,29 @@ import threading
 import time
 import re
 import requests
-import io
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
-from PIL import Image
+
+# Отсчет времени запуска: сюда входит и импорт модулей ниже
+STARTUP_STARTED = time.perf_counter()
+
 import telebot
 from dotenv import load_dotenv
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from dedup import FingerprintSet, content_fingerprint
+from fanout import FanoutPublisher, retry_after
+from lazy_bot import LazyBot
+from metrics import (
+    DB_QUERY_ERRORS, IMAGE_DOWNLOAD_BYTES, IMAGE_DOWNLOAD_SECONDS, QUEUE_DEPTH, SCHEDULER_LAG_SECONDS,
+    STARTUP_SECONDS, TELEGRAM_CALL_ERRORS, TELEGRAM_CALL_SECONDS, instrument_methods, start_metrics_server
+)
+from migrations import LATEST_VERSION, apply_migrations, has_extension
+from post_schedule import MAX_ALBUM_SIZE, REPEAT_TITLES, REPEATS, next_occurrence, parse_schedule_document
+from profiler import HandlerTimings, instrument_handlers, sample_threads, write_folded
+from state_store import create_state_store
+from message_layout import MESSAGE_LIMIT, layout_post, split_message, utf16_len
+from image_hash import ImageLibrary
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -28,26 +43,90 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 CHANNEL_ID = os.getenv('CHANNEL_ID')
 ADMIN_ID = os.getenv('ADMIN_ID')
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Адрес Bot API (например, локальный сервер для нагрузочных тестов)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
+# Порт HTTP-эндпоинта /metrics (не задан — метрики не публикуются)
+METRICS_PORT = os.getenv('METRICS_PORT')
+# Замеры времени обработчиков и команда /perf (по умолчанию выключены)
+PERF_ENABLED = os.getenv('PERF_ENABLED', '').lower() in ('1', 'true', 'yes')
+# Через сколько дней опубликованный или отклоненный контент уходит в архив
+RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', '30'))
+# Соединений с PostgreSQL в пуле (потоки сверх этого ждут свободное)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+
+# Сессия requests на поток для запросов к Bot API
+telegram_sessions = threading.local()
+
+def telegram_request_sender(method, url, **kwargs):
+    """Отправляет запрос к Bot API, снимая время и ошибки по методу API"""
+    api_method = url.rsplit('/', 1)[-1]
+    session = getattr(telegram_sessions, 'session', None)
+    if session is None:
+        session = telegram_sessions.session = requests.Session()
+    
+    started = time.perf_counter()
+    try:
+        response = session.request(method, url, **kwargs)
+    except Exception:
+        TELEGRAM_CALL_ERRORS.inc(method=api_method, code='network')
+        raise
+    finally:
+        # getUpdates — долгий опрос, его время не показательно
+        if api_method != 'getUpdates':
+            TELEGRAM_CALL_SECONDS.observe(time.perf_counter() - started, method=api_method)
+    
+    if response.status_code != 200:
+        TELEGRAM_CALL_ERRORS.inc(method=api_method, code=response.status_code)
+    return response
 
-bot = telebot.TeleBot(BOT_TOKEN)
+def create_bot():
+    """Создает TeleBot и настраивает адрес и отправку запросов Bot API"""
+    if TELEGRAM_API_URL:
+        telebot.apihelper.API_URL = TELEGRAM_API_URL.rstrip('/') + '/bot{0}/{1}'
+    telebot.apihelper.CUSTOM_REQUEST_SENDER = telegram_request_sender
+    return telebot.TeleBot(BOT_TOKEN)
+
+# Бот создается при первом обращении, обработчики регистрируются заранее
+bot = LazyBot(create_bot)
 
 # Исправление часового пояса (UTC+3 для Москвы)
 TIMEZONE_OFFSET = 3
 
+# Рассылка по каналам: параллельно, с лимитами Telegram на канал и на бота
+FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', '8'))
+CHANNEL_RATE_PER_MINUTE = int(os.getenv('CHANNEL_RATE_PER_MINUTE', '20'))
+# После стольких неудачных попыток канал пропускается
+MAX_DELIVERY_ATTEMPTS = 3
+# Итог рассылки: доставлено во все каналы, часть каналов ждет повтора,
+# попытки в каком-то канале исчерпаны (публикация снимается с очереди)
+PUBLISH_DELIVERED = 'delivered'
+PUBLISH_RETRY = 'retry'
+PUBLISH_GAVE_UP = 'gave_up'
+fanout = FanoutPublisher(max_workers=FANOUT_WORKERS, channel_rate=CHANNEL_RATE_PER_MINUTE)
+
 # Флаг для остановки бота
 bot_running = True
 
-# Импорт content_finder
-try:
-    from content_finder import setup_content_finder
-    CONTENT_FINDER_AVAILABLE = True
-except ImportError as e:
-    logger.warning(f"❌ ContentFinder не доступен: {e}")
-    CONTENT_FINDER_AVAILABLE = False
+# content_finder тянет feedparser, BeautifulSoup и lxml,
+# поэтому импортируется только при первом поиске контента
+CONTENT_FINDER_AVAILABLE = None
+
+def content_finder_available():
+    """Проверяет (один раз), что модуль поиска контента импортируется"""
+    global CONTENT_FINDER_AVAILABLE
+    if CONTENT_FINDER_AVAILABLE is None:
+        try:
+            import content_finder
+            CONTENT_FINDER_AVAILABLE = True
+        except ImportError as e:
+            logger.warning(f"❌ ContentFinder не доступен: {e}")
+            CONTENT_FINDER_AVAILABLE = False
+    return CONTENT_FINDER_AVAILABLE
 
 def get_current_time():
     """Возвращает текущее время с правильным часовым поясом"""
-    return datetime.now(timezone.utc) + timedelta(hours=TIMEZONE_OFFSET)
+    # Без tzinfo: время в БД (TIMESTAMP) и из strptime тоже без часового пояса
+    return (datetime.now(timezone.utc) + timedelta(hours=TIMEZONE_OFFSET)).replace(tzinfo=None)
 
 def download_image(image_url):
     """Скачивает изображение по URL"""
@@ -62,7 +141,10 @@ def download_image(image_url):
             'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'
         }
         
+        started = time.perf_counter()
         response = requests.get(image_url, headers=headers, timeout=10)
+        IMAGE_DOWNLOAD_SECONDS.observe(time.perf_counter() - started)
+        IMAGE_DOWNLOAD_BYTES.inc(len(response.content))
         if response.status_code == 200:
             # Проверяем что это изображение по content-type
             content_type = response.headers.get('content-type', '')
@@ -80,112 +162,212 @@ def download_image(image_url):
         logger.error(f"❌ Ошибка загрузки изображения: {e}")
         return None
 
-def send_post_with_image(chat_id, text, image_data=None):
-    """Отправляет пост с изображением"""
-    try:
-        if image_data:
-            # Отправляем фото с подписью
-            bot.send_photo(chat_id, image_data, caption=text)
-            logger.info(f"✅ Пост с изображением отправлен в {chat_id}")
-        else:
-            # Отправляем просто текст
-            bot.send_message(chat_id, text)
-            logger.info(f"✅ Текстовый пост отправлен в {chat_id}")
-        return True
-    except Exception as e:
-        logger.error(f"❌ Ошибка отправки поста с изображением: {e}")
-        # Пробуем отправить без изображения
-        try:
-            bot.send_message(chat_id, text)
-            logger.info(f"✅ Пост отправлен без изображения в {chat_id}")
-            return True
-        except Exception as e2:
-            logger.error(f"❌ Критическая ошибка отправки: {e2}")
-            return False
+def like_pattern(text):
+    """Шаблон LIKE для поиска подстроки с экранированием спецсимволов"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
 
-def send_formatted_message(chat_id, text):
-    """Простая отправка сообщений без форматирования"""
-    try:
-        # Просто отправляем как обычный текст
-        bot.send_message(chat_id, text)
-        logger.info(f"✅ Сообщение отправлено в {chat_id}")
-        return True
-    except Exception as e:
-        logger.error(f"❌ Ошибка отправки сообщения: {e}")
-        return False
+def send_photos(chat_id, media, caption):
+    """Отправляет фото или альбом; возвращает file_id отправленных фото"""
+    if len(media) == 1:
+        messages = [bot.send_photo(chat_id, media[0], caption=caption)]
+    else:
+        messages = bot.send_media_group(chat_id, [
+            telebot.types.InputMediaPhoto(item, caption=caption if i == 0 else None)
+            for i, item in enumerate(media)
+        ])
+    # Самый крупный размер фото идет последним
+    return [message.photo[-1].file_id for message in messages if getattr(message, 'photo', None)]
+
+def send_media(chat_id, text, media=None, progress=None):
+    """Отправляет текст, фото или альбом (медиа — file_id или байты изображений).
+
+    Лимиты подписи и сообщения проверяются заранее: длинный текст делится
+    между подписью и следующими сообщениями. progress ({'sent', 'file_ids'})
+    запоминает уже ушедшие части: повторный вызов после ошибки начинает
+    с первой неотправленной. Возвращает file_id отправленных фото; ошибки
+    Bot API пробрасываются.
+    """
+    caption, texts = layout_post(text, with_media=bool(media))
+    progress = {} if progress is None else progress
+    # None — фото с подписью, дальше тексты
+    parts = ([None] if media else []) + texts
+    for index in range(progress.get('sent', 0), len(parts)):
+        if parts[index] is None:
+            progress['file_ids'] = send_photos(chat_id, media, caption)
+        else:
+            bot.send_message(chat_id, parts[index])
+        progress['sent'] = index + 1
+    return progress.get('file_ids', [])
+
+def reply_long(message, text):
+    """Ответ, который может не поместиться в одно сообщение (списки, отчеты)"""
+    first, *rest = split_message(text)
+    bot.reply_to(message, first)
+    for part in rest:
+        bot.send_message(message.chat.id, part)
+
+def stage_media(image_urls):
+    """Заранее загружает изображения в Telegram (в чат админа) и возвращает их file_id"""
+    file_ids = []
+    for image_url in image_urls:
+        image_data = download_image(image_url)
+        if not image_data:
+            raise ValueError(f"не удалось скачать изображение {image_url}")
+        message = bot.send_photo(ADMIN_ID, image_data, caption="📎 Медиа для запланированного поста",
+                                 disable_notification=True)
+        # Самый крупный размер фото идет последним
+        file_ids.append(message.photo[-1].file_id)
+    return file_ids
 
 class DatabaseManager:
-    def __init__(self):
-        self.conn = None
-        self.init_db()
+    def __init__(self, pool_size=DB_POOL_SIZE):
+        # Пул соединений и проверка схемы откладываются до первого запроса
+        self.pool = None
+        self.pool_size = pool_size
+        self.pool_lock = threading.Lock()
+        # Поток без свободного соединения ждет, а не получает PoolError
+        self.pool_slots = threading.BoundedSemaphore(pool_size)
+        # Соединение и вложенность вызовов текущего потока
+        self.local = threading.local()
+        self.schema_ready = False
+        self.trgm_available = False
+    
+    def acquire(self):
+        """Берет соединение из пула, создавая пул при первом обращении"""
+        if not DATABASE_URL:
+            logger.error("DATABASE_URL not found")
+            raise Exception("Database connection failed")
+        self.pool_slots.acquire()
+        try:
+            with self.pool_lock:
+                if self.pool is None:
+                    from psycopg2.pool import ThreadedConnectionPool
+                    self.pool = ThreadedConnectionPool(
+                        self.pool_size, self.pool_size, DATABASE_URL, sslmode='require'
+                    )
+            return self.pool.getconn()
+        except Exception:
+            self.pool_slots.release()
+            raise
+    
+    def release(self, conn):
+        """Возвращает соединение в пул; незавершенная транзакция откатывается"""
+        from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+        broken = bool(conn.closed)
+        if not broken and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception as e:
+                logger.error(f"❌ Rollback error: {e}")
+                broken = True
+        try:
+            self.pool.putconn(conn, close=broken)
+        finally:
+            self.pool_slots.release()
     
     def get_connection(self):
-        """Создает соединение с PostgreSQL"""
-        if self.conn is None or self.conn.closed:
-            if DATABASE_URL:
-                self.conn = psycopg2.connect(DATABASE_URL, sslmode='require')
-            else:
-                logger.error("DATABASE_URL not found")
-                raise Exception("Database connection failed")
-        return self.conn
+        """Соединение текущего вызова: берется из пула при первом запросе метода"""
+        local = self.local
+        if not getattr(local, 'depth', 0):
+            raise RuntimeError("Database connection is only available inside DatabaseManager methods")
+        if local.conn is None:
+            try:
+                local.conn = self.acquire()
+            except Exception:
+                local.failed = True
+                raise
+            if not self.schema_ready and not local.migrating:
+                self.init_db()
+        return local.conn
+    
+    def rollback(self):
+        """Откатывает прерванную транзакцию, чтобы соединение оставалось рабочим"""
+        conn = getattr(self.local, 'conn', None)
+        try:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+        except Exception as e:
+            logger.error(f"❌ Rollback error: {e}")
+    
+    @contextmanager
+    def call_scope(self, method):
+        """Вызов метода: соединение потока из пула на время внешнего вызова;
+        ошибка запроса, даже перехваченная в методе, считается и откатывается"""
+        local = self.local
+        if not getattr(local, 'depth', 0):
+            local.depth, local.conn, local.failed, local.migrating = 0, None, False, False
+        local.depth += 1
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            conn = local.conn
+            if not failed and conn is not None and not conn.closed:
+                from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+                failed = conn.get_transaction_status() == TRANSACTION_STATUS_INERROR
+            if failed or local.failed:
+                DB_QUERY_ERRORS.inc(method=method)
+                local.failed = False
+                self.rollback()
+            local.depth -= 1
+            if local.depth == 0 and conn is not None:
+                local.conn = None
+                self.release(conn)
     
     def init_db(self):
-        """Инициализация базы данных"""
+        """Инициализация базы данных: применяет недостающие миграции"""
+        self.local.migrating = True
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Таблица для запланированных постов
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS scheduled_posts (
-                    id SERIAL PRIMARY KEY,
-                    message_text TEXT,
-                    scheduled_time TIMESTAMP,
-                    is_published BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Таблица для найденного контента
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS found_content (
-                    id SERIAL PRIMARY KEY,
-                    title TEXT,
-                    content TEXT,
-                    category VARCHAR(50),
-                    url TEXT,
-                    image_url TEXT,
-                    is_approved BOOLEAN DEFAULT FALSE,
-                    is_published BOOLEAN DEFAULT FALSE,
-                    found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Добавляем индексы для ускорения поиска дубликатов
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_found_content_title ON found_content(title)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_found_content_found_at ON found_content(found_at)')
-            
-            conn.commit()
-            logger.info("✅ PostgreSQL database initialized with indexes")
+            applied = apply_migrations(conn)
+            self.trgm_available = has_extension(conn, 'pg_trgm')
+            self.schema_ready = True
+            if applied:
+                logger.info(f"✅ PostgreSQL schema migrated to version {LATEST_VERSION}")
+            else:
+                logger.info(f"✅ PostgreSQL schema is current (version {LATEST_VERSION})")
         except Exception as e:
             logger.error(f"❌ Database init error: {e}")
+        finally:
+            self.local.migrating = False
 
-    def save_scheduled_post(self, message_text, scheduled_time):
+    def save_scheduled_post(self, message_text, scheduled_time, repeat=None, media_file_ids=None):
         """Сохраняет пост в базу данных"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO scheduled_posts (message_text, scheduled_time)
-                VALUES (%s, %s)
+                INSERT INTO scheduled_posts (message_text, scheduled_time, repeat, media_file_ids)
+                VALUES (%s, %s, %s, %s)
                 RETURNING id
-            ''', (message_text, scheduled_time))
+            ''', (message_text, scheduled_time, repeat, media_file_ids))
             conn.commit()
             post_id = cursor.fetchone()[0]
             return post_id
         except Exception as e:
             logger.error(f"❌ Error saving post: {e}")
             raise
+
+    def save_scheduled_posts(self, posts):
+        """Сохраняет пачку постов [(текст, время, повтор, file_id медиа)] одной транзакцией"""
+        from psycopg2.extras import execute_values
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            # Многострочный INSERT: одна команда на каждые page_size постов
+            execute_values(cursor, '''
+                INSERT INTO scheduled_posts (message_text, scheduled_time, repeat, media_file_ids)
+                VALUES %s
+            ''', posts, page_size=500)
+            conn.commit()
+            return len(posts)
+        except Exception as e:
+            logger.error(f"❌ Error importing posts: {e}")
+            raise
     
     def get_pending_posts(self):
         """Получает неопубликованные посты"""
@@ -193,9 +375,9 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT id, message_text, scheduled_time 
+                SELECT id, message_text, scheduled_time, repeat, media_file_ids
                 FROM scheduled_posts 
-                WHERE is_published = FALSE
+                WHERE is_published = FALSE AND delivery_failed = FALSE
                 ORDER BY scheduled_time
             ''')
             posts = cursor.fetchall()
@@ -218,6 +400,31 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"❌ Error marking post: {e}")
 
+    def reschedule_post(self, post_id, next_time, published=True):
+        """Переносит повторяющийся пост на следующее время (после публикации или недоставки)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE scheduled_posts
+                SET scheduled_time = %s,
+                    last_published_at = CASE WHEN %s THEN CURRENT_TIMESTAMP ELSE last_published_at END
+                WHERE id = %s
+            ''', (next_time, published, post_id))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error rescheduling post: {e}")
+
+    def mark_post_failed(self, post_id):
+        """Снимает с очереди разовый пост, который не удалось доставить"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('UPDATE scheduled_posts SET delivery_failed = TRUE WHERE id = %s', (post_id,))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error marking post undelivered: {e}")
+
     def add_found_content(self, content_data):
         """Сохраняет найденный контент в базу"""
         try:
@@ -225,15 +432,16 @@ class DatabaseManager:
             cursor = conn.cursor()
             
             cursor.execute('''
-                INSERT INTO found_content (title, content, category, url, image_url)
-                VALUES (%s, %s, %s, %s, %s)
+                INSERT INTO found_content (title, content, category, url, image_url, fingerprint)
+                VALUES (%s, %s, %s, %s, %s, %s)
                 RETURNING id
             ''', (
                 content_data['title'], 
                 content_data['summary'], 
                 content_data['category'], 
                 content_data.get('url', ''),
-                content_data.get('image_url', '')
+                content_data.get('image_url', ''),
+                content_fingerprint(content_data['title'])
             ))
             
             conn.commit()
@@ -261,89 +469,852 @@ class DatabaseManager:
             logger.error(f"❌ Error getting found content: {e}")
             return None
 
-    def is_content_exists(self, title, content):
-        """Проверяет, существует ли уже такой контент в базе"""
+    def is_content_exists(self, title, content):
+        """Проверяет, существует ли уже такой контент в базе"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            # Ищем похожие посты по заголовку и содержанию;
+            # LIKE по подстроке обслуживается триграммным индексом.
+            # Заархивированный контент остается только в виде отпечатка.
+            fingerprint = content_fingerprint(title)
+            cursor.execute('''
+                SELECT id FROM found_content 
+                WHERE fingerprint = %s OR title = %s OR content LIKE %s
+                UNION ALL
+                SELECT 0 FROM content_tombstones
+                WHERE fingerprint = %s
+                LIMIT 1
+            ''', (fingerprint, title, like_pattern(title[:50]), fingerprint))
+            
+            result = cursor.fetchone()
+            return result is not None
+            
+        except Exception as e:
+            logger.error(f"❌ Error checking content existence: {e}")
+            return False
+
+    def approve_found_content(self, content_id):
+        """Отмечает контент как одобренный"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('UPDATE found_content SET is_approved = TRUE WHERE id = %s', (content_id,))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error approving content: {e}")
+            raise
+
+    def update_found_content_text(self, content_id, content):
+        """Заменяет текст найденного контента отредактированным"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('UPDATE found_content SET content = %s WHERE id = %s', (content, content_id))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error updating content text: {e}")
+            raise
+
+    def get_recent_found_content(self, limit):
+        """Последний найденный контент: (id, title, content, category, одобрен, опубликован, отклонен)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, title, content, category, is_approved, is_published, is_rejected
+                FROM found_content 
+                ORDER BY found_at DESC 
+                LIMIT %s
+            ''', (limit,))
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Error getting recent content: {e}")
+            raise
+
+    def get_publication_counts(self):
+        """Счетчики для /stats: (опубликовано вручную, опубликовано авто, найдено, в архиве)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT
+                    (SELECT COUNT(*) FROM scheduled_posts WHERE is_published = TRUE),
+                    (SELECT COUNT(*) FROM found_content WHERE is_published = TRUE),
+                    (SELECT COUNT(*) FROM found_content),
+                    (SELECT COUNT(*) FROM found_content_archive)
+            ''')
+            return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"❌ Error getting stats: {e}")
+            raise
+
+    def reject_found_content(self, content_id):
+        """Отмечает контент как отклоненный (запись остается для проверки дубликатов)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('UPDATE found_content SET is_rejected = TRUE WHERE id = %s', (content_id,))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error rejecting content: {e}")
+            raise
+
+    def queue_for_album(self, content_id):
+        """Одобряет контент без публикации (в подборку); возвращает размер подборки"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE found_content SET is_approved = TRUE, in_album = TRUE
+                WHERE id = %s AND is_published = FALSE
+            ''', (content_id,))
+            cursor.execute('''
+                SELECT COUNT(*) FROM found_content
+                WHERE in_album = TRUE AND is_published = FALSE AND is_rejected = FALSE
+            ''')
+            queued = cursor.fetchone()[0]
+            conn.commit()
+            return queued
+        except Exception as e:
+            logger.error(f"❌ Error queueing content: {e}")
+            raise
+
+    def get_publish_queue(self, limit):
+        """ID одобренного, но не опубликованного контента вне подборки (очередь публикации)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id FROM found_content
+                WHERE is_approved = TRUE AND is_published = FALSE AND is_rejected = FALSE
+                  AND in_album = FALSE AND delivery_failed = FALSE
+                ORDER BY id
+                LIMIT %s
+            ''', (limit,))
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"❌ Error getting publish queue: {e}")
+            return []
+
+    def get_album_queue(self, limit):
+        """Одобренный, но еще не опубликованный контент: (id, title, url, image_url, category)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, title, url, image_url, category FROM found_content
+                WHERE in_album = TRUE AND is_published = FALSE AND is_rejected = FALSE
+                  AND delivery_failed = FALSE
+                ORDER BY id
+                LIMIT %s
+            ''', (limit,))
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Error getting album queue: {e}")
+            return []
+
+    def get_pending_content(self, limit, offset=0):
+        """Страница очереди модерации: ([(id, title, category)], всего в очереди)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, title, category, COUNT(*) OVER ()
+                FROM found_content
+                WHERE is_approved = FALSE AND is_published = FALSE AND is_rejected = FALSE
+                ORDER BY id
+                LIMIT %s OFFSET %s
+            ''', (limit, offset))
+            rows = cursor.fetchall()
+            total = rows[0][3] if rows else 0
+            return [row[:3] for row in rows], total
+        except Exception as e:
+            logger.error(f"❌ Error getting moderation queue: {e}")
+            return [], 0
+
+    def get_pending_content_ids(self):
+        """ID всей очереди модерации"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id FROM found_content
+                WHERE is_approved = FALSE AND is_published = FALSE AND is_rejected = FALSE
+            ''')
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"❌ Error getting moderation queue: {e}")
+            return []
+
+    def bulk_approve_content(self, content_ids):
+        """Одобряет пачку контента одним UPDATE; возвращает ID, которые еще ждали модерации"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE found_content SET is_approved = TRUE
+                WHERE id = ANY(%s) AND is_approved = FALSE AND is_published = FALSE AND is_rejected = FALSE
+                RETURNING id
+            ''', (list(content_ids),))
+            approved = sorted(row[0] for row in cursor.fetchall())
+            conn.commit()
+            return approved
+        except Exception as e:
+            logger.error(f"❌ Error approving content: {e}")
+            raise
+
+    def bulk_reject_content(self, content_ids):
+        """Отклоняет пачку контента одним UPDATE; возвращает число отклоненных"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE found_content SET is_rejected = TRUE
+                WHERE id = ANY(%s) AND is_published = FALSE AND is_rejected = FALSE
+            ''', (list(content_ids),))
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"❌ Error rejecting content: {e}")
+            raise
+
+    def mark_content_published(self, content_ids):
+        """Отмечает пачку контента опубликованной одним запросом"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('UPDATE found_content SET is_published = TRUE WHERE id = ANY(%s)', (list(content_ids),))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error marking content published: {e}")
+
+    def mark_content_failed(self, content_ids):
+        """Снимает с очереди публикации контент, который не удалось доставить"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('UPDATE found_content SET delivery_failed = TRUE WHERE id = ANY(%s)', (list(content_ids),))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error marking content undelivered: {e}")
+
+    def get_channels(self):
+        """Активные каналы: [(chat_id, title, categories, rate_per_minute)]"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT chat_id, title, categories, rate_per_minute
+                FROM channels WHERE is_active = TRUE
+                ORDER BY created_at
+            ''')
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Error getting channels: {e}")
+            return []
+
+    def save_channel(self, chat_id, title, categories=None, rate_per_minute=None):
+        """Добавляет канал в рассылку или обновляет его настройки"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO channels (chat_id, title, categories, rate_per_minute)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (chat_id) DO UPDATE
+                SET title = EXCLUDED.title,
+                    categories = EXCLUDED.categories,
+                    rate_per_minute = EXCLUDED.rate_per_minute,
+                    is_active = TRUE
+            ''', (chat_id, title, categories, rate_per_minute))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error saving channel: {e}")
+            raise
+
+    def deactivate_channel(self, chat_id):
+        """Исключает канал из рассылки; возвращает, был ли он активен"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                'UPDATE channels SET is_active = FALSE WHERE chat_id = %s AND is_active = TRUE',
+                (chat_id,)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"❌ Error removing channel: {e}")
+            raise
+
+    def get_finished_deliveries(self, ref, max_attempts):
+        """Каналы, куда ref уже доставлен или попытки исчерпаны: {chat_id: 'sent' или 'failed'}"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT chat_id, status FROM deliveries
+                WHERE ref = %s AND (status = 'sent' OR attempts >= %s)
+            ''', (ref, max_attempts))
+            return dict(cursor.fetchall())
+        except Exception as e:
+            logger.error(f"❌ Error getting deliveries: {e}")
+            return {}
+
+    def save_deliveries(self, ref, statuses):
+        """Записывает статус доставки по каналам [(chat_id, status, error)] одним запросом"""
+        from psycopg2.extras import execute_values
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            execute_values(cursor, '''
+                INSERT INTO deliveries (ref, chat_id, status, error)
+                VALUES %s
+                ON CONFLICT (ref, chat_id) DO UPDATE
+                SET status = EXCLUDED.status,
+                    error = EXCLUDED.error,
+                    attempts = deliveries.attempts + 1,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', [(ref, chat_id, status, error) for chat_id, status, error in statuses])
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error saving deliveries: {e}")
+
+    def get_delivery_stats(self, since):
+        """{chat_id: (доставлено, ошибок, последняя ошибка)} с момента since"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT chat_id,
+                       COUNT(*) FILTER (WHERE status = 'sent'),
+                       COUNT(*) FILTER (WHERE status = 'failed'),
+                       (ARRAY_AGG(error ORDER BY updated_at DESC) FILTER (WHERE status = 'failed'))[1]
+                FROM deliveries
+                WHERE updated_at >= %s
+                GROUP BY chat_id
+            ''', (since,))
+            return {chat_id: (sent, failed, error) for chat_id, sent, failed, error in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"❌ Error getting delivery stats: {e}")
+            return {}
+
+    def prune_deliveries(self, days):
+        """Удаляет статусы доставки старше days дней"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM deliveries WHERE updated_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'",
+                (days,)
+            )
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"❌ Error pruning deliveries: {e}")
+            return 0
+
+    def get_images(self):
+        """Известные изображения: [(phash, file_id, last_used_at)]"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT phash, file_id, last_used_at FROM images')
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Error getting images: {e}")
+            return []
+
+    def get_image_urls(self):
+        """Хеши скачанных картинок: {url: phash}"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT url, phash FROM image_urls')
+            return dict(cursor.fetchall())
+        except Exception as e:
+            logger.error(f"❌ Error getting image urls: {e}")
+            return {}
+
+    def save_image_url(self, url, phash):
+        """Запоминает хеш картинки по URL"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO image_urls (url, phash) VALUES (%s, %s)
+                ON CONFLICT (url) DO UPDATE SET phash = EXCLUDED.phash
+            ''', (url, phash))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error saving image url: {e}")
+
+    def record_image_use(self, phash, url, file_id, used_at):
+        """Отмечает публикацию изображения; file_id сохраняется только первый"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO images (phash, url, file_id, uses, last_used_at)
+                VALUES (%s, %s, %s, 1, %s)
+                ON CONFLICT (phash) DO UPDATE
+                SET file_id = COALESCE(images.file_id, EXCLUDED.file_id),
+                    uses = images.uses + 1,
+                    last_used_at = EXCLUDED.last_used_at
+            ''', (phash, url, file_id, used_at))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error recording image use: {e}")
+
+    def archive_old_content(self, days, batch_size=1000):
+        """Переносит старый опубликованный/отклоненный контент в архив, оставляя отпечатки"""
+        total = 0
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            while True:
+                # Пачками, чтобы не держать долгие блокировки на горячей таблице
+                cursor.execute('''
+                    WITH moved AS (
+                        DELETE FROM found_content
+                        WHERE id IN (
+                            SELECT id FROM found_content
+                            WHERE (is_published OR is_rejected)
+                              AND found_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'
+                            LIMIT %s
+                        )
+                        RETURNING *
+                    ), archived AS (
+                        INSERT INTO found_content_archive
+                            (id, title, content, category, url, image_url,
+                             is_approved, is_published, is_rejected, fingerprint, found_at)
+                        SELECT id, title, content, category, url, image_url,
+                               is_approved, is_published, is_rejected, fingerprint, found_at
+                        FROM moved
+                        ON CONFLICT (id) DO NOTHING
+                    ), tombstones AS (
+                        INSERT INTO content_tombstones (fingerprint)
+                        SELECT DISTINCT fingerprint FROM moved WHERE fingerprint IS NOT NULL
+                        ON CONFLICT (fingerprint) DO NOTHING
+                    )
+                    SELECT COUNT(*) FROM moved
+                ''', (days, batch_size))
+                moved = cursor.fetchone()[0]
+                conn.commit()
+                total += moved
+                if moved < batch_size:
+                    break
+            
+            if total:
+                logger.info(f"🗄️ В архив перенесено записей: {total}")
+            return total
+        except Exception as e:
+            logger.error(f"❌ Error archiving content: {e}")
+            return total
+
+    def get_source_cursor(self, source):
+        """Возвращает (last_guid, last_published) источника или None"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT last_guid, last_published FROM source_cursors WHERE source = %s',
+                (source,)
+            )
+            return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"❌ Error getting source cursor: {e}")
+            return None
+
+    def save_source_cursor(self, source, last_guid, last_published):
+        """Сохраняет позицию последней обработанной записи источника"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO source_cursors (source, last_guid, last_published, updated_at)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (source) DO UPDATE
+                SET last_guid = EXCLUDED.last_guid,
+                    last_published = EXCLUDED.last_published,
+                    updated_at = EXCLUDED.updated_at
+            ''', (source, last_guid, last_published))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error saving source cursor: {e}")
+
+    def get_crawl_runs(self):
+        """Возвращает {источник: (last_run_at, next_run_at)}"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT source, last_run_at, next_run_at FROM crawl_runs')
+            return {source: (last_run, next_run) for source, last_run, next_run in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"❌ Error getting crawl runs: {e}")
+            return {}
+
+    def save_crawl_run(self, source, last_run, next_run):
+        """Сохраняет время прошлого и следующего опроса источника"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO crawl_runs (source, last_run_at, next_run_at, updated_at)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (source) DO UPDATE
+                SET last_run_at = EXCLUDED.last_run_at,
+                    next_run_at = EXCLUDED.next_run_at,
+                    updated_at = EXCLUDED.updated_at
+            ''', (source, last_run, next_run))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error saving crawl run: {e}")
+
+    def get_content_candidates(self):
+        """Отложенные кандидаты поиска (словари материалов)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT payload FROM content_candidates ORDER BY score DESC')
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"❌ Error getting content candidates: {e}")
+            return []
+
+    def replace_content_candidates(self, candidates):
+        """Заменяет отложенных кандидатов списком [(fingerprint, payload, score)]; False при ошибке"""
+        from psycopg2.extras import Json, execute_values
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM content_candidates')
+            if candidates:
+                execute_values(cursor, '''
+                    INSERT INTO content_candidates (fingerprint, payload, score) VALUES %s
+                ''', [
+                    (fingerprint, Json(payload), score)
+                    for fingerprint, payload, score in candidates
+                ])
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error saving content candidates: {e}")
+            return False
+
+    def has_similar_title(self, title_fragment):
+        """Проверяет, есть ли в базе заголовок с такой подстрокой"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT id FROM found_content WHERE title LIKE %s LIMIT 1',
+                (like_pattern(title_fragment),)
+            )
+            return cursor.fetchone() is not None
+        except Exception as e:
+            logger.error(f"❌ Error checking title: {e}")
+            return False
+
+    def search_found_content(self, query, limit=5, offset=0):
+        """Полнотекстовый поиск по найденному контенту с ранжированием"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            if self.trgm_available:
+                # <% использует триграммные индексы, сортировка по сходству
+                cursor.execute('''
+                    SELECT id, title, category, is_approved, is_published,
+                           GREATEST(word_similarity(%s, title), word_similarity(%s, content)) AS rank
+                    FROM found_content
+                    WHERE %s <%% title OR %s <%% content
+                    ORDER BY rank DESC, found_at DESC
+                    LIMIT %s OFFSET %s
+                ''', (query, query, query, query, limit, offset))
+            else:
+                pattern = like_pattern(query)
+                cursor.execute('''
+                    SELECT id, title, category, is_approved, is_published, 0 AS rank
+                    FROM found_content
+                    WHERE title ILIKE %s OR content ILIKE %s
+                    ORDER BY found_at DESC
+                    LIMIT %s OFFSET %s
+                ''', (pattern, pattern, limit, offset))
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Error searching content: {e}")
+            return []
+
+    def iter_content_fingerprints(self, chunk_size=10000):
+        """Потоково отдает отпечатки контента и архива через серверный курсор"""
+        import psycopg2
+        # Схема готовится через пул, а чтение идет по отдельному соединению:
+        # долгая транзакция курсора не занимает соединение пула
+        if not self.schema_ready:
+            self.init_db()
+        conn = psycopg2.connect(DATABASE_URL, sslmode='require')
+        try:
+            # Именованный курсор читает результат пачками по chunk_size строк,
+            # а не загружает всю выборку в память клиента
+            cursor = conn.cursor(name='content_fingerprints')
+            cursor.itersize = chunk_size
+            cursor.execute('''
+                SELECT fingerprint FROM found_content WHERE fingerprint IS NOT NULL
+                UNION ALL
+                SELECT fingerprint FROM content_tombstones
+                ORDER BY 1
+            ''')
+            for (fingerprint,) in cursor:
+                yield bytes(fingerprint)
+            cursor.close()
+        finally:
+            conn.close()
+
+    def get_max_content_id(self):
+        """Возвращает максимальный ID найденного контента (отметка для инкрементальной загрузки)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM found_content')
+            return cursor.fetchone()[0]
+        except Exception as e:
+            logger.error(f"❌ Error getting max content id: {e}")
+            return 0
+
+    def get_fingerprints_since(self, last_id):
+        """Возвращает (id, отпечаток) записей, добавленных после last_id"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            
-            # Ищем похожие посты по заголовку и содержанию
             cursor.execute('''
-                SELECT id FROM found_content 
-                WHERE title = %s OR content LIKE %s
-            ''', (title, f"%{title[:50]}%"))
-            
-            result = cursor.fetchone()
-            return result is not None
-            
+                SELECT id, fingerprint FROM found_content
+                WHERE id > %s AND fingerprint IS NOT NULL
+                ORDER BY id
+            ''', (last_id,))
+            return [(row_id, bytes(fingerprint)) for row_id, fingerprint in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"❌ Error checking content existence: {e}")
-            return False
+            logger.error(f"❌ Error getting new fingerprints: {e}")
+            return []
 
     def get_all_content_hashes(self):
-        """Возвращает все существующие хеши контента из БД"""
+        """Возвращает компактное множество отпечатков всего контента из БД"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT title, content FROM found_content')
-            existing_posts = cursor.fetchall()
-            
-            hashes = set()
-            for title, content in existing_posts:
-                text = title + content
-                content_hash = hashlib.md5(text.encode()).hexdigest()
-                hashes.add(content_hash)
-                
-            logger.info(f"✅ Загружено {len(hashes)} существующих хешей из БД")
+            hashes = FingerprintSet().load(self.iter_content_fingerprints())
+            stats = hashes.stats()
+            logger.info(
+                f"✅ Загружено {stats['count']} отпечатков из БД: "
+                f"{stats['memory_bytes'] // 1024} КБ за {stats['load_seconds']} с"
+            )
             return hashes
             
         except Exception as e:
             logger.error(f"❌ Error loading content hashes: {e}")
-            return set()
+            return FingerprintSet()
+
+# Время и ошибки каждого метода DatabaseManager
+instrument_methods(DatabaseManager, exclude=('acquire', 'release', 'get_connection', 'rollback', 'call_scope'),
+                   scope=DatabaseManager.call_scope)
 
 # Инициализация БД
 db = DatabaseManager()
 
-# Словарь для хранения редактируемых постов
-editing_posts = {}
+# Состояние диалогов: в памяти (одна реплика) или в БД (переживает перезапуск,
+# общее для реплик). По умолчанию БД, если она настроена
+STATE_BACKEND = os.getenv('STATE_BACKEND') or ('db' if DATABASE_URL else 'memory')
+STATE_TTL_HOURS = int(os.getenv('STATE_TTL_HOURS', '24'))
+
+# Редактируемые посты: {chat_id: content_id}
+editing_posts = create_state_store(STATE_BACKEND, 'editing_posts', db, ttl=STATE_TTL_HOURS * 3600)
+
+# Состояния пользователей: {chat_id: имя состояния или словарь с данными шага}
+user_states = create_state_store(STATE_BACKEND, 'user_states', db, ttl=STATE_TTL_HOURS * 3600)
+
+# Хеши опубликованных картинок: ротация и повторная отправка по file_id
+images = ImageLibrary(db, download_image, get_current_time)
+
+# Общий для процесса ContentFinder (создается при первом поиске)
+content_finder = None
+content_finder_lock = threading.Lock()
+
+# Последние поисковые запросы админа (для листания страниц): {chat_id: запрос}
+search_queries = create_state_store(STATE_BACKEND, 'search_queries', db, ttl=STATE_TTL_HOURS * 3600)
+
+SEARCH_PAGE_SIZE = 5
 
-# Словарь для хранения состояний пользователей
-user_states = {}
+# Очередь публикации — одобренные, но не опубликованные записи found_content;
+# событие только будит поток публикации, когда появились новые
+publish_wakeup = threading.Event()
+
+# Как часто поток публикации перепроверяет очередь без сигнала и сколько берет за раз
+PUBLISH_POLL_SECONDS = 60
+PUBLISH_BATCH_SIZE = 20
+
+# Массовая модерация: {chat_id: {'page', 'selected', 'items', 'total'}} (списки, чтобы значение было JSON)
+moderation_sessions = create_state_store(STATE_BACKEND, 'moderation_sessions', db, ttl=STATE_TTL_HOURS * 3600)
+
+MODERATION_PAGE_SIZE = 10
+
+def get_content_finder():
+    """Возвращает общий ContentFinder, подгружая в него отпечатки новых записей"""
+    global content_finder
+    with content_finder_lock:
+        if content_finder is None:
+            from content_finder import setup_content_finder
+            # Расписание источников — по часам бота (МСК), как и время в БД
+            content_finder = setup_content_finder(db, clock=get_current_time, image_library=images)
+        else:
+            content_finder.refresh_hashes()
+        return content_finder
+
+def get_target_channels(categories=()):
+    """Каналы для публикации [(chat_id, лимит в минуту)] с учетом фильтра категорий.
+
+    Канал без фильтра получает все посты, канал с фильтром — только те,
+    все категории которых входят в фильтр. Пока реестр пуст, публикуем в CHANNEL_ID.
+    """
+    channels = db.get_channels()
+    if not channels:
+        return [(CHANNEL_ID, None)]
+    
+    categories = {category for category in categories if category}
+    return [
+        (chat_id, rate) for chat_id, _, channel_categories, rate in channels
+        if not channel_categories or (categories and categories <= set(channel_categories))
+    ]
+
+# Части публикаций, уже ушедшие в канал: {(ref, chat_id): {'sent', 'file_ids', 'text_only'}}.
+# Повтор после 429 или недоставки досылает только оставшиеся части
+send_progress = {}
+
+def media_sender(ref, text, media):
+    """Отправка в один канал; если медиа не прошло, пост уходит текстом"""
+    def send(chat_id):
+        progress = send_progress.setdefault((ref, chat_id), {'sent': 0, 'text_only': False})
+        try:
+            result = send_media(chat_id, text, None if progress['text_only'] else media, progress)
+        except Exception as e:
+            # Текстом заменяется только пост, от которого еще ничего не ушло
+            if not media or progress['text_only'] or progress['sent'] or retry_after(e) is not None:
+                raise
+            logger.warning(f"⚠️ {chat_id}: медиа не отправлено ({e}), публикую текст")
+            progress.update(sent=0, text_only=True)
+            result = send_media(chat_id, text, progress=progress)
+        send_progress.pop((ref, chat_id), None)
+        return result
+    return send
+
+def report_undelivered(ref, chat_ids):
+    """Сообщает администратору о публикации, попытки доставки которой исчерпаны"""
+    logger.error(f"❌ {ref}: попытки доставки исчерпаны, не доставлено в {', '.join(map(str, chat_ids))}")
+    try:
+        bot.send_message(ADMIN_ID, f"❌ Публикация {ref} не доставлена после {MAX_DELIVERY_ATTEMPTS} попыток "
+                                   f"в каналы: {', '.join(map(str, chat_ids))}")
+    except Exception as e:
+        logger.error(f"❌ Не удалось уведомить администратора: {e}")
+
+def finish_publication(ref, targets, finished):
+    """Итог рассылки по статусам каналов: доставлено считается только 'sent'"""
+    if any(chat_id not in finished for chat_id in targets):
+        return PUBLISH_RETRY
+    # Досылать больше нечего: недоставленные остатки больше не понадобятся
+    for key in [key for key in send_progress if key[0] == ref]:
+        send_progress.pop(key, None)
+    if all(finished[chat_id] == 'sent' for chat_id in targets):
+        return PUBLISH_DELIVERED
+    return PUBLISH_GAVE_UP
+
+def publish_to_channels(ref, text, media=None, categories=(), on_sent=None):
+    """Рассылает пост по всем подходящим каналам и записывает статус доставки в каждый.
+
+    ref — ключ публикации: каналы, куда она уже доставлена, пропускаются, поэтому
+    повторный вызов досылает только недоставленное. on_sent(file_ids) вызывается
+    после первой успешной отправки медиа. Возвращает PUBLISH_DELIVERED, только
+    если пост дошел во все каналы, PUBLISH_RETRY, пока есть что досылать, и
+    PUBLISH_GAVE_UP, когда в каком-то канале попытки исчерпаны.
+    """
+    channels = get_target_channels(categories)
+    targets = [chat_id for chat_id, _ in channels]
+    finished = db.get_finished_deliveries(ref, MAX_DELIVERY_ATTEMPTS)
+    channels = [channel for channel in channels if channel[0] not in finished]
+    if not channels:
+        return finish_publication(ref, targets, finished)
+    
+    results = {}
+    # Файлы загружаются один раз: первый канал получает байты, остальные — их file_id
+    if media and not all(isinstance(item, str) for item in media):
+        (first, rate), channels = channels[0], channels[1:]
+        results[first] = fanout.call(first, media_sender(ref, text, media), rate)
+        ok, file_ids = results[first]
+        if ok and len(file_ids) == len(media):
+            media = file_ids
+    if channels:
+        results.update(fanout.publish(channels, media_sender(ref, text, media)))
+    
+    if on_sent and media:
+        sent = [result for ok, result in results.values() if ok and result and len(result) == len(media)]
+        if sent:
+            on_sent(sent[0])
+    
+    statuses = []
+    for chat_id, (ok, result) in results.items():
+        if ok:
+            statuses.append((chat_id, 'sent', None))
+        else:
+            statuses.append((chat_id, 'failed', str(result)[:500]))
+            logger.error(f"❌ {ref} не доставлен в {chat_id}: {result}")
+    db.save_deliveries(ref, statuses)
+    
+    failed = [chat_id for chat_id, status, _ in statuses if status == 'failed']
+    logger.info(f"📢 {ref}: доставлено в {len(results) - len(failed)} из {len(results)} каналов")
+    if not failed:
+        finished.update((chat_id, 'sent') for chat_id in results)
+    else:
+        # Неудача могла исчерпать попытки канала
+        finished = db.get_finished_deliveries(ref, MAX_DELIVERY_ATTEMPTS)
+    result = finish_publication(ref, targets, finished)
+    if result == PUBLISH_GAVE_UP:
+        # Сообщаем один раз: повторные вызовы уже ничего не отправляют
+        report_undelivered(ref, [chat_id for chat_id in targets if finished[chat_id] != 'sent'])
+    return result
 
 def publish_approved_post(content_id):
     """Публикует одобренный пост в канал"""
     try:
         # Получаем контент из базы
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT content, image_url FROM found_content WHERE id = %s', (content_id,))
-        result = cursor.fetchone()
+        result = db.get_found_content(content_id)
         
         if result:
-            full_post_text, image_url = result
+            _, _, full_post_text, category, _, _, image_url = result
             logger.info(f"📤 Публикую пост {content_id}")
             logger.info(f"🖼️ URL изображения: {image_url}")
             
-            # Скачиваем изображение если есть
-            image_data = None
+            # Скачиваем изображение, если оно еще не загружено в Telegram
+            image, phash = None, None
             if image_url and image_url.startswith('http'):
-                image_data = download_image(image_url)
-                if image_data:
-                    logger.info(f"✅ Изображение загружено для поста {content_id}")
+                image, phash = images.prepare(image_url)
+                if image:
+                    logger.info(f"✅ Изображение готово для поста {content_id}")
                 else:
                     logger.warning(f"⚠️ Не удалось загрузить изображение для поста {content_id}")
             else:
                 logger.warning(f"⚠️ Некорректный URL изображения: {image_url}")
             
-            # Публикуем в канал
-            success = send_post_with_image(CHANNEL_ID, full_post_text, image_data)
+            # Публикуем во все каналы категории
+            media = [image] if image else None
+            outcome = publish_to_channels(
+                f"content:{content_id}", full_post_text, media, [category],
+                on_sent=lambda file_ids: images.remember([phash], file_ids, [image_url])
+            )
             
-            if success:
+            if outcome == PUBLISH_DELIVERED:
                 # Отмечаем как опубликованный
-                cursor.execute('UPDATE found_content SET is_published = TRUE WHERE id = %s', (content_id,))
-                conn.commit()
+                db.mark_content_published([content_id])
                 logger.info(f"✅ Пост {content_id} опубликован в канале")
                 return True
+            elif outcome == PUBLISH_GAVE_UP:
+                db.mark_content_failed([content_id])
             else:
                 logger.error(f"❌ Не удалось опубликовать пост {content_id}")
         
@@ -353,25 +1324,89 @@ def publish_approved_post(content_id):
         logger.error(f"❌ Ошибка публикации поста {content_id}: {e}")
         return False
 
+def moderation_markup(content_id):
+    """Клавиатура модерации найденного поста"""
+    markup = telebot.types.InlineKeyboardMarkup()
+    markup.row(
+        telebot.types.InlineKeyboardButton("✅ Опубликовать", callback_data=f"approve_{content_id}"),
+        telebot.types.InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_{content_id}"),
+        telebot.types.InlineKeyboardButton("❌ Отклонить", callback_data=f"reject_{content_id}")
+    )
+    markup.row(telebot.types.InlineKeyboardButton("🗂 В подборку", callback_data=f"album_{content_id}"))
+    return markup
+
+def build_digest(items, limit):
+    """Текст подборки: заголовки со ссылками, сколько помещается в limit символов"""
+    text = "📰 Подборка материалов\n"
+    for _, title, url, *_ in items:
+        entry = f"\n• {title}" + (f"\n{url}" if url else "")
+        if utf16_len(text + entry) > limit:
+            break
+        text += entry
+    return text
+
+def publish_content_album(items, with_images=True):
+    """Публикует пачку одобренных материалов одним альбомом или одной текстовой подборкой"""
+    digest = build_digest(items, MESSAGE_LIMIT)
+    ref = "album:" + ",".join(str(item[0]) for item in items)
+    categories = [item[4] for item in items]
+    if not with_images:
+        return publish_to_channels(ref, digest, categories=categories)
+    
+    # Скачивание картинок — самая долгая часть, идет параллельно
+    urls = [item[3] for item in items]
+    with ThreadPoolExecutor(max_workers=min(MAX_ALBUM_SIZE, len(items))) as executor:
+        prepared = list(executor.map(images.prepare, urls))
+    
+    # Одинаковая картинка под разными URL попадает в альбом один раз
+    photos, hashes, photo_urls = [], [], []
+    for url, (image, phash) in zip(urls, prepared):
+        if not image or (phash is not None and phash in hashes):
+            continue
+        photos.append(image)
+        hashes.append(phash)
+        photo_urls.append(url)
+    
+    # Подборка делится между подписью к альбому и следующими сообщениями
+    return publish_to_channels(
+        ref, digest, photos, categories,
+        on_sent=lambda file_ids: images.remember(hashes, file_ids, photo_urls)
+    )
+
 def publish_scheduled_posts():
     """Публикует запланированные посты"""
     try:
         posts = db.get_pending_posts()
         now = get_current_time()
+        QUEUE_DEPTH.set(len(posts), queue='scheduled_posts')
         
         published_count = 0
         for post in posts:
-            post_id, message_text, scheduled_time = post
+            post_id, message_text, scheduled_time, repeat, media_file_ids = post
             time_left = (scheduled_time - now).total_seconds()
             
             if time_left <= 0:
                 try:
-                    success = send_formatted_message(CHANNEL_ID, message_text)
-                    if success:
-                        db.mark_as_published(post_id)
+                    # Медиа уже загружены в Telegram: публикация — один вызов API по file_id.
+                    # Время в ключе отличает повторы одного и того же поста
+                    ref = f"post:{post_id}:{scheduled_time:%Y%m%d%H%M}"
+                    outcome = publish_to_channels(ref, message_text, media_file_ids)
+                    if outcome == PUBLISH_DELIVERED:
+                        # Повторяющийся пост остается одной строкой: сдвигаем его время
+                        if repeat:
+                            db.reschedule_post(post_id, next_occurrence(scheduled_time, repeat, get_current_time()))
+                        else:
+                            db.mark_as_published(post_id)
                         published_count += 1
+                        SCHEDULER_LAG_SECONDS.observe((get_current_time() - scheduled_time).total_seconds())
                         logger.info(f"✅ Опубликован пост ID: {post_id}")
-                    time.sleep(1)
+                    elif outcome == PUBLISH_GAVE_UP:
+                        # Недоставленный повтор пропускается, разовый пост снимается с очереди
+                        if repeat:
+                            db.reschedule_post(post_id, next_occurrence(scheduled_time, repeat, get_current_time()),
+                                               published=False)
+                        else:
+                            db.mark_post_failed(post_id)
                 except Exception as e:
                     logger.error(f"❌ Ошибка публикации: {e}")
         
@@ -392,47 +1427,45 @@ def post_scheduler():
             logger.error(f"💥 Ошибка планировщика: {e}")
             time.sleep(30)
 
+def store_found_content(content):
+    """Сохраняет отобранный материал; None, если такой уже есть в базе"""
+    # Дополнительная проверка перед сохранением
+    if db.is_content_exists(content['title'], content['summary']):
+        logger.info(f"🚫 Пропускаем дубликат: {content['title'][:30]}...")
+        return None
+    return db.add_found_content(content)
+
 def auto_content_scheduler():
     """Автоматический поиск контента (без авто-публикации)"""
     logger.info("⏰ Запущен автоматический поиск контента")
     
     def job():
         try:
-            if CONTENT_FINDER_AVAILABLE and bot_running:
+            if content_finder_available() and bot_running:
                 logger.info("🔄 Автоматический поиск контента...")
                 
-                # Создаем ContentFinder с передачей db_manager
-                finder = setup_content_finder(db)
-                found_content = finder.search_content(max_posts=3)
+                # Общий ContentFinder: сессия и индекс дубликатов живут между запусками
+                finder = get_content_finder()
+                found_content = finder.search_content(max_posts=3, save=store_found_content)
                 
                 if found_content:
                     new_posts_count = 0
                     for content in found_content:
-                        # Дополнительная проверка перед сохранением
-                        if not db.is_content_exists(content['title'], content['summary']):
-                            content_id = db.add_found_content(content)
-                            new_posts_count += 1
-                            
-                            # Форматируем превью
-                            preview = finder.format_for_preview(content)
-                            
-                            # Создаем клавиатуру для модерации
-                            markup = telebot.types.InlineKeyboardMarkup()
-                            markup.row(
-                                telebot.types.InlineKeyboardButton("✅ Опубликовать", callback_data=f"approve_{content_id}"),
-                                telebot.types.InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_{content_id}"),
-                                telebot.types.InlineKeyboardButton("❌ Отклонить", callback_data=f"reject_{content_id}")
-                            )
-                            
-                            # Отправляем админу на одобрение
-                            bot.send_message(
-                                ADMIN_ID,
-                                preview,
-                                reply_markup=markup
-                            )
-                            time.sleep(2)
-                        else:
-                            logger.info(f"🚫 Пропускаем дубликат: {content['title'][:30]}...")
+                        new_posts_count += 1
+                        
+                        # Форматируем превью
+                        preview = finder.format_for_preview(content)
+                        
+                        # Создаем клавиатуру для модерации
+                        markup = moderation_markup(content['id'])
+                        
+                        # Отправляем админу на одобрение
+                        bot.send_message(
+                            ADMIN_ID,
+                            preview,
+                            reply_markup=markup
+                        )
+                        time.sleep(2)
                     
                     if new_posts_count > 0:
                         logger.info(f"✅ Отправлено {new_posts_count} новых постов на модерацию")
@@ -442,21 +1475,77 @@ def auto_content_scheduler():
         except Exception as e:
             logger.error(f"❌ Ошибка автоматического поиска: {e}")
     
-    # Запускаем 2 раза в день (утром и вечером)
+    # Источники опрашиваются по своему расписанию (cron или интервал), время
+    # прошлого опроса хранится в БД, поэтому перезапуск не вызывает лишний обход.
+    # Спим до ближайшего источника, но не реже раза в 12 часов и не чаще раза в минуту
+    last_retention = None
     while bot_running:
         job()
-        time.sleep(43200)  # 12 часов
+        
+        if last_retention is None or time.monotonic() - last_retention >= 43200:
+            retention_job()
+            last_retention = time.monotonic()
+        
+        delay = 43200
+        if content_finder is not None:
+            next_poll = content_finder.seconds_until_next_poll()
+            if next_poll is not None:
+                delay = min(43200, max(60, next_poll))
+        time.sleep(delay)
+
+def retention_job():
+    """Архивирует старый контент, чтобы горячая таблица оставалась маленькой"""
+    if RETENTION_DAYS > 0:
+        db.archive_old_content(RETENTION_DAYS)
+        db.prune_deliveries(RETENTION_DAYS)
+    # Брошенные диалоги
+    user_states.purge()
+    editing_posts.purge()
+    search_queries.purge()
+    moderation_sessions.purge()
+
+def publish_worker():
+    """Публикует одобренные посты по одному; темп задают лимиты каналов.
+
+    Очередь берется из БД при старте и на каждом проходе, поэтому одобренное
+    до перезапуска и неудачные публикации не теряются, а повторяются.
+    """
+    logger.info("📤 Запущена очередь публикации")
+    while bot_running:
+        publish_wakeup.clear()
+        published = 0
+        content_ids = db.get_publish_queue(PUBLISH_BATCH_SIZE)
+        QUEUE_DEPTH.set(len(content_ids), queue='publish')
+        for content_id in content_ids:
+            try:
+                if publish_approved_post(content_id):
+                    published += 1
+            except Exception as e:
+                logger.error(f"❌ Ошибка очереди публикации: {e}")
+        
+        # Полная пачка без ошибок — сразу следующая; иначе ждем сигнала или таймаута
+        if not content_ids or published < len(content_ids) or len(content_ids) < PUBLISH_BATCH_SIZE:
+            publish_wakeup.wait(PUBLISH_POLL_SECONDS)
+
+def enqueue_publish(content_ids):
+    """Будит поток публикации: одобренные посты уже отмечены в БД"""
+    if content_ids:
+        publish_wakeup.set()
 
 def start_scheduler():
     """Запускает все планировщики"""
     # Запускаем планировщик постов
-    post_scheduler_thread = threading.Thread(target=post_scheduler, daemon=True)
+    post_scheduler_thread = threading.Thread(target=post_scheduler, name='post_scheduler', daemon=True)
     post_scheduler_thread.start()
     
     # Запускаем автопланировщик контента
-    auto_scheduler_thread = threading.Thread(target=auto_content_scheduler, daemon=True)
+    auto_scheduler_thread = threading.Thread(target=auto_content_scheduler, name='content_scheduler', daemon=True)
     auto_scheduler_thread.start()
     
+    # Очередь публикации одобренных постов
+    publish_worker_thread = threading.Thread(target=publish_worker, name='publish_worker', daemon=True)
+    publish_worker_thread.start()
+    
     logger.info("✅ Все планировщики запущены")
 
 def safe_polling():
@@ -570,7 +1659,7 @@ def schedule_button(message):
         return
     
     user_states[message.chat.id] = 'waiting_schedule_text'
-    bot.send_message(message.chat.id, "📅 Введите текст поста для планирования (в следующем сообщении укажите дату и время):")
+    bot.send_message(message.chat.id, "📅 Введите текст поста для планирования или пришлите фото/альбом с подписью (в следующем сообщении укажите дату и время):")
 
 @bot.message_handler(func=lambda message: message.text == '📋 Список постов')
 def list_posts_button(message):
@@ -626,7 +1715,13 @@ def stop_button(message):
     
     stop_command(message)
 
-@bot.message_handler(func=lambda message: user_states.get(message.chat.id) == 'waiting_post_text')
+def get_admin_state(message):
+    """Состояние диалога; диалоги ведет только админ, для остальных хранилище не запрашивается"""
+    if str(message.from_user.id) != ADMIN_ID:
+        return None
+    return user_states.get(message.chat.id)
+
+@bot.message_handler(func=lambda message: get_admin_state(message) == 'waiting_post_text')
 def handle_post_text(message):
     """Обработка текста для немедленной публикации"""
     try:
@@ -635,8 +1730,8 @@ def handle_post_text(message):
             bot.reply_to(message, "❌ Текст поста не может быть пустым!")
             return
         
-        success = send_formatted_message(CHANNEL_ID, text)
-        if success:
+        outcome = publish_to_channels(f"manual:{message.chat.id}:{message.message_id}", text)
+        if outcome == PUBLISH_DELIVERED:
             bot.reply_to(message, "✅ Пост опубликован!")
         else:
             bot.reply_to(message, "❌ Не удалось опубликовать пост")
@@ -648,7 +1743,7 @@ def handle_post_text(message):
         bot.reply_to(message, f"❌ Ошибка: {e}")
         user_states.pop(message.chat.id, None)
 
-@bot.message_handler(func=lambda message: user_states.get(message.chat.id) == 'waiting_schedule_text')
+@bot.message_handler(func=lambda message: get_admin_state(message) == 'waiting_schedule_text')
 def handle_schedule_text(message):
     """Обработка текста для планирования"""
     try:
@@ -657,17 +1752,65 @@ def handle_schedule_text(message):
             bot.reply_to(message, "❌ Текст поста не может быть пустым!")
             return
         
-        # Сохраняем текст и запрашиваем дату
-        user_states[message.chat.id] = {'state': 'waiting_schedule_time', 'text': text}
+        # Сохраняем текст и запрашиваем дату (если шаг еще не обработан параллельно)
+        next_state = {'state': 'waiting_schedule_time', 'text': text}
+        if not user_states.compare_and_set(message.chat.id, 'waiting_schedule_text', next_state):
+            return
         bot.reply_to(message, "⏰ Теперь введите дату и время в формате: ГГГГ-ММ-ДД ЧЧ:ММ\nНапример: 2024-01-15 15:30")
-        
+
+    except Exception as e:
+        bot.reply_to(message, f"❌ Ошибка: {e}")
+        user_states.pop(message.chat.id, None)
+
+def get_state_name(message):
+    """Имя текущего шага диалога (состояние хранится строкой или словарем с ключом state)"""
+    state = get_admin_state(message)
+    return state.get('state') if isinstance(state, dict) else state
+
+def is_schedule_media(message):
+    """Фото для планируемого поста: первое или следующая часть того же альбома"""
+    state = get_admin_state(message)
+    if state == 'waiting_schedule_text':
+        return True
+    return (isinstance(state, dict) and state.get('state') == 'waiting_schedule_time'
+            and message.media_group_id is not None
+            and state.get('media_group_id') == message.media_group_id)
+
+@bot.message_handler(content_types=['photo'], func=is_schedule_media)
+def handle_schedule_media(message):
+    """Фото или альбом для планирования: file_id уже есть у Telegram, повторная загрузка не нужна"""
+    try:
+        file_id = message.photo[-1].file_id
+        # Части альбома приходят отдельными сообщениями и могут обрабатываться
+        # параллельно (в том числе разными репликами), поэтому шаг — через compare-and-set
+        for _ in range(10):
+            state = user_states.get(message.chat.id)
+            if isinstance(state, dict):
+                # Следующая часть альбома
+                next_state = dict(state, media=(state['media'] + [file_id])[:MAX_ALBUM_SIZE])
+                if message.caption and not state['text']:
+                    next_state['text'] = message.caption.strip()
+                if user_states.compare_and_set(message.chat.id, state, next_state):
+                    return
+            elif state == 'waiting_schedule_text':
+                next_state = {
+                    'state': 'waiting_schedule_time',
+                    'text': (message.caption or '').strip(),
+                    'media': [file_id],
+                    'media_group_id': message.media_group_id,
+                }
+                if user_states.compare_and_set(message.chat.id, state, next_state):
+                    bot.reply_to(message, "⏰ Теперь введите дату и время в формате: ГГГГ-ММ-ДД ЧЧ:ММ\nНапример: 2024-01-15 15:30")
+                    return
+            else:
+                return
+        logger.warning(f"⚠️ Не удалось добавить фото к альбому в чате {message.chat.id}")
+
     except Exception as e:
         bot.reply_to(message, f"❌ Ошибка: {e}")
         user_states.pop(message.chat.id, None)
 
-@bot.message_handler(func=lambda message: 
-                    user_states.get(message.chat.id) and 
-                    user_states[message.chat.id].get('state') == 'waiting_schedule_time')
+@bot.message_handler(func=lambda message: get_state_name(message) == 'waiting_schedule_time')
 def handle_schedule_time(message):
     """Обработка времени для планирования"""
     try:
@@ -681,9 +1824,15 @@ def handle_schedule_time(message):
             bot.reply_to(message, "❌ Укажите будущее время!")
             return
         
-        post_id = db.save_scheduled_post(message_text, scheduled_time)
+        # Шаг завершает только один обработчик, даже если сообщение пришло дважды
+        if not user_states.compare_and_set(message.chat.id, user_data, None):
+            return
+        
+        media_file_ids = user_data.get('media')
+        post_id = db.save_scheduled_post(message_text, scheduled_time, media_file_ids=media_file_ids)
         
-        bot.reply_to(message, f"✅ Пост #{post_id} запланирован на {scheduled_time.strftime('%H:%M %d.%m.%Y')}")
+        media_note = f" (🖼️ {len(media_file_ids)})" if media_file_ids else ""
+        bot.reply_to(message, f"✅ Пост #{post_id} запланирован на {scheduled_time.strftime('%H:%M %d.%m.%Y')}{media_note}")
         
         # Сбрасываем состояние
         user_states.pop(message.chat.id, None)
@@ -733,8 +1882,8 @@ def post_now_command(message):
         return
 
     try:
-        success = send_formatted_message(CHANNEL_ID, text)
-        if success:
+        outcome = publish_to_channels(f"manual:{message.chat.id}:{message.message_id}", text)
+        if outcome == PUBLISH_DELIVERED:
             bot.reply_to(message, "✅ Пост опубликован!")
         else:
             bot.reply_to(message, "❌ Не удалось опубликовать")
@@ -751,7 +1900,7 @@ def schedule_command(message):
     try:
         parts = message.text.split('"')
         if len(parts) < 3:
-            bot.reply_to(message, 'Использование: /schedule "Текст" 2024-01-15 15:00')
+            bot.reply_to(message, 'Использование: /schedule "Текст" 2024-01-15 15:00 [daily|weekly]')
             return
 
         message_text = parts[1]
@@ -764,18 +1913,67 @@ def schedule_command(message):
         date_str, time_str = datetime_part[0], datetime_part[1]
         scheduled_time = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
         
-        if scheduled_time <= get_current_time():
+        repeat = datetime_part[2].lower() if len(datetime_part) > 2 else None
+        if repeat and repeat not in REPEATS:
+            bot.reply_to(message, "❌ Повтор может быть только daily или weekly")
+            return
+        
+        if repeat:
+            scheduled_time = next_occurrence(scheduled_time, repeat, get_current_time())
+        elif scheduled_time <= get_current_time():
             bot.reply_to(message, "Укажите будущее время!")
             return
 
-        post_id = db.save_scheduled_post(message_text, scheduled_time)
-        bot.reply_to(message, f"✅ Пост #{post_id} запланирован на {scheduled_time.strftime('%H:%M %d.%m.%Y')}")
+        post_id = db.save_scheduled_post(message_text, scheduled_time, repeat)
+        repeat_note = f" ({REPEAT_TITLES[repeat]})" if repeat else ""
+        bot.reply_to(message, f"✅ Пост #{post_id} запланирован на {scheduled_time.strftime('%H:%M %d.%m.%Y')}{repeat_note}")
         
     except ValueError:
         bot.reply_to(message, "❌ Неверный формат даты. Используйте: ГГГГ-ММ-ДД ЧЧ:ММ")
     except Exception as e:
         bot.reply_to(message, f"❌ Ошибка: {e}")
 
+@bot.message_handler(content_types=['document'], func=lambda message: str(message.from_user.id) == ADMIN_ID)
+def import_schedule_document(message):
+    """Импорт расписания из CSV/JSON-файла (колонки text, time, repeat, images)"""
+    document = message.document
+    filename = document.file_name or ''
+    if not filename.lower().endswith(('.csv', '.json')):
+        bot.reply_to(message, "📎 Для импорта расписания пришлите файл .csv или .json с полями text, time, repeat, images")
+        return
+
+    try:
+        file_info = bot.get_file(document.file_id)
+        data = bot.download_file(file_info.file_path)
+
+        posts, errors = parse_schedule_document(data, filename, get_current_time())
+        if errors:
+            # Файл принимается только целиком
+            response = f"❌ Расписание не импортировано, ошибок: {len(errors)}\n\n"
+            response += "\n".join(errors[:10])
+            if len(errors) > 10:
+                response += f"\n… и еще {len(errors) - 10}"
+            bot.reply_to(message, response)
+            return
+
+        # Изображения загружаются в Telegram сейчас, чтобы публикация шла по file_id
+        images_count = sum(len(post[3]) for post in posts)
+        if images_count:
+            bot.reply_to(message, f"⏳ Загружаю изображения: {images_count}")
+        posts = [
+            (text, scheduled_time, repeat, stage_media(images) if images else None)
+            for text, scheduled_time, repeat, images in posts
+        ]
+
+        count = db.save_scheduled_posts(posts)
+        recurring = sum(1 for post in posts if post[2])
+        logger.info(f"📥 Импортировано постов: {count} (повторяющихся: {recurring})")
+        bot.reply_to(message, f"✅ Импортировано постов: {count}\n🔁 Повторяющихся: {recurring}")
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка импорта расписания: {e}")
+        bot.reply_to(message, f"❌ Ошибка импорта: {e}")
+
 @bot.message_handler(commands=['list_posts'])
 def list_posts_command(message):
     """Список запланированных постов"""
@@ -792,17 +1990,22 @@ def list_posts_command(message):
 
     response = "📅 Запланированные посты:\n\n"
     for post in posts:
-        post_id, text, post_time = post
+        post_id, text, post_time, repeat, media_file_ids = post
         time_str = post_time.strftime('%d.%m %H:%M')
         time_left = (post_time - now).total_seconds()
         
         status = "✅ ГОТОВ" if time_left <= 0 else f"⏳ {int(time_left/60)} мин"
         response += f"🆔 {post_id} | {status}\n"
-        response += f"📅 {time_str}\n"
+        response += f"📅 {time_str}"
+        if repeat:
+            response += f" | 🔁 {REPEAT_TITLES[repeat]}"
+        if media_file_ids:
+            response += f" | 🖼️ {len(media_file_ids)}"
+        response += "\n"
         response += f"📝 {text[:50]}...\n"
         response += "─" * 30 + "\n"
 
-    bot.reply_to(message, response)
+    reply_long(message, response)
 
 @bot.message_handler(commands=['stats'])
 def stats_command(message):
@@ -817,16 +2020,7 @@ def stats_command(message):
         posts = db.get_pending_posts()
         pending_count = len(posts)
         
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM scheduled_posts WHERE is_published = TRUE')
-        published_count = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM found_content WHERE is_published = TRUE')
-        auto_published_count = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM found_content')
-        total_found_count = cursor.fetchone()[0]
+        published_count, auto_published_count, total_found_count, archived_count = db.get_publication_counts()
         
         stats_text = f"""
 📊 Статистика бота:
@@ -840,6 +2034,7 @@ def stats_command(message):
 📋 Найденный контент:
 📥 Всего найдено: {total_found_count}
 ✅ Опубликовано: {auto_published_count}
+🗄️ В архиве: {archived_count}
 
 ⏰ Время: {current_time.strftime('%H:%M %d.%m.%Y')}
 
@@ -857,45 +2052,35 @@ def find_content_command(message):
         bot.reply_to(message, "⛔ Нет прав!")
         return
 
-    if not CONTENT_FINDER_AVAILABLE:
+    if not content_finder_available():
         bot.reply_to(message, "❌ Модуль поиска контента не доступен")
         return
 
     try:
         bot.reply_to(message, "🔍 Начинаю поиск контента...")
         
-        # Передаем db_manager в content_finder для проверки дубликатов
-        finder = setup_content_finder(db)
-        found_content = finder.search_content(max_posts=2)
+        # Общий ContentFinder с индексом дубликатов из БД
+        finder = get_content_finder()
+        found_content = finder.search_content(max_posts=2, force=True, save=store_found_content)
         
         if found_content:
             new_posts_count = 0
             for content in found_content:
-                # Дополнительная проверка перед сохранением
-                if not db.is_content_exists(content['title'], content['summary']):
-                    content_id = db.add_found_content(content)
-                    new_posts_count += 1
-                    
-                    # Форматируем превью
-                    preview = finder.format_for_preview(content)
-                    
-                    # Создаем клавиатуру
-                    markup = telebot.types.InlineKeyboardMarkup()
-                    markup.row(
-                        telebot.types.InlineKeyboardButton("✅ Опубликовать", callback_data=f"approve_{content_id}"),
-                        telebot.types.InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_{content_id}"),
-                        telebot.types.InlineKeyboardButton("❌ Отклонить", callback_data=f"reject_{content_id}")
-                    )
-                    
-                    # Отправляем сообщение с кнопками
-                    bot.send_message(
-                        message.chat.id, 
-                        preview, 
-                        reply_markup=markup
-                    )
-                    time.sleep(1)
-                else:
-                    logger.info(f"🚫 Пропускаем дубликат: {content['title'][:30]}...")
+                new_posts_count += 1
+                
+                # Форматируем превью
+                preview = finder.format_for_preview(content)
+                
+                # Создаем клавиатуру
+                markup = moderation_markup(content['id'])
+                
+                # Отправляем сообщение с кнопками
+                bot.send_message(
+                    message.chat.id, 
+                    preview, 
+                    reply_markup=markup
+                )
+                time.sleep(1)
             
             if new_posts_count > 0:
                 bot.reply_to(message, f"✅ Найдено {new_posts_count} новых материалов. Проверьте предложения выше!")
@@ -908,6 +2093,150 @@ def find_content_command(message):
         logger.error(f"❌ Ошибка поиска контента: {e}")
         bot.reply_to(message, f"❌ Ошибка поиска: {e}")
 
+@bot.message_handler(commands=['sources'])
+def sources_command(message):
+    """Состояние источников контента"""
+    if str(message.from_user.id) != ADMIN_ID:
+        bot.reply_to(message, "⛔ Нет прав!")
+        return
+
+    if content_finder is None:
+        bot.reply_to(message, "ℹ️ Поиск контента еще не запускался")
+        return
+
+    response = "📡 Источники контента:\n\n"
+    for health in content_finder.sources_health():
+        state = "🔴 Отключен" if health['open'] else "🟢 Активен"
+        latency = f"{health['avg_latency']} с" if health['avg_latency'] is not None else "—"
+        response += f"{state} {health['name']}\n"
+        response += f"✅ Успешных: {int(health['success_rate'] * 100)}% из {health['polls']}\n"
+        schedule = f"cron {health['cron']}" if health['cron'] else f"{health['interval_minutes']} мин"
+        response += f"⏱️ Задержка: {latency} | 🔁 Расписание: {schedule}\n"
+        if health['next_run']:
+            response += f"⏭️ Следующий опрос: {health['next_run'].strftime('%d.%m %H:%M')}\n"
+        response += f"🆕 Новых за опрос: {health['new_per_poll']}\n"
+        if health['last_error']:
+            response += f"⚠️ {health['last_error'][:100]}\n"
+        response += "─" * 30 + "\n"
+
+    reply_long(message, response)
+
+@bot.message_handler(commands=['publish_album', 'publish_digest'])
+def publish_album_command(message):
+    """Публикует отобранные в подборку посты одним альбомом или текстовой подборкой"""
+    if str(message.from_user.id) != ADMIN_ID:
+        bot.reply_to(message, "⛔ Нет прав!")
+        return
+    
+    try:
+        items = db.get_album_queue(MAX_ALBUM_SIZE)
+        if not items:
+            bot.reply_to(message, "📭 Подборка пуста: отметьте посты кнопкой «🗂 В подборку»")
+            return
+        
+        with_images = message.text.startswith('/publish_album')
+        outcome = publish_content_album(items, with_images)
+        if outcome == PUBLISH_DELIVERED:
+            db.mark_content_published([item[0] for item in items])
+            logger.info(f"✅ Подборка из {len(items)} постов опубликована")
+            bot.reply_to(message, f"✅ Подборка из {len(items)} постов опубликована в канале! 📢")
+        elif outcome == PUBLISH_GAVE_UP:
+            db.mark_content_failed([item[0] for item in items])
+            bot.reply_to(message, "❌ Подборка не доставлена: попытки исчерпаны, посты сняты с подборки")
+        else:
+            bot.reply_to(message, "❌ Не удалось опубликовать подборку, повторите позже")
+    
+    except Exception as e:
+        logger.error(f"❌ Ошибка публикации подборки: {e}")
+        bot.reply_to(message, f"❌ Ошибка: {e}")
+
+@bot.message_handler(commands=['channels'])
+def channels_command(message):
+    """Каналы рассылки и статус доставки за сутки"""
+    if str(message.from_user.id) != ADMIN_ID:
+        bot.reply_to(message, "⛔ Нет прав!")
+        return
+    
+    try:
+        channels = db.get_channels()
+        if not channels:
+            channels = [(CHANNEL_ID, "CHANNEL_ID", None, None)]
+        stats = db.get_delivery_stats(get_current_time() - timedelta(days=1))
+        
+        response = "📢 Каналы рассылки:\n\n"
+        for chat_id, title, categories, rate in channels:
+            sent, failed, error = stats.get(chat_id, (0, 0, None))
+            response += f"📣 {title or chat_id} ({chat_id})\n"
+            response += f"📁 {', '.join(categories) if categories else 'все категории'}"
+            response += f" | ⏱️ {rate or CHANNEL_RATE_PER_MINUTE}/мин\n"
+            response += f"✅ Доставлено за сутки: {sent} | ❌ Ошибок: {failed}\n"
+            if error:
+                response += f"⚠️ {error[:100]}\n"
+            response += "─" * 30 + "\n"
+        response += "\n➕ /add_channel -100123 [категории через запятую] [лимит в минуту]\n➖ /remove_channel -100123"
+        
+        reply_long(message, response)
+    
+    except Exception as e:
+        logger.error(f"❌ Ошибка списка каналов: {e}")
+        bot.reply_to(message, f"❌ Ошибка: {e}")
+
+@bot.message_handler(commands=['add_channel'])
+def add_channel_command(message):
+    """Добавляет канал в рассылку"""
+    if str(message.from_user.id) != ADMIN_ID:
+        bot.reply_to(message, "⛔ Нет прав!")
+        return
+    
+    parts = message.text.split()[1:]
+    if not parts:
+        bot.reply_to(message, "Использование: /add_channel -100123 [science,technology] [20]")
+        return
+    
+    try:
+        chat_id = parts[0]
+        categories = None
+        rate = None
+        for part in parts[1:]:
+            if part.isdigit():
+                rate = int(part)
+            else:
+                categories = [category.strip() for category in part.split(',') if category.strip()]
+        
+        # Заодно проверяем, что бот видит канал
+        chat = bot.get_chat(chat_id)
+        db.save_channel(str(chat.id), chat.title, categories, rate)
+        
+        if str(chat.id) != str(CHANNEL_ID) and not any(row[0] == str(CHANNEL_ID) for row in db.get_channels()):
+            note = f"\nℹ️ Пока {CHANNEL_ID} не добавлен в реестр, посты туда больше не уходят"
+        else:
+            note = ""
+        bot.reply_to(message, f"✅ Канал {chat.title} добавлен в рассылку{note}")
+    
+    except Exception as e:
+        logger.error(f"❌ Ошибка добавления канала: {e}")
+        bot.reply_to(message, f"❌ Не удалось добавить канал: {e}")
+
+@bot.message_handler(commands=['remove_channel'])
+def remove_channel_command(message):
+    """Исключает канал из рассылки"""
+    if str(message.from_user.id) != ADMIN_ID:
+        bot.reply_to(message, "⛔ Нет прав!")
+        return
+    
+    parts = message.text.split()
+    if len(parts) < 2:
+        bot.reply_to(message, "Использование: /remove_channel -100123")
+        return
+    
+    try:
+        if db.deactivate_channel(parts[1]):
+            bot.reply_to(message, f"✅ Канал {parts[1]} исключен из рассылки")
+        else:
+            bot.reply_to(message, f"ℹ️ Канала {parts[1]} нет в рассылке")
+    except Exception as e:
+        bot.reply_to(message, f"❌ Ошибка: {e}")
+
 @bot.message_handler(commands=['view_found'])
 def view_found_command(message):
     """Показывает все найденные посты"""
@@ -916,15 +2245,7 @@ def view_found_command(message):
         return
 
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, title, content, category, is_approved, is_published
-            FROM found_content 
-            ORDER BY found_at DESC 
-            LIMIT 10
-        ''')
-        posts = cursor.fetchall()
+        posts = db.get_recent_found_content(10)
         
         if not posts:
             bot.reply_to(message, "📭 Нет найденных постов")
@@ -932,9 +2253,12 @@ def view_found_command(message):
         
         response = "📋 Последние найденные посты:\n\n"
         for post in posts:
-            post_id, title, content, category, approved, published = post
+            post_id, title, content, category, approved, published, rejected = post
             
-            status = "✅ Одобрен" if approved else "⏳ На модерации"
+            if rejected:
+                status = "❌ Отклонен"
+            else:
+                status = "✅ Одобрен" if approved else "⏳ На модерации"
             status += " 📤 Опубликован" if published else ""
             
             response += f"🆔 {post_id} | {status}\n"
@@ -942,12 +2266,189 @@ def view_found_command(message):
             response += f"📝 {title[:50]}...\n"
             response += "─" * 30 + "\n"
         
-        bot.reply_to(message, response)
+        reply_long(message, response)
         
     except Exception as e:
         logger.error(f"❌ Ошибка просмотра постов: {e}")
         bot.reply_to(message, f"❌ Ошибка: {e}")
 
+def send_search_page(chat_id, query, page, message_id=None):
+    """Отправляет страницу результатов поиска"""
+    # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+    rows = db.search_found_content(query, limit=SEARCH_PAGE_SIZE + 1, offset=page * SEARCH_PAGE_SIZE)
+    has_next = len(rows) > SEARCH_PAGE_SIZE
+    rows = rows[:SEARCH_PAGE_SIZE]
+    
+    if not rows:
+        text = f"🔎 По запросу «{query}» ничего не найдено"
+    else:
+        text = f"🔎 Результаты по запросу «{query}» (стр. {page + 1}):\n\n"
+        for post_id, title, category, approved, published, rank in rows:
+            status = "✅ Одобрен" if approved else "⏳ На модерации"
+            status += " 📤 Опубликован" if published else ""
+            text += f"🆔 {post_id} | {category} | {status}\n"
+            text += f"📝 {title[:60]}\n"
+            text += "─" * 30 + "\n"
+    
+    markup = telebot.types.InlineKeyboardMarkup()
+    buttons = []
+    if page > 0:
+        buttons.append(telebot.types.InlineKeyboardButton("⬅️ Назад", callback_data=f"search_{page - 1}"))
+    if has_next:
+        buttons.append(telebot.types.InlineKeyboardButton("➡️ Дальше", callback_data=f"search_{page + 1}"))
+    if buttons:
+        markup.row(*buttons)
+    
+    if message_id:
+        bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, reply_markup=markup)
+    else:
+        bot.send_message(chat_id, text, reply_markup=markup)
+
+@bot.message_handler(commands=['search'])
+def search_command(message):
+    """Поиск по архиву найденного контента"""
+    if str(message.from_user.id) != ADMIN_ID:
+        bot.reply_to(message, "⛔ Нет прав!")
+        return
+
+    query = message.text.replace('/search', '', 1).strip()
+    if len(query) < 3:
+        bot.reply_to(message, 'Использование: /search запрос (не короче 3 символов)')
+        return
+
+    try:
+        search_queries[message.chat.id] = query
+        send_search_page(message.chat.id, query, 0)
+    except Exception as e:
+        logger.error(f"❌ Ошибка поиска по архиву: {e}")
+        bot.reply_to(message, f"❌ Ошибка поиска: {e}")
+
+def new_moderation_session():
+    """Сессия /moderate с первой страницы без выбранных постов"""
+    return {'page': 0, 'selected': [], 'items': [], 'total': 0}
+
+def send_moderation_page(chat_id, session, message_id=None, reload=True):
+    """Страница массовой модерации: список с галочками и действия над выбранным; сохраняет сессию"""
+    # Переключение галочек перерисовывает страницу без запроса к БД
+    if reload:
+        items, total = db.get_pending_content(MODERATION_PAGE_SIZE, session['page'] * MODERATION_PAGE_SIZE)
+        if not items and session['page'] > 0:
+            session['page'] = max(0, (total - 1) // MODERATION_PAGE_SIZE)
+            items, total = db.get_pending_content(MODERATION_PAGE_SIZE, session['page'] * MODERATION_PAGE_SIZE)
+        session['items'], session['total'] = [list(item) for item in items], total
+    moderation_sessions[chat_id] = session
+    
+    page, items, total = session['page'], session['items'], session['total']
+    selected = set(session['selected'])
+    pages = max(1, (total + MODERATION_PAGE_SIZE - 1) // MODERATION_PAGE_SIZE)
+    
+    if not items:
+        text = "📭 Очередь модерации пуста"
+    else:
+        text = f"🗂 На модерации: {total} | Страница {page + 1} из {pages}\n"
+        text += f"☑️ Выбрано: {len(selected)}\n\n"
+        for content_id, title, category in items:
+            mark = "✅" if content_id in selected else "⬜"
+            text += f"{mark} #{content_id} [{category}] {title[:80]}\n"
+    
+    markup = telebot.types.InlineKeyboardMarkup()
+    for content_id, title, _ in items:
+        mark = "✅" if content_id in selected else "⬜"
+        markup.row(telebot.types.InlineKeyboardButton(f"{mark} #{content_id} {title[:30]}", callback_data=f"mod_t_{content_id}"))
+    
+    nav = []
+    if page > 0:
+        nav.append(telebot.types.InlineKeyboardButton("⬅️ Назад", callback_data=f"mod_p_{page - 1}"))
+    if page + 1 < pages:
+        nav.append(telebot.types.InlineKeyboardButton("➡️ Дальше", callback_data=f"mod_p_{page + 1}"))
+    if nav:
+        markup.row(*nav)
+    
+    if items:
+        markup.row(
+            telebot.types.InlineKeyboardButton("☑️ Страница", callback_data="mod_s"),
+            telebot.types.InlineKeyboardButton(f"☑️ Все {total}", callback_data="mod_all"),
+            telebot.types.InlineKeyboardButton("🧹 Сбросить", callback_data="mod_c")
+        )
+        markup.row(
+            telebot.types.InlineKeyboardButton(f"✅ Одобрить ({len(selected)})", callback_data="mod_a"),
+            telebot.types.InlineKeyboardButton(f"❌ Отклонить ({len(selected)})", callback_data="mod_r")
+        )
+    
+    if message_id:
+        bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, reply_markup=markup)
+    else:
+        bot.send_message(chat_id, text, reply_markup=markup)
+
+@bot.message_handler(commands=['moderate'])
+def moderate_command(message):
+    """Массовая модерация найденного контента"""
+    if str(message.from_user.id) != ADMIN_ID:
+        bot.reply_to(message, "⛔ Нет прав!")
+        return
+    
+    try:
+        send_moderation_page(message.chat.id, new_moderation_session())
+    except Exception as e:
+        logger.error(f"❌ Ошибка модерации: {e}")
+        bot.reply_to(message, f"❌ Ошибка: {e}")
+
+def handle_moderation_callback(call):
+    """Галочки, страницы и массовые действия в /moderate"""
+    chat_id = call.message.chat.id
+    session = moderation_sessions.get(chat_id)
+    if session is None:
+        bot.answer_callback_query(call.id, "⌛ Список устарел, повторите /moderate")
+        return
+    
+    action = call.data[len('mod_'):]
+    selected = set(session['selected'])
+    selected_before = len(selected)
+    reload = False
+    
+    if action.startswith('t_'):
+        content_id = int(action[2:])
+        selected.symmetric_difference_update({content_id})
+        bot.answer_callback_query(call.id)
+    elif action.startswith('p_'):
+        session['page'] = int(action[2:])
+        reload = True
+        bot.answer_callback_query(call.id)
+    elif action == 's':
+        selected.update(item[0] for item in session['items'])
+        bot.answer_callback_query(call.id, f"☑️ Выбрано: {len(selected)}")
+    elif action == 'all':
+        selected.update(db.get_pending_content_ids())
+        bot.answer_callback_query(call.id, f"☑️ Выбрано: {len(selected)}")
+    elif action == 'c':
+        selected.clear()
+        bot.answer_callback_query(call.id)
+    elif action in ('a', 'r'):
+        if not selected:
+            bot.answer_callback_query(call.id, "⬜ Ничего не выбрано")
+            return
+        if action == 'a':
+            # Одно UPDATE на всю выборку, публикации уходят в очередь разом
+            approved = db.bulk_approve_content(selected)
+            enqueue_publish(approved)
+            logger.info(f"✅ Массово одобрено: {len(approved)}")
+            bot.answer_callback_query(call.id, f"✅ Одобрено: {len(approved)}, публикуются по очереди")
+        else:
+            rejected = db.bulk_reject_content(selected)
+            logger.info(f"❌ Массово отклонено: {rejected}")
+            bot.answer_callback_query(call.id, f"❌ Отклонено: {rejected}")
+        selected.clear()
+        reload = True
+    else:
+        bot.answer_callback_query(call.id)
+        return
+    
+    # Telegram отвечает ошибкой на правку без изменений
+    if not reload and len(selected) == selected_before and not action.startswith('t_'):
+        return
+    session['selected'] = sorted(selected)
+    send_moderation_page(chat_id, session, message_id=call.message.message_id, reload=reload)
+
 @bot.callback_query_handler(func=lambda call: True)
 def handle_callback(call):
     """Обработчик нажатий на инлайн-кнопки"""
@@ -957,22 +2458,16 @@ def handle_callback(call):
             bot.answer_callback_query(call.id, "📤 Публикую пост...")
             
             # Получаем контент из базы
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT content, image_url FROM found_content WHERE id = %s', (content_id,))
-            result = cursor.fetchone()
+            result = db.get_found_content(content_id)
             
             if result:
-                full_post_text, image_url = result
-                
                 # Публикуем в канал
                 success = publish_approved_post(content_id)
                 
                 if success:
                     final_text = "✅ ПОСТ ОПУБЛИКОВАН В КАНАЛЕ! 📢"
                     # Отмечаем как одобренный
-                    cursor.execute('UPDATE found_content SET is_approved = TRUE WHERE id = %s', (content_id,))
-                    conn.commit()
+                    db.approve_found_content(content_id)
                 else:
                     final_text = "❌ Ошибка публикации поста"
                 
@@ -986,30 +2481,49 @@ def handle_callback(call):
             content_id = int(call.data.split('_')[1])
             bot.answer_callback_query(call.id, "❌ Пост отклонен")
             
-            # Просто отмечаем как отклоненный
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM found_content WHERE id = %s', (content_id,))
-            conn.commit()
+            # Отмечаем как отклоненный, запись нужна для проверки дубликатов
+            db.reject_found_content(content_id)
+            
+            bot.edit_message_text(
+                chat_id=call.message.chat.id,
+                message_id=call.message.message_id,
+                text="❌ Пост отклонен"
+            )
+            
+        elif call.data.startswith('album_'):
+            content_id = int(call.data.split('_')[1])
+            queued = db.queue_for_album(content_id)
+            bot.answer_callback_query(call.id, f"🗂 В подборке: {queued}")
             
+            hint = "\n📤 Подборка заполнена: /publish_album или /publish_digest" if queued >= MAX_ALBUM_SIZE else ""
             bot.edit_message_text(
                 chat_id=call.message.chat.id,
                 message_id=call.message.message_id,
-                text="❌ Пост отклонен и удален"
+                text=f"🗂 Пост добавлен в подборку ({queued}/{MAX_ALBUM_SIZE}){hint}"
             )
             
+        elif call.data.startswith('mod_'):
+            handle_moderation_callback(call)
+            
+        elif call.data.startswith('search_'):
+            page = int(call.data.split('_')[1])
+            query = search_queries.get(call.message.chat.id)
+            if not query:
+                bot.answer_callback_query(call.id, "⌛ Запрос устарел, повторите /search")
+                return
+            
+            bot.answer_callback_query(call.id)
+            send_search_page(call.message.chat.id, query, page, message_id=call.message.message_id)
+            
         elif call.data.startswith('edit_'):
             content_id = int(call.data.split('_')[1])
             bot.answer_callback_query(call.id, "✏️ Загружаем полный текст...")
             
             # Получаем полный текст из базы
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT content FROM found_content WHERE id = %s', (content_id,))
-            result = cursor.fetchone()
+            result = db.get_found_content(content_id)
             
             if result:
-                full_post_text = result[0]
+                full_post_text = result[2]
                 
                 # Сохраняем в памяти для редактирования
                 editing_posts[call.message.chat.id] = content_id
@@ -1037,7 +2551,50 @@ def handle_callback(call):
         logger.error(f"❌ Ошибка обработки callback: {e}")
         bot.answer_callback_query(call.id, "❌ Ошибка обработки")
 
-@bot.message_handler(func=lambda message: message.chat.id in editing_posts)
+@bot.message_handler(commands=['perf'])
+def perf_command(message):
+    """Время обработчиков и сэмплирующий профиль потоков"""
+    if str(message.from_user.id) != ADMIN_ID:
+        bot.reply_to(message, "⛔ Нет прав!")
+        return
+
+    if not PERF_ENABLED:
+        bot.reply_to(message, "ℹ️ Профилирование выключено (PERF_ENABLED=1)")
+        return
+
+    args = message.text.split()[1:]
+    if args and args[0] == 'profile':
+        seconds = min(int(args[1]) if len(args) > 1 and args[1].isdigit() else 10, 120)
+        bot.reply_to(message, f"🔬 Снимаю профиль всех потоков {seconds} с...")
+        threading.Thread(
+            target=send_thread_profile, args=(message.chat.id, seconds), name='perf_profile', daemon=True
+        ).start()
+        return
+
+    summary = handler_timings.summary()
+    if not summary:
+        bot.reply_to(message, "📭 Замеров пока нет")
+        return
+
+    response = "⏱️ Время обработчиков (мс):\n\n"
+    for route, stats in sorted(summary.items(), key=lambda item: item[1]['p95'], reverse=True):
+        response += f"{route} ({stats['count']})\n"
+        response += f"p50 {stats['p50'] * 1000:.1f} | p95 {stats['p95'] * 1000:.1f} | p99 {stats['p99'] * 1000:.1f}\n"
+    response += "\n🔬 /perf profile 10 — профиль потоков за 10 с"
+    bot.reply_to(message, response)
+
+def send_thread_profile(chat_id, seconds):
+    """Снимает профиль потоков и отправляет файл свернутых стеков"""
+    try:
+        samples = sample_threads(seconds)
+        path = write_folded(samples, f"/tmp/perf-{int(time.time())}.folded")
+        with open(path, 'rb') as f:
+            bot.send_document(chat_id, f, caption=f"🔬 Профиль за {seconds} с ({sum(samples.values())} сэмплов), формат flamegraph")
+    except Exception as e:
+        logger.error(f"❌ Ошибка профилирования: {e}")
+        bot.send_message(chat_id, f"❌ Ошибка профилирования: {e}")
+
+@bot.message_handler(func=lambda message: str(message.from_user.id) == ADMIN_ID and message.chat.id in editing_posts)
 def handle_edit_text(message):
     """Обрабатывает редактирование текста поста"""
     try:
@@ -1048,14 +2605,7 @@ def handle_edit_text(message):
         new_content = message.text.strip()
         
         # Обновляем в базе - сохраняем весь текст как есть
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE found_content 
-            SET content = %s 
-            WHERE id = %s
-        ''', (new_content, content_id))
-        conn.commit()
+        db.update_found_content_text(content_id, new_content)
         
         # Показываем обновленную версию
         updated_preview = f"""✏️ ТЕКСТ ОБНОВЛЕН
@@ -1065,12 +2615,7 @@ def handle_edit_text(message):
 ✅ Изменения сохранены. Теперь можете одобрить пост."""
         
         # Создаем новую клавиатуру для обновленного поста
-        markup = telebot.types.InlineKeyboardMarkup()
-        markup.row(
-            telebot.types.InlineKeyboardButton("✅ Опубликовать", callback_data=f"approve_{content_id}"),
-            telebot.types.InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_{content_id}"),
-            telebot.types.InlineKeyboardButton("❌ Отклонить", callback_data=f"reject_{content_id}")
-        )
+        markup = moderation_markup(content_id)
         
         bot.send_message(
             message.chat.id,
@@ -1084,21 +2629,42 @@ def handle_edit_text(message):
         logger.error(f"❌ Ошибка редактирования: {e}")
         bot.reply_to(message, f"❌ Ошибка при сохранении: {e}")
 
+# Кольцевые буферы времени обработчиков
+handler_timings = HandlerTimings()
+
+# Время импорта модуля (без подключения к БД и создания бота)
+IMPORT_SECONDS = time.perf_counter() - STARTUP_STARTED
+
 def main():
     """Запуск бота"""
     global bot_running
     
-    logger.info("🚀 Запуск бота...")
+    logger.info(f"🚀 Запуск бота... (импорт {IMPORT_SECONDS:.2f} с)")
+    STARTUP_SECONDS.set(IMPORT_SECONDS, phase='import')
     
     if not all([BOT_TOKEN, CHANNEL_ID, ADMIN_ID]):
         logger.error("❌ Не все переменные окружения установлены!")
         return
     
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+    
+    # Подключение к БД и миграции до запуска планировщиков
+    schema_started = time.perf_counter()
+    db.init_db()
+    STARTUP_SECONDS.set(time.perf_counter() - schema_started, phase='database')
+    
+    # Обертки ставятся, когда все обработчики уже зарегистрированы
+    if PERF_ENABLED:
+        instrument_handlers(bot, handler_timings)
+    
     # Запускаем все планировщики
     start_scheduler()
     
     # Запускаем бота
-    logger.info("✅ Бот готов к работе!")
+    total = time.perf_counter() - STARTUP_STARTED
+    STARTUP_SECONDS.set(total, phase='total')
+    logger.info(f"✅ Бот готов к работе за {total:.2f} с")
     safe_polling()
 
 if __name__ == '__main__':
@@ -1,78 +1,361 @@
 # content_finder.py
 import logging
+import calendar
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta
 import random
-import hashlib
 from bs4 import BeautifulSoup
 import re
 import time
+import threading
+import os
 import urllib.parse
-import feedparser
+from concurrent.futures import ThreadPoolExecutor
+from article_extractor import MAX_ARTICLE_BYTES, ArticleExtractor, strip_html
+from dedup import FingerprintSet, content_fingerprint
+from feed_stream import iter_feed_entries
+from http_cassette import session_from_env
+from metrics import FEED_FETCH_ERRORS, FEED_FETCH_SECONDS
+from relevance import RelevanceScorer
+from sources import load_sources
 
 logger = logging.getLogger(__name__)
 
+# Сколько источников опрашивается параллельно
+CRAWL_WORKERS = int(os.getenv('CRAWL_WORKERS', '4'))
+# Сколько статей дозагружается параллельно
+ENRICH_WORKERS = int(os.getenv('ENRICH_WORKERS', '4'))
+# Релевантные записи, не вошедшие в отбор, ждут следующих поисков (лучшие по оценке)
+MAX_CANDIDATES = 100
+CANDIDATE_TTL = timedelta(days=3)
+
 class ContentFinder:
-    def __init__(self, db_manager=None):
-        self.session = requests.Session()
+    def __init__(self, db_manager=None, sources=None, session=None, clock=None, image_library=None):
+        # HTTP_CASSETTE_MODE=record/replay подменяет сеть файлами кассеты
+        self.session = session or session_from_env()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
         
         self.db_manager = db_manager
-        self.post_hashes = set()
+        # Часы для расписания опросов (по умолчанию локальное время сервера)
+        self.clock = clock or datetime.now
+        # Ротация картинок по истории публикаций (без нее — случайный выбор)
+        self.image_library = image_library
+        self.post_hashes = FingerprintSet()
+        # ID последней записи found_content, учтенной в post_hashes
+        self.hashes_watermark = 0
+        # Курсоры источников: {имя: (last_guid, last_published)}
+        self.source_cursors = {}
+        # Курсоры текущего поиска; сохраняются только после записи найденного
+        self.pending_cursors = {}
+        # Отложенные кандидаты (загружаются из БД при первом поиске)
+        self.candidates = None
+        # Поиск из планировщика и по команде не должен идти одновременно
+        self.lock = threading.RLock()
         if db_manager:
             self.load_existing_hashes()
         
-        self.sources = [
-            self.parse_science_news,
-            self.parse_tech_news,
-            self.parse_historical_facts
-        ]
+        self.sources = load_sources() if sources is None else sources
+        self.parsers = {
+            'rss': self.parse_rss_source,
+            'wikipedia': self.parse_wikipedia_source,
+            'html': self.parse_html_source,
+        }
+        self.relevance = RelevanceScorer()
+        self.extractor = ArticleExtractor()
+        self.formatters = {
+            'science': (self.format_science_post, self.get_science_image),
+            'technology': (self.format_tech_post, self.get_tech_image),
+            'history': (self.format_historical_post, self.get_historical_image),
+        }
+        if db_manager:
+            self.load_crawl_runs()
 
     def load_existing_hashes(self):
-        """Загружает существующие хеши из БД"""
-        try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT title, content FROM found_content')
-            existing_posts = cursor.fetchall()
-            
-            for title, content in existing_posts:
-                text = title + content[:200]
-                content_hash = hashlib.md5(text.encode()).hexdigest()
-                self.post_hashes.add(content_hash)
-                
-            logger.info(f"✅ Загружено {len(self.post_hashes)} хешей из БД")
-        except Exception as e:
-            logger.error(f"❌ Ошибка загрузки хешей: {e}")
+        """Загружает существующие отпечатки из БД"""
+        with self.lock:
+            # Отметку берем до загрузки: записи, добавленные во время
+            # загрузки, подхватит следующий refresh_hashes()
+            self.hashes_watermark = self.db_manager.get_max_content_id()
+            self.post_hashes = self.db_manager.get_all_content_hashes()
+
+    def refresh_hashes(self):
+        """Добавляет отпечатки записей, появившихся в БД после прошлой загрузки"""
+        if not self.db_manager:
+            return 0
+        with self.lock:
+            rows = self.db_manager.get_fingerprints_since(self.hashes_watermark)
+            for row_id, fingerprint in rows:
+                self.post_hashes.add(fingerprint)
+                self.hashes_watermark = row_id
+            if rows:
+                logger.info(f"🔄 Индекс дубликатов обновлен: +{len(rows)} записей")
+            return len(rows)
+
+    def load_crawl_runs(self):
+        """Восстанавливает расписание опросов из БД, чтобы перезапуск не вызывал лишний обход"""
+        runs = self.db_manager.get_crawl_runs()
+        for source in self.sources:
+            if source.name in runs:
+                source.restore_run(*runs[source.name])
+
+    def save_crawl_runs(self, sources):
+        """Сохраняет время прошлого и следующего опроса источников"""
+        if not self.db_manager:
+            return
+        for source in sources:
+            self.db_manager.save_crawl_run(source.name, source.last_run, source.next_run)
+
+    def dedup_stats(self):
+        """Метрики индекса дубликатов: количество, память, время загрузки"""
+        return self.post_hashes.stats()
+
+    def search_content(self, max_posts=3, force=False, save=None):
+        """Основной метод поиска контента.
 
-    def search_content(self, max_posts=3):
-        """Основной метод поиска контента"""
+        Опрашиваются только источники, у которых подошел интервал опроса;
+        force=True (ручной поиск) опрашивает все. save(content) сохраняет
+        отобранный материал и возвращает его ID (None — дубликат, пропускается);
+        курсоры источников сдвигаются, только когда все отобранное сохранено.
+        """
+        with self.lock:
+            return self._search_content(max_posts, force, save)
+
+    def _search_content(self, max_posts, force, save):
         logger.info("🔍 Начинаю поиск контента...")
         
+        now = self.clock()
+        sources = [
+            source for source in self.sources
+            if not source.is_open() and (force or source.is_due(now))
+        ]
+        if not sources:
+            logger.info("ℹ️ Ни одному источнику еще рано обновляться")
+            return []
+        
         found_content = []
+        self.pending_cursors = {}
         
-        for source in self.sources:
-            try:
-                if len(found_content) >= max_posts:
-                    break
-                    
-                content_list = source()
-                if content_list:
-                    for content in content_list:
-                        if self.is_unique_content(content) and len(found_content) < max_posts:
-                            found_content.append(content)
-                            content_hash = self.get_content_hash(content)
-                            self.post_hashes.add(content_hash)
-                            logger.info(f"✅ Найден пост: {content['title'][:50]}...")
-            except Exception as e:
-                logger.error(f"❌ Ошибка источника: {e}")
+        # Источники опрашиваются параллельно, дубликаты проверяются по порядку
+        with ThreadPoolExecutor(max_workers=max(1, min(CRAWL_WORKERS, len(sources)))) as executor:
+            results = list(executor.map(self.poll_source, sources))
+        self.save_crawl_runs(sources)
+        
+        # Новые записи со всех источников и отложенные прошлыми поисками
+        # ранжируются вместе по релевантности
+        queued_at = now.isoformat()
+        fresh = [content for content_list in results for content in content_list]
+        for content in fresh:
+            content['queued_at'] = queued_at
+        candidates = fresh + self.load_candidates()
+        candidates.sort(key=lambda content: content.get('score', 0), reverse=True)
+        
+        seen = set()
+        leftover = []
+        for content in candidates:
+            content_hash = self.get_content_hash(content)
+            if content_hash in seen:
                 continue
+            seen.add(content_hash)
+            if len(found_content) >= max_posts:
+                # Не вошедшие в отбор ждут следующего поиска; уникальность проверится тогда
+                if content_hash not in self.post_hashes:
+                    leftover.append(content)
+            elif self.is_unique_content(content):
+                found_content.append(content)
+                logger.info(f"✅ Найден пост ({content.get('score', 0):.1f}): {content['title'][:50]}...")
+        
+        self.enrich_articles(found_content)
+        self.assign_images(found_content)
+        
+        found_content, failed = self.store_content(found_content, save)
+        # Курсоры сдвигаются, только когда все прочитанное сохранено или отложено
+        if self.save_candidates(failed + leftover, now):
+            self.commit_cursors()
+        else:
+            # Записи перечитаются при следующем поиске, сохраненное отсеет дедупликация
+            logger.warning("⚠️ Отложенные кандидаты не сохранены, курсоры источников не сдвинуты")
         
         logger.info(f"🎯 Найдено материалов: {len(found_content)}")
         return found_content
 
+    def store_content(self, articles, save):
+        """Сохраняет отобранные материалы через save; возвращает (сохраненные, несохраненные)"""
+        stored = []
+        failed = []
+        for content in articles:
+            if save:
+                try:
+                    content_id = save(content)
+                except Exception as e:
+                    logger.error(f"❌ Не удалось сохранить материал {content['title'][:50]}: {e}")
+                    failed.append(content)
+                    continue
+                if content_id is None:
+                    continue
+                content['id'] = content_id
+            # В индекс дубликатов попадает только записанное
+            self.post_hashes.add(self.get_content_hash(content))
+            stored.append(content)
+        return stored, failed
+
+    def load_candidates(self):
+        """Отложенные кандидаты прошлых поисков"""
+        if self.candidates is None:
+            payloads = self.db_manager.get_content_candidates() if self.db_manager else []
+            self.candidates = [dict(payload, found_date=datetime.now()) for payload in payloads]
+        return self.candidates
+
+    def save_candidates(self, candidates, now):
+        """Откладывает кандидатов до следующего поиска: лучшие MAX_CANDIDATES не старше CANDIDATE_TTL"""
+        oldest = (now - CANDIDATE_TTL).isoformat()
+        candidates = [content for content in candidates if content.get('queued_at', '') >= oldest]
+        candidates.sort(key=lambda content: content.get('score', 0), reverse=True)
+        if len(candidates) > MAX_CANDIDATES:
+            logger.info(f"ℹ️ Отброшено кандидатов сверх лимита: {len(candidates) - MAX_CANDIDATES}")
+            candidates = candidates[:MAX_CANDIDATES]
+        
+        self.candidates = candidates
+        if not self.db_manager:
+            return True
+        return self.db_manager.replace_content_candidates([
+            (
+                self.get_content_hash(content),
+                {key: value for key, value in content.items() if key != 'found_date'},
+                content.get('score', 0),
+            )
+            for content in candidates
+        ])
+
+    def commit_cursors(self):
+        """Сохраняет курсоры, сдвинутые текущим поиском"""
+        for name, (last_guid, last_published) in self.pending_cursors.items():
+            self.save_source_cursor(name, last_guid, last_published)
+        self.pending_cursors = {}
+
+    def assign_images(self, articles):
+        """Картинка категории для отобранных материалов, у которых нет своей"""
+        for content in articles:
+            if content.get('image_url'):
+                continue
+            source = self.get_source(content.get('source'))
+            template = source.template if source else content.get('category')
+            _, get_image = self.formatters.get(template, self.formatters['science'])
+            content['image_url'] = get_image()
+
+    def enrich_articles(self, articles):
+        """Дозагружает полный текст и изображение отобранных статей параллельно"""
+        articles = [content for content in articles if self.should_enrich(content)]
+        if not articles:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, min(ENRICH_WORKERS, len(articles)))) as executor:
+            list(executor.map(self.enrich_article, articles))
+
+    def should_enrich(self, content):
+        """Включена ли дозагрузка статей для источника материала"""
+        source = self.get_source(content.get('source'))
+        return bool(source and source.options.get('enrich') and content.get('url'))
+
+    def enrich_article(self, content):
+        """Заменяет описание из ленты текстом статьи, а картинку-заглушку — настоящей"""
+        source = self.get_source(content['source'])
+        try:
+            text, image_url = self.extractor.get(
+                content['url'], lambda url: self.download_article(source, url)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить статью {content['url']}: {e}")
+            return
+        
+        if text:
+            format_post, _ = self.formatters.get(source.template, self.formatters['science'])
+            content['text'] = text
+            content['summary'] = format_post(content['title'], text)
+        if image_url:
+            content['image_url'] = image_url
+
+    def download_article(self, source, url):
+        """Скачивает страницу статьи, не больше MAX_ARTICLE_BYTES"""
+        response = self.fetch(source, url, stream=True)
+        try:
+            data = bytearray()
+            for chunk in response.iter_content(16 * 1024):
+                data.extend(chunk)
+                if len(data) >= MAX_ARTICLE_BYTES:
+                    break
+            return bytes(data)
+        finally:
+            response.close()
+
+    def get_source(self, name):
+        """Источник по имени"""
+        for source in self.sources:
+            if source.name == name:
+                return source
+        return None
+
+    def poll_source(self, source):
+        """Опрашивает один источник и обновляет его статистику"""
+        now = self.clock()
+        source.start_run(now)
+        source.new_entries = 0
+        started = time.monotonic()
+        try:
+            articles = self.parsers[source.type](source)
+        except Exception as e:
+            source.record_failure(time.monotonic() - started, e)
+            source.schedule_next(now)
+            logger.error(f"❌ Ошибка источника {source.name}: {e}")
+            return []
+        
+        # Для источников без курсора новыми считаются найденные материалы
+        new_entries = source.new_entries if source.type != 'wikipedia' else len(articles)
+        source.record_success(time.monotonic() - started, new_entries)
+        source.schedule_next(now)
+        return articles
+
+    def fetch(self, source, url, **kwargs):
+        """HTTP-запрос к источнику с его таймаутом и лимитом параллельности"""
+        started = time.perf_counter()
+        try:
+            with source.semaphore:
+                response = self.session.get(url, timeout=source.timeout, **kwargs)
+            response.raise_for_status()
+        except Exception:
+            FEED_FETCH_ERRORS.inc(source=source.name)
+            raise
+        finally:
+            FEED_FETCH_SECONDS.observe(time.perf_counter() - started, source=source.name)
+        return response
+
+    def seconds_until_next_poll(self):
+        """Сколько секунд до момента, когда пора опрашивать ближайший источник"""
+        if not self.sources:
+            return None
+        now = self.clock()
+        return min(source.seconds_until_due(now) for source in self.sources)
+
+    def sources_health(self):
+        """Состояние всех источников"""
+        return [source.health() for source in self.sources]
+
+    def build_article(self, source, title, text, url, score=0):
+        """Оформляет найденный материал по шаблону источника (картинка выбирается после отбора)"""
+        format_post, _ = self.formatters.get(
+            source.template, self.formatters['science']
+        )
+        return {
+            'title': title,
+            'summary': format_post(title, text),
+            'text': text,
+            'source': source.name,
+            'category': source.category,
+            'url': url,
+            'score': score,
+            'found_date': datetime.now()
+        }
+
     def is_unique_content(self, content):
         """Проверяет уникальность контента"""
         content_hash = self.get_content_hash(content)
@@ -88,132 +371,170 @@ class ContentFinder:
     def is_content_in_db(self, content):
         """Проверяет наличие контента в базе данных"""
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id FROM found_content WHERE title LIKE %s', (f"%{content['title'][:30]}%",))
-            result = cursor.fetchone()
-            return result is not None
+            return self.db_manager.has_similar_title(content['title'][:30])
         except Exception as e:
             logger.error(f"❌ Ошибка проверки БД: {e}")
             return False
 
     def get_content_hash(self, content):
-        """Создает хеш контента"""
-        text = content['title'] + content['summary'][:100]
-        return hashlib.md5(text.encode()).hexdigest()
+        """Создает отпечаток контента (тот же, что хранится в БД)"""
+        return content_fingerprint(content['title'])
 
-    def parse_science_news(self):
-        """Парсинг научных новостей"""
-        try:
-            articles = []
-            url = "https://naked-science.ru/rss.xml"
-            
-            response = self.session.get(url, timeout=10)
-            if response.status_code == 200:
-                feed = feedparser.parse(response.content)
-                
-                for entry in feed.entries[:5]:
-                    title = entry.title
-                    summary = entry.get('summary', '') or entry.get('description', '')
-                    
-                    if self.is_relevant_content(title + summary):
-                        image_url = self.get_science_image()
-                        formatted_post = self.format_science_post(title, summary)
-                        
-                        articles.append({
-                            'title': title,
-                            'summary': formatted_post,
-                            'category': 'science',
-                            'url': entry.link,
-                            'image_url': image_url,
-                            'found_date': datetime.now()
-                        })
-            
-            return articles
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка парсинга научных новостей: {e}")
-            return []
+    def get_source_cursor(self, source):
+        """Возвращает курсор источника (last_guid, last_published)"""
+        if source not in self.source_cursors:
+            cursor = self.db_manager.get_source_cursor(source) if self.db_manager else None
+            self.source_cursors[source] = tuple(cursor) if cursor else (None, None)
+        return self.source_cursors[source]
 
-    def parse_tech_news(self):
-        """Парсинг технологических новостей"""
-        try:
-            articles = []
-            url = "https://3dnews.ru/news/rss/"
-            
-            response = self.session.get(url, timeout=10)
-            if response.status_code == 200:
-                feed = feedparser.parse(response.content)
-                
-                for entry in feed.entries[:5]:
-                    title = entry.title
-                    summary = entry.get('summary', '') or entry.get('description', '')
-                    
-                    if self.is_relevant_content(title + summary):
-                        image_url = self.get_tech_image()
-                        formatted_post = self.format_tech_post(title, summary)
-                        
-                        articles.append({
-                            'title': title,
-                            'summary': formatted_post,
-                            'category': 'technology',
-                            'url': entry.link,
-                            'image_url': image_url,
-                            'found_date': datetime.now()
-                        })
-            
-            return articles
+    def save_source_cursor(self, source, last_guid, last_published):
+        """Запоминает последнюю обработанную запись источника"""
+        self.source_cursors[source] = (last_guid, last_published)
+        if self.db_manager:
+            self.db_manager.save_source_cursor(source, last_guid, last_published)
+
+    @staticmethod
+    def get_entry_guid(entry):
+        """Идентификатор записи ленты"""
+        return entry.get('id') or entry.get('link') or entry.get('title')
+
+    @staticmethod
+    def get_entry_published(entry):
+        """Время публикации записи ленты (UTC) или None"""
+        parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+        if not parsed:
+            return None
+        return datetime.utcfromtimestamp(calendar.timegm(parsed))
+
+    def iter_new_entries(self, source, entries):
+        """Отдает записи новее курсора источника, не больше source.entry_limit() за опрос.
+
+        Ленты отсортированы от новых к старым, поэтому разбор останавливается
+        на первой уже виденной записи. Если новых записей больше лимита
+        (после простоя он растет на число догоняемых окон расписания), отдаются
+        самые старые из них, а курсор встает на последнюю отданную: остальные
+        заберет следующий опрос. У источника без курсора берутся самые новые
+        записи. Новый курсор откладывается до commit_cursors().
+        """
+        last_guid, last_published = self.get_source_cursor(source.name)
+        first_run = last_guid is None and last_published is None
+        limit = source.entry_limit()
+        
+        fresh = []
+        for entry in entries:
+            guid = self.get_entry_guid(entry)
+            published = self.get_entry_published(entry)
             
-        except Exception as e:
-            logger.error(f"❌ Ошибка парсинга техновостей: {e}")
-            return []
+            if last_guid is not None and guid == last_guid:
+                break
+            if last_published and published and published <= last_published:
+                continue
+            fresh.append((entry, guid, published))
+            # Без курсора старые записи не нужны: остаток ленты не читается
+            if first_run and len(fresh) >= limit:
+                break
+        
+        batch = fresh[-limit:]
+        if not batch:
+            return
+        
+        # Курсор — самая новая из отданных записей
+        newest_guid = batch[0][1]
+        newest_published = max((published for _, _, published in batch if published), default=None)
+        if last_published and (newest_published is None or newest_published < last_published):
+            newest_published = last_published
+        self.pending_cursors[source.name] = (newest_guid, newest_published)
+        
+        for entry, _, _ in batch:
+            source.new_entries += 1
+            yield entry
 
-    def parse_historical_facts(self):
-        """Парсинг исторических фактов"""
+    def parse_rss_source(self, source):
+        """Парсинг RSS/Atom-ленты"""
+        articles = []
+        
+        # Лента читается потоково: как только встречена уже виденная запись
+        # (или, при первом опросе, набрано max_entries), остаток документа не скачивается
+        response = self.fetch(source, source.url, stream=True)
+        entries = iter_feed_entries(response, max_bytes=source.max_bytes)
         try:
-            articles = []
-            
-            # Используем Wikipedia API
-            url = "https://ru.wikipedia.org/w/api.php"
-            params = {
-                'action': 'query',
-                'list': 'search',
-                'srsearch': 'первый изобретение открытие',
-                'format': 'json',
-                'srlimit': 5
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            data = response.json()
-            
-            for item in data.get('query', {}).get('search', [])[:3]:
-                title = item.get('title', '')
+            for entry in self.iter_new_entries(source, entries):
+                title = strip_html(entry.get('title', ''))
+                summary = strip_html(entry.get('summary', '') or entry.get('description', ''))
                 
-                if self.is_relevant_content(title):
-                    full_content = self.get_wikipedia_content(title)
-                    if full_content:
-                        image_url = self.get_historical_image()
-                        formatted_post = self.format_historical_post(title, full_content)
-                        
-                        articles.append({
-                            'title': title,
-                            'summary': formatted_post,
-                            'category': 'history',
-                            'url': f"https://ru.wikipedia.org/wiki/{title.replace(' ', '_')}",
-                            'image_url': image_url,
-                            'found_date': datetime.now()
-                        })
+                score = self.relevance.score(title, summary)
+                if score >= self.relevance.threshold:
+                    articles.append(self.build_article(source, title, summary, entry.get('link', ''), score))
+        finally:
+            entries.close()
+            response.close()
+        
+        return articles
+
+    def parse_wikipedia_source(self, source):
+        """Поиск статей через Wikipedia API"""
+        articles = []
+        
+        params = {
+            'action': 'query',
+            'list': 'search',
+            'srsearch': source.options.get('query', ''),
+            'format': 'json',
+            'srlimit': source.entry_limit()
+        }
+        
+        response = self.fetch(source, source.url, params=params)
+        data = response.json()
+        
+        for item in data.get('query', {}).get('search', [])[:source.entry_limit()]:
+            title = item.get('title', '')
             
-            return articles
+            if self.is_relevant_content(title):
+                full_content = self.get_wikipedia_content(source, title)
+                if full_content:
+                    url = urllib.parse.urljoin(source.url, f"/wiki/{title.replace(' ', '_')}")
+                    score = self.relevance.score(title, full_content)
+                    articles.append(self.build_article(source, title, full_content, url, score))
+        
+        return articles
+
+    def parse_html_source(self, source):
+        """Парсинг HTML-страницы по CSS-селекторам из конфигурации"""
+        articles = []
+        
+        response = self.fetch(source, source.url)
+        soup = BeautifulSoup(response.content, 'lxml')
+        options = source.options
+        
+        entries = []
+        for item in soup.select(options.get('item_selector', 'article')):
+            title_node = item.select_one(options.get('title_selector', 'h2'))
+            link_node = item.select_one(options.get('link_selector', 'a'))
+            summary_node = item.select_one(options.get('summary_selector', 'p'))
+            if not title_node or not link_node:
+                continue
             
-        except Exception as e:
-            logger.error(f"❌ Ошибка парсинга исторических фактов: {e}")
-            return []
+            url = urllib.parse.urljoin(source.url, link_node.get('href', ''))
+            entries.append({
+                'id': url,
+                'link': url,
+                'title': title_node.get_text(' ', strip=True),
+                'summary': summary_node.get_text(' ', strip=True) if summary_node else '',
+            })
+        
+        # Страница упорядочена от новых к старым, как лента
+        for entry in self.iter_new_entries(source, entries):
+            score = self.relevance.score(entry['title'], entry['summary'])
+            if score >= self.relevance.threshold:
+                articles.append(self.build_article(
+                    source, entry['title'], entry['summary'], entry['link'], score
+                ))
+        
+        return articles
 
-    def get_wikipedia_content(self, title):
+    def get_wikipedia_content(self, source, title):
         """Получает контент из Wikipedia"""
         try:
-            url = "https://ru.wikipedia.org/w/api.php"
             params = {
                 'action': 'query',
                 'prop': 'extracts',
@@ -223,7 +544,7 @@ class ContentFinder:
                 'format': 'json'
             }
             
-            response = self.session.get(url, params=params, timeout=10)
+            response = self.fetch(source, source.url, params=params)
             data = response.json()
             
             pages = data.get('query', {}).get('pages', {})
@@ -265,13 +586,19 @@ class ContentFinder:
         template = random.choice(templates)
         return template.format(title=title.upper(), content=content)
 
+    def pick_image(self, urls):
+        """Выбирает картинку, избегая недавно использованных"""
+        if self.image_library:
+            return self.image_library.choose(urls)
+        return random.choice(urls)
+
     def get_science_image(self):
         """Возвращает изображение для научных постов"""
         science_images = [
             'https://images.unsplash.com/photo-1532094349884-543bc11b234d?w=500&fit=crop',
             'https://images.unsplash.com/photo-1563089145-599997674d42?w=500&fit=crop',
         ]
-        return random.choice(science_images)
+        return self.pick_image(science_images)
 
     def get_tech_image(self):
         """Возвращает изображение для технологических постов"""
@@ -279,7 +606,7 @@ class ContentFinder:
             'https://images.unsplash.com/photo-1518709268805-4e9042af2176?w=500&fit=crop',
             'https://images.unsplash.com/photo-1517077304055-6e89abbf09b0?w=500&fit=crop',
         ]
-        return random.choice(tech_images)
+        return self.pick_image(tech_images)
 
     def get_historical_image(self):
         """Возвращает изображение для исторических постов"""
@@ -287,17 +614,11 @@ class ContentFinder:
             'https://images.unsplash.com/photo-1481627834876-b7833e8f5570?w=500&fit=crop',
             'https://images.unsplash.com/photo-1589652717521-10c0d092dea9?w=500&fit=crop',
         ]
-        return random.choice(historical_images)
+        return self.pick_image(historical_images)
 
     def is_relevant_content(self, text):
         """Проверяет релевантность контента"""
-        keywords = [
-            'первый', 'первое', 'изобретение', 'открытие', 'революция',
-            'прорыв', 'рекорд', 'история', 'создан', 'разработан',
-            'запущен', 'обнаружен', 'научный', 'технология'
-        ]
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in keywords)
+        return self.relevance.is_relevant(text)
 
     def format_for_preview(self, content):
         """Форматирует контент для предпросмотра"""
@@ -311,6 +632,6 @@ class ContentFinder:
         
         return preview_text
 
-def setup_content_finder(db_manager=None):
+def setup_content_finder(db_manager=None, clock=None, image_library=None):
     """Инициализация системы поиска контента"""
-    return ContentFinder(db_manager)
+    return ContentFinder(db_manager, clock=clock, image_library=image_library)
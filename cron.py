@@ -0,0 +1,106 @@
+# cron.py
+from datetime import datetime, timedelta
+
+# Сокращения для частых расписаний
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+# Сколько вперед искать срабатывание, прежде чем признать выражение невыполнимым
+SEARCH_LIMIT = timedelta(days=366 * 5)
+
+def parse_field(text, low, high):
+    """Разбирает поле cron-выражения: *, списки, диапазоны и шаги"""
+    values = set()
+    for part in text.split(','):
+        expr, has_step, step = part.partition('/')
+        step = int(step) if has_step else 1
+        if step < 1:
+            raise ValueError(f"некорректный шаг в поле cron: {text}")
+
+        if expr == '*':
+            start, end = low, high
+        elif '-' in expr:
+            start, end = (int(value) for value in expr.split('-', 1))
+        else:
+            start = int(expr)
+            # "5/15" означает "с 5 до конца диапазона с шагом 15"
+            end = high if has_step else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"значение вне диапазона {low}-{high} в поле cron: {text}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+class CronSchedule:
+    """Расписание в формате cron: минута час день месяц день_недели.
+
+    День недели: 0 или 7 — воскресенье. Если заданы и день месяца, и день
+    недели, достаточно совпадения любого из них (как в классическом cron).
+    """
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron-выражение должно состоять из 5 полей: {expression}")
+
+        minute, hour, day, month, weekday = fields
+        self.minutes = parse_field(minute, 0, 59)
+        self.hours = parse_field(hour, 0, 23)
+        self.days = parse_field(day, 1, 31)
+        self.months = parse_field(month, 1, 12)
+        self.weekdays = frozenset(value % 7 for value in parse_field(weekday, 0, 7))
+        self.any_day = day == '*'
+        self.any_weekday = weekday == '*'
+
+        # Выражения вроде "0 0 31 2 *" не срабатывают никогда
+        self.next_after(datetime(2000, 1, 1))
+
+    def matches_day(self, moment):
+        """Подходит ли дата по дню месяца и дню недели"""
+        # В cron неделя начинается с воскресенья (0), в Python — с понедельника
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """Ближайшее срабатывание строго после moment (с точностью до минуты)"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + SEARCH_LIMIT
+
+        while candidate <= limit:
+            if candidate.month not in self.months:
+                # Переход на первое число следующего месяца
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self.matches_day(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+
+        raise ValueError(f"cron-выражение никогда не срабатывает: {self.expression}")
+
+    def count_between(self, start, end, limit):
+        """Сколько срабатываний в интервале (start, end], но не больше limit"""
+        count = 0
+        moment = start
+        while count < limit:
+            moment = self.next_after(moment)
+            if moment > end:
+                break
+            count += 1
+        return count
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
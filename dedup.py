@@ -0,0 +1,96 @@
+# dedup.py
+import hashlib
+import heapq
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+def normalize_title(title):
+    """Приводит заголовок к виду для сравнения дубликатов"""
+    return re.sub(r'\s+', ' ', title or '').strip().lower()
+
+def content_fingerprint(title):
+    """Отпечаток контента для проверки дубликатов (MD5 нормализованного заголовка)"""
+    return hashlib.md5(normalize_title(title).encode()).digest()
+
+class FingerprintSet:
+    """Компактное множество отпечатков: отсортированный массив 8-байтовых ключей.
+
+    Из 16-байтового отпечатка хранятся первые 8 байт (8 байт на запись вместо
+    ~100 байт на hex-строку в set), поиск — бинарный. Новые ключи копятся в
+    небольшом буфере и периодически вливаются в массив.
+    """
+
+    MERGE_THRESHOLD = 1024
+
+    def __init__(self):
+        self._sorted = array('Q')
+        self._pending = set()
+        self.load_seconds = 0.0
+
+    @staticmethod
+    def key(fingerprint):
+        """Ключ массива из первых 8 байт отпечатка"""
+        return int.from_bytes(fingerprint[:8], 'big')
+
+    def load(self, fingerprints):
+        """Заполняет множество из потока отпечатков (желательно отсортированного)"""
+        started = time.perf_counter()
+        keys = array('Q')
+        is_sorted = True
+        last = -1
+        for fingerprint in fingerprints:
+            key = self.key(fingerprint)
+            if key == last:
+                continue
+            if key < last:
+                is_sorted = False
+            keys.append(key)
+            last = key
+        
+        if not is_sorted:
+            keys = array('Q', sorted(set(keys)))
+        
+        self._sorted = keys
+        self._pending.clear()
+        self.load_seconds = time.perf_counter() - started
+        return self
+
+    def add(self, fingerprint):
+        """Добавляет отпечаток"""
+        key = self.key(fingerprint)
+        if self._contains_key(key):
+            return
+        self._pending.add(key)
+        if len(self._pending) >= self.MERGE_THRESHOLD:
+            self._merge()
+
+    def _contains_key(self, key):
+        if key in self._pending:
+            return True
+        index = bisect_left(self._sorted, key)
+        return index < len(self._sorted) and self._sorted[index] == key
+
+    def _merge(self):
+        self._sorted = array('Q', heapq.merge(self._sorted, sorted(self._pending)))
+        self._pending.clear()
+
+    def __contains__(self, fingerprint):
+        return self._contains_key(self.key(fingerprint))
+
+    def __len__(self):
+        return len(self._sorted) + len(self._pending)
+
+    def memory_bytes(self):
+        """Примерный объем памяти под ключи"""
+        return self._sorted.buffer_info()[1] * self._sorted.itemsize + sys.getsizeof(self._pending)
+
+    def stats(self):
+        """Метрики индекса дубликатов"""
+        return {
+            'count': len(self),
+            'memory_bytes': self.memory_bytes(),
+            'load_seconds': round(self.load_seconds, 3),
+        }
@@ -0,0 +1,84 @@
+# fanout.py
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Равномерно распределяет вызовы: не больше rate за period секунд"""
+
+    def __init__(self, rate, period=1.0):
+        self.interval = period / rate
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def acquire(self):
+        """Ждет своей очереди; слоты раздаются под блокировкой, сон — без нее"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def retry_after(error):
+    """Сколько секунд ждать после ответа 429 (None, если ошибка другая)"""
+    if getattr(error, 'error_code', None) != 429:
+        return None
+    parameters = (getattr(error, 'result_json', None) or {}).get('parameters') or {}
+    return parameters.get('retry_after', 1)
+
+class FanoutPublisher:
+    """Параллельная рассылка одного поста по нескольким каналам.
+
+    Telegram ограничивает бота примерно 30 сообщениями в секунду в целом
+    и 20 в минуту на канал, поэтому у каждого канала свой RateLimiter,
+    а общий ограничивает бота целиком. Ответ 429 повторяется после retry_after.
+    Лимит 0 или None отключает ограничение.
+    """
+
+    def __init__(self, max_workers=8, global_rate=30, channel_rate=20, max_retries=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fanout')
+        self.global_limiter = RateLimiter(global_rate) if global_rate else None
+        self.channel_rate = channel_rate
+        self.channel_limiters = {}
+        self.lock = threading.Lock()
+        self.max_retries = max_retries
+
+    def limiter_for(self, chat_id, rate=None):
+        """Лимитер канала (rate — сообщений в минуту, по умолчанию channel_rate)"""
+        rate = rate or self.channel_rate
+        if not rate:
+            return None
+        with self.lock:
+            limiter = self.channel_limiters.get(chat_id)
+            if limiter is None or limiter.interval != 60 / rate:
+                limiter = self.channel_limiters[chat_id] = RateLimiter(rate, 60)
+            return limiter
+
+    def call(self, chat_id, send, rate=None):
+        """Вызывает send(chat_id) с учетом лимитов; возвращает (успех, результат или ошибка)"""
+        limiter = self.limiter_for(chat_id, rate)
+        for attempt in range(self.max_retries + 1):
+            if limiter:
+                limiter.acquire()
+            if self.global_limiter:
+                self.global_limiter.acquire()
+            try:
+                return True, send(chat_id)
+            except Exception as e:
+                wait = retry_after(e)
+                if wait is None or attempt == self.max_retries:
+                    return False, e
+                logger.warning(f"⏳ Канал {chat_id}: лимит Telegram, повтор через {wait} с")
+                time.sleep(wait)
+
+    def publish(self, channels, send):
+        """Рассылает по каналам [(chat_id, лимит)] параллельно; возвращает {chat_id: (успех, результат)}"""
+        futures = {
+            chat_id: self.executor.submit(self.call, chat_id, send, rate)
+            for chat_id, rate in channels
+        }
+        return {chat_id: future.result() for chat_id, future in futures.items()}
@@ -0,0 +1,109 @@
+# feed_stream.py
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import feedparser
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Сколько байт ленты читать максимум по умолчанию
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+CHUNK_SIZE = 16 * 1024
+
+def local_name(tag):
+    """Имя тега без пространства имен"""
+    if not isinstance(tag, str):
+        return ''
+    return tag.rsplit('}', 1)[-1]
+
+def parse_date(value):
+    """Дата RSS (RFC 822) или Atom (ISO 8601) -> struct_time в UTC"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return time.gmtime(parsed.timestamp())
+
+def parse_entry(element):
+    """Преобразует <item>/<entry> в словарь с полями как у feedparser"""
+    entry = {}
+    for child in element:
+        name = local_name(child.tag)
+        text = (child.text or '').strip()
+        
+        if name == 'title':
+            entry['title'] = text
+        elif name == 'link':
+            # В Atom ссылка в атрибуте href
+            href = child.get('href')
+            if href and child.get('rel', 'alternate') == 'alternate':
+                entry['link'] = href
+            elif text:
+                entry['link'] = text
+        elif name in ('guid', 'id'):
+            entry['id'] = text
+        elif name in ('description', 'summary'):
+            entry['summary'] = text
+        elif name in ('encoded', 'content') and 'summary' not in entry:
+            entry['summary'] = text
+        elif name in ('pubDate', 'published', 'date'):
+            entry['published_parsed'] = parse_date(text)
+        elif name == 'updated':
+            entry['updated_parsed'] = parse_date(text)
+    return entry
+
+def iter_feed_entries(response, max_bytes=DEFAULT_MAX_BYTES, chunk_size=CHUNK_SIZE):
+    """Потоково разбирает RSS/Atom из ответа requests (stream=True).
+
+    Записи отдаются по мере чтения; разобранные элементы сразу удаляются
+    из дерева. Чтение прекращается, когда потребитель перестает забирать
+    записи или превышен бюджет max_bytes. Если потоковый разбор не нашел
+    ни одной записи, документ (в пределах бюджета) разбирается feedparser.
+    """
+    parser = etree.XMLPullParser(
+        events=('end',), recover=True, resolve_entities=False, no_network=True
+    )
+    received = 0
+    yielded = 0
+    # Буфер нужен только для запасного разбора, пока записей нет
+    buffer = bytearray()
+    
+    try:
+        for chunk in response.iter_content(chunk_size):
+            received += len(chunk)
+            if not yielded:
+                buffer.extend(chunk)
+            parser.feed(chunk)
+            
+            for _, element in parser.read_events():
+                if local_name(element.tag) not in ('item', 'entry'):
+                    continue
+                entry = parse_entry(element)
+                # Освобождаем память: сам элемент и уже разобранных соседей
+                element.clear()
+                parent = element.getparent()
+                while parent is not None and element.getprevious() is not None:
+                    del parent[0]
+                yielded += 1
+                buffer.clear()
+                yield entry
+            
+            if received >= max_bytes:
+                logger.warning(f"⚠️ Лента превысила бюджет {max_bytes} байт, чтение остановлено")
+                break
+        
+        if not yielded and buffer:
+            for entry in feedparser.parse(bytes(buffer)).entries:
+                yield entry
+    finally:
+        response.close()
@@ -0,0 +1,143 @@
+# http_cassette.py
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+import urllib.parse
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Заголовки ответа, которые сохраняются в кассету (тело хранится уже распакованным)
+KEPT_HEADERS = ('content-type', 'last-modified', 'etag')
+
+class CassetteMissError(requests.ConnectionError):
+    """В кассете нет записи для запроса"""
+
+class CassetteResponse:
+    """Ответ, воспроизводимый из кассеты (подмножество requests.Response)"""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.content = content
+
+    @property
+    def encoding(self):
+        content_type = self.headers.get('content-type', '')
+        if 'charset=' in content_type:
+            return content_type.split('charset=')[-1].split(';')[0].strip()
+        return 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        pass
+
+class CassetteSession:
+    """Обертка над requests.Session: запись ответов в файлы и их воспроизведение.
+
+    mode='record' — запросы идут в сеть, ответы сохраняются в directory;
+    mode='replay' — ответы берутся только из directory, с задержкой latency секунд.
+    """
+
+    MODES = ('record', 'replay')
+
+    def __init__(self, mode, directory, latency=0.0, session=None):
+        if mode not in self.MODES:
+            raise ValueError(f"неизвестный режим кассеты: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.latency = latency
+        self.session = session or requests.Session()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def headers(self):
+        return self.session.headers
+
+    @staticmethod
+    def request_key(method, url, params=None):
+        """Имя файла кассеты для запроса"""
+        query = urllib.parse.urlencode(sorted((params or {}).items()), doseq=True)
+        raw = f"{method.upper()} {url}?{query}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def path_for(self, method, url, params=None):
+        parsed = urllib.parse.urlparse(url)
+        host = parsed.netloc.replace(':', '_') or 'local'
+        return os.path.join(self.directory, f"{host}-{self.request_key(method, url, params)}.json")
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def request(self, method, url, params=None, **kwargs):
+        path = self.path_for(method, url, params)
+        if self.mode == 'replay':
+            return self.replay(path, url)
+        return self.record(path, method, url, params, **kwargs)
+
+    def record(self, path, method, url, params, **kwargs):
+        kwargs.pop('stream', None)
+        response = self.session.request(method, url, params=params, **kwargs)
+        entry = {
+            'method': method,
+            'url': url,
+            'params': params,
+            'status_code': response.status_code,
+            'headers': {
+                name: value for name, value in response.headers.items()
+                if name.lower() in KEPT_HEADERS
+            },
+            'body': base64.b64encode(response.content).decode('ascii'),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=1)
+        logger.info(f"📼 Записан ответ {url} -> {os.path.basename(path)}")
+        return self.build_response(entry)
+
+    def replay(self, path, url):
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            raise CassetteMissError(f"нет записи в кассете для {url}")
+        if self.latency:
+            time.sleep(self.latency)
+        return self.build_response(entry)
+
+    @staticmethod
+    def build_response(entry):
+        return CassetteResponse(
+            entry['url'],
+            entry['status_code'],
+            entry['headers'],
+            base64.b64decode(entry['body']),
+        )
+
+def session_from_env(session=None):
+    """Сессия с кассетой, если задан HTTP_CASSETTE_MODE, иначе исходная"""
+    mode = os.getenv('HTTP_CASSETTE_MODE')
+    session = session or requests.Session()
+    if not mode:
+        return session
+    directory = os.getenv('HTTP_CASSETTE_DIR', 'fixtures/http')
+    latency = float(os.getenv('HTTP_CASSETTE_LATENCY', '0'))
+    logger.info(f"📼 HTTP-кассета: {mode}, {directory}")
+    return CassetteSession(mode, directory, latency=latency, session=session)
@@ -0,0 +1,210 @@
+# image_hash.py
+import io
+import logging
+import random
+import threading
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+# Индекс делит хеш на 8 полос по 8 бит: хеши на расстоянии до 7 бит
+# совпадают хотя бы в одной полосе (принцип Дирихле)
+BANDS = 8
+BAND_BITS = HASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+# Изображения, чьи хеши отличаются не больше чем на столько бит, считаются одинаковыми
+MAX_DISTANCE = 6
+
+def dhash(image_data):
+    """Разностный хеш (dHash) изображения: 64 бита, или None, если файл не читается.
+
+    Картинка сжимается до 9x8 в оттенках серого, каждый бит — ярче ли пиксель
+    соседа справа. Пересжатие, другой размер и водяные знаки меняют лишь
+    несколько бит, поэтому близость хешей означает визуальную одинаковость.
+    """
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(image_data)) as image:
+            pixels = image.convert('L').resize((9, 8), Image.LANCZOS).tobytes()
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось посчитать хеш изображения: {e}")
+        return None
+
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left, right = pixels[row * 9 + column], pixels[row * 9 + column + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def hamming(first, second):
+    """Число различающихся бит двух хешей"""
+    return bin(first ^ second).count('1')
+
+def to_signed(value):
+    """Хеш для колонки BIGINT (знаковое 64-битное)"""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+def from_signed(value):
+    """Хеш из колонки BIGINT"""
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+class ImageHashIndex:
+    """Поиск ближайшего хеша по расстоянию Хэмминга без перебора всех хешей"""
+
+    def __init__(self):
+        self.hashes = set()
+        # (номер полосы, значение полосы) -> хеши с таким значением
+        self.bands = {}
+
+    @staticmethod
+    def band_keys(value):
+        return [(band, (value >> (band * BAND_BITS)) & BAND_MASK) for band in range(BANDS)]
+
+    def add(self, value):
+        if value in self.hashes:
+            return
+        self.hashes.add(value)
+        for key in self.band_keys(value):
+            self.bands.setdefault(key, set()).add(value)
+
+    def find(self, value, max_distance=MAX_DISTANCE):
+        """Ближайший известный хеш не дальше max_distance (не больше 7) или None"""
+        if value in self.hashes:
+            return value
+        candidates = set()
+        for key in self.band_keys(value):
+            candidates.update(self.bands.get(key, ()))
+        best, best_distance = None, max_distance + 1
+        for candidate in candidates:
+            distance = hamming(value, candidate)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return best
+
+    def __len__(self):
+        return len(self.hashes)
+
+class ImageLibrary:
+    """Опубликованные изображения: хеши, file_id в Telegram и время последнего использования.
+
+    Визуально одинаковые картинки (разные URL, пересжатие) сводятся к одному
+    хешу: такое изображение загружается в Telegram один раз, дальше отправляется
+    его file_id. Выбор картинки для поста предпочитает давно не использованные.
+    """
+
+    def __init__(self, db_manager, download, clock, max_distance=MAX_DISTANCE):
+        self.db_manager = db_manager
+        self.download = download
+        self.clock = clock
+        self.max_distance = max_distance
+        self.index = ImageHashIndex()
+        # хеш -> file_id и хеш -> время последнего использования
+        self.file_ids = {}
+        self.last_used = {}
+        # URL -> хеш (чтобы не скачивать известную картинку заново)
+        self.url_hashes = {}
+        # URL -> когда выбран для поста (выбор еще не опубликован и не скачан)
+        self.picked = {}
+        self.lock = threading.RLock()
+        self.loaded = False
+
+    def load(self):
+        """Загружает известные изображения из БД при первом обращении"""
+        with self.lock:
+            if self.loaded:
+                return
+            for phash, file_id, last_used_at in self.db_manager.get_images():
+                phash = from_signed(phash)
+                self.index.add(phash)
+                if file_id:
+                    self.file_ids[phash] = file_id
+                if last_used_at:
+                    self.last_used[phash] = last_used_at
+            for url, phash in self.db_manager.get_image_urls().items():
+                self.url_hashes[url] = from_signed(phash)
+                self.index.add(self.url_hashes[url])
+            self.loaded = True
+            logger.info(f"🖼️ Загружено хешей изображений: {len(self.index)}")
+
+    def canonical(self, phash):
+        """Хеш, под которым хранится такая же картинка (сам phash, если похожей нет)"""
+        with self.lock:
+            found = self.index.find(phash, self.max_distance)
+            if found is None:
+                self.index.add(phash)
+                return phash
+            return found
+
+    def learn_url(self, url, image_data):
+        """Хеширует скачанную картинку и запоминает хеш ее URL; возвращает хеш или None"""
+        phash = dhash(image_data)
+        if phash is None:
+            return None
+        phash = self.canonical(phash)
+        with self.lock:
+            self.url_hashes[url] = phash
+        self.db_manager.save_image_url(url, to_signed(phash))
+        return phash
+
+    def prepare(self, url):
+        """Медиа для отправки по URL: (file_id или байты, хеш); (None, None), если не скачалось.
+
+        Уже загруженная в Telegram картинка (по URL или по хешу) отправляется
+        по file_id без повторной загрузки.
+        """
+        self.load()
+        with self.lock:
+            phash = self.url_hashes.get(url)
+            if phash is not None and phash in self.file_ids:
+                return self.file_ids[phash], phash
+
+        image_data = self.download(url)
+        if not image_data:
+            return None, None
+        phash = self.learn_url(url, image_data)
+        with self.lock:
+            if phash is not None and phash in self.file_ids:
+                logger.info(f"♻️ Изображение {url} уже загружено, отправляю по file_id")
+                return self.file_ids[phash], phash
+        return image_data, phash
+
+    def remember(self, phashes, file_ids, urls):
+        """Отмечает изображения опубликованными и сохраняет их file_id (списки одной длины)"""
+        now = self.clock()
+        with self.lock:
+            for phash, file_id in zip(phashes, file_ids):
+                if phash is None:
+                    continue
+                self.file_ids.setdefault(phash, file_id)
+                self.last_used[phash] = now
+        for phash, file_id, url in zip(phashes, file_ids, urls):
+            if phash is not None:
+                self.db_manager.record_image_use(to_signed(phash), url, file_id, now)
+
+    def used_at(self, url):
+        """Когда картинка использовалась последний раз: выбор по URL или публикация (по хешу)"""
+        times = [self.picked.get(url)]
+        phash = self.url_hashes.get(url)
+        if phash is not None:
+            times.append(self.last_used.get(phash))
+            # Визуально такая же картинка под другим URL тоже считается использованной
+            times.extend(self.picked.get(other) for other, other_hash in self.url_hashes.items()
+                         if other_hash == phash)
+        times = [moment for moment in times if moment is not None]
+        return max(times) if times else None
+
+    def choose(self, urls):
+        """Выбирает из вариантов картинку, которая дольше всех не использовалась"""
+        self.load()
+        with self.lock:
+            used = {url: self.used_at(url) for url in urls}
+            # Ни разу не использованные идут первыми
+            never = [url for url in urls if used[url] is None]
+            if never:
+                choice = random.choice(never)
+            else:
+                choice = min(urls, key=lambda url: used[url])
+            # Следующий найденный пост получит другую картинку, даже если этот еще не опубликован
+            self.picked[choice] = self.clock()
+            return choice
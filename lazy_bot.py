@@ -0,0 +1,50 @@
+# lazy_bot.py
+import threading
+
+class LazyBot:
+    """Заместитель TeleBot, который создается при первом обращении.
+
+    Декораторы обработчиков только запоминают регистрации, поэтому модуль
+    с обработчиками импортируется без создания бота и его пула потоков.
+    """
+
+    HANDLER_DECORATORS = ('message_handler', 'callback_query_handler')
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._bot = None
+        self._registrations = []
+        self._lock = threading.Lock()
+
+    def _register(self, decorator_name, kwargs):
+        def decorator(function):
+            with self._lock:
+                self._registrations.append((decorator_name, kwargs, function))
+                bot = self._bot
+            if bot is not None:
+                getattr(bot, decorator_name)(**kwargs)(function)
+            return function
+        return decorator
+
+    def message_handler(self, **kwargs):
+        return self._register('message_handler', kwargs)
+
+    def callback_query_handler(self, **kwargs):
+        return self._register('callback_query_handler', kwargs)
+
+    @property
+    def is_created(self):
+        return self._bot is not None
+
+    def get(self):
+        """Настоящий TeleBot (создается при первом вызове)"""
+        with self._lock:
+            if self._bot is None:
+                bot = self._factory()
+                for decorator_name, kwargs, function in self._registrations:
+                    getattr(bot, decorator_name)(**kwargs)(function)
+                self._bot = bot
+            return self._bot
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
@@ -0,0 +1,76 @@
+# message_layout.py
+import re
+
+# Лимиты Telegram считаются в единицах UTF-16 (эмодзи вне BMP занимают две)
+CAPTION_LIMIT = 1024
+MESSAGE_LIMIT = 4096
+
+# Границы разбиения от лучшей к худшей: абзац, строка, предложение, слово
+BOUNDARIES = [
+    re.compile(r'\n\s*\n'),
+    re.compile(r'\n'),
+    re.compile(r'(?<=[.!?…])\s+'),
+    re.compile(r'\s+'),
+]
+# Граница раньше этой доли лимита оставляет часть полупустой: пробуется более мелкая
+MIN_FILL = 0.5
+
+def utf16_len(text):
+    """Длина текста так, как ее считает Telegram"""
+    return len(text.encode('utf-16-le')) // 2
+
+def fitting_prefix(text, limit):
+    """Сколько первых символов text помещается в limit единиц UTF-16"""
+    if utf16_len(text) <= limit:
+        return len(text)
+    # Символ занимает одну или две единицы, поэтому ответ не меньше limit // 2
+    low, high = limit // 2, min(len(text), limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if utf16_len(text[:middle]) <= limit:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def split_head(text, limit):
+    """Отрезает начало text не длиннее limit по лучшей доступной границе: (начало, остаток)"""
+    end = fitting_prefix(text, limit)
+    if end == len(text):
+        return text, ''
+    window = text[:end + 1]
+    min_start = int(end * MIN_FILL)
+    for boundary in BOUNDARIES:
+        # Последняя граница в окне, если она не в начале части
+        cut = None
+        for match in boundary.finditer(window):
+            if match.start() > 0:
+                cut = match
+        if cut is not None and cut.start() >= min_start:
+            return text[:cut.start()].rstrip(), text[cut.end():].lstrip()
+    # Без подходящей границы (сплошной текст) режем по лимиту
+    return text[:end], text[end:]
+
+def split_message(text, limit=MESSAGE_LIMIT):
+    """Делит текст на части не длиннее limit, по возможности на границах абзацев"""
+    parts = []
+    rest = text.strip()
+    while rest:
+        head, rest = split_head(rest, limit)
+        parts.append(head)
+    return parts
+
+def layout_post(text, with_media=False):
+    """Раскладка поста по сообщениям с учетом лимитов: (подпись к медиа, тексты после него).
+
+    Без медиа подпись всегда None. С медиа в подпись идет как можно большее
+    начало текста, остаток — минимальным числом текстовых сообщений, поэтому
+    пост уходит за минимум вызовов и ни один не упирается в лимит.
+    """
+    text = (text or '').strip()
+    if not with_media:
+        return None, split_message(text)
+    if not text:
+        return None, []
+    caption, rest = split_head(text, CAPTION_LIMIT)
+    return caption, split_message(rest)
@@ -0,0 +1,260 @@
+# metrics.py
+import functools
+import inspect
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric(ABC):
+    """Метрика с метками; значения хранятся по кортежу значений меток"""
+
+    TYPE = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.lock:
+            child = self.children.get(key)
+            if child is None:
+                child = self.children[key] = self.new_child()
+            return child
+
+    @abstractmethod
+    def new_child(self):
+        """Значение для нового набора меток"""
+
+    @abstractmethod
+    def render_child(self, key, child):
+        """Строки экспозиции одного набора меток"""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+        with self.lock:
+            children = list(self.children.items())
+        for key, child in children:
+            lines.extend(self.render_child(key, child))
+        return lines
+
+class CounterChild:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+
+    TYPE = 'counter'
+
+    def new_child(self):
+        return CounterChild()
+
+    def inc(self, amount=1, **labels):
+        self.labels(**labels).inc(amount)
+
+    def render_child(self, key, child):
+        return [f"{self.name}{format_labels(self.labelnames, key)} {format_value(child.value)}"]
+
+class GaugeChild(CounterChild):
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+class Gauge(Counter):
+    """Текущее значение (глубина очереди и т.п.)"""
+
+    TYPE = 'gauge'
+
+    def new_child(self):
+        return GaugeChild()
+
+    def set(self, value, **labels):
+        self.labels(**labels).set(value)
+
+class HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.sum += value
+            self.count += 1
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+class Histogram(Metric):
+    """Гистограмма с накопительными корзинами"""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value, **labels):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels):
+        return self.labels(**labels).time()
+
+    def render_child(self, key, child):
+        with child.lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = format_labels(self.labelnames, key, [('le', format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    """Набор метрик процесса"""
+
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+def counter(name, help, labelnames=()):
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+def gauge(name, help, labelnames=()):
+    return REGISTRY.register(Gauge(name, help, labelnames))
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+# Метрики горячих путей
+FEED_FETCH_SECONDS = histogram('bot_feed_fetch_seconds', 'Время HTTP-запроса к источнику', ['source'])
+FEED_FETCH_ERRORS = counter('bot_feed_fetch_errors_total', 'Ошибки запросов к источникам', ['source'])
+DB_QUERY_SECONDS = histogram('bot_db_query_seconds', 'Время методов DatabaseManager', ['method'])
+DB_QUERY_ERRORS = counter('bot_db_query_errors_total', 'Ошибки запросов в методах DatabaseManager', ['method'])
+TELEGRAM_CALL_SECONDS = histogram('bot_telegram_call_seconds', 'Время вызовов Telegram Bot API', ['method'])
+TELEGRAM_CALL_ERRORS = counter('bot_telegram_call_errors_total', 'Ошибки вызовов Telegram Bot API', ['method', 'code'])
+IMAGE_DOWNLOAD_SECONDS = histogram('bot_image_download_seconds', 'Время загрузки изображений')
+IMAGE_DOWNLOAD_BYTES = counter('bot_image_download_bytes_total', 'Скачано байт изображений')
+SCHEDULER_LAG_SECONDS = histogram(
+    'bot_scheduler_lag_seconds', 'Опоздание публикации относительно scheduled_time',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900, 3600)
+)
+QUEUE_DEPTH = gauge('bot_queue_depth', 'Размер очередей', ['queue'])
+STARTUP_SECONDS = gauge('bot_startup_seconds', 'Длительность этапов запуска', ['phase'])
+
+def instrument_methods(cls, exclude=(), scope=None):
+    """Оборачивает публичные методы класса в DB_QUERY_SECONDS.
+
+    scope(self, name) — контекстный менеджер вокруг каждого вызова. Методы
+    DatabaseManager перехватывают свои исключения, поэтому ошибки считает
+    он, а не обертка.
+    """
+    for name, func in list(vars(cls).items()):
+        if name.startswith('_') or name in exclude or not inspect.isfunction(func):
+            continue
+        if inspect.isgeneratorfunction(func):
+            continue
+        
+        def wrap(func):
+            name = func.__name__
+            histogram_child = DB_QUERY_SECONDS.labels(method=name)
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    if scope is None:
+                        return func(*args, **kwargs)
+                    with scope(args[0], name):
+                        return func(*args, **kwargs)
+                finally:
+                    histogram_child.observe(time.perf_counter() - started)
+            return wrapper
+        
+        setattr(cls, name, wrap(func))
+    return cls
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Запускает HTTP-эндпоинт /metrics в фоновом потоке"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"📈 Метрики доступны на http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,294 @@
+# migrations.py
+import logging
+from dedup import content_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки: миграции двух реплик не должны идти одновременно
+MIGRATION_LOCK_ID = 5461001
+# Сколько строк пересчитывается за один запрос при заполнении отпечатков
+FINGERPRINT_BATCH_SIZE = 1000
+
+def backfill_fingerprints(cursor, table, batch_size=FINGERPRINT_BATCH_SIZE):
+    """Заполняет недостающие fingerprint строк table через content_fingerprint(); возвращает число строк.
+
+    Отпечаток считается в Python, а не выражением SQL: нормализация пробелов
+    и регистра в PostgreSQL зависит от локали и не видит Unicode-пробелы,
+    и отпечатки из миграции не совпадали бы с отпечатками новых записей.
+    """
+    from psycopg2.extras import execute_values
+    last_id, updated = 0, 0
+    while True:
+        cursor.execute(
+            f'SELECT id, title FROM {table} WHERE id > %s AND fingerprint IS NULL ORDER BY id LIMIT %s',
+            (last_id, batch_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return updated
+        execute_values(cursor, f'''
+            UPDATE {table} AS t SET fingerprint = v.fingerprint
+            FROM (VALUES %s) AS v (id, fingerprint)
+            WHERE t.id = v.id
+        ''', [(row_id, content_fingerprint(title)) for row_id, title in rows])
+        last_id = rows[-1][0]
+        updated += len(rows)
+
+def create_base_tables(cursor):
+    """Таблицы запланированных постов и найденного контента"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scheduled_posts (
+            id SERIAL PRIMARY KEY,
+            message_text TEXT,
+            scheduled_time TIMESTAMP,
+            is_published BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS found_content (
+            id SERIAL PRIMARY KEY,
+            title TEXT,
+            content TEXT,
+            category VARCHAR(50),
+            url TEXT,
+            image_url TEXT,
+            is_approved BOOLEAN DEFAULT FALSE,
+            is_published BOOLEAN DEFAULT FALSE,
+            found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Индексы для ускорения поиска дубликатов
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_found_content_title ON found_content(title)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_found_content_found_at ON found_content(found_at)')
+
+def create_search_indexes(cursor):
+    """Триграммные GIN-индексы для поиска и проверки дубликатов"""
+    # Расширение может быть недоступно без прав суперпользователя,
+    # поэтому ошибка не должна откатывать остальные миграции
+    cursor.execute('SAVEPOINT search_indexes')
+    try:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_found_content_title_trgm ON found_content USING gin (title gin_trgm_ops)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_found_content_content_trgm ON found_content USING gin (content gin_trgm_ops)')
+        cursor.execute('RELEASE SAVEPOINT search_indexes')
+    except Exception as e:
+        cursor.execute('ROLLBACK TO SAVEPOINT search_indexes')
+        logger.warning(f"⚠️ pg_trgm недоступен, поиск без индекса: {e}")
+
+def add_archive_and_fingerprints(cursor):
+    """Отклонение без удаления, отпечатки, архив и надгробия"""
+    cursor.execute('ALTER TABLE found_content ADD COLUMN IF NOT EXISTS is_rejected BOOLEAN DEFAULT FALSE')
+    cursor.execute('ALTER TABLE found_content ADD COLUMN IF NOT EXISTS fingerprint BYTEA')
+    backfill_fingerprints(cursor, 'found_content')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_found_content_fingerprint ON found_content(fingerprint)')
+    
+    # Архив старого контента (без индексов для поиска)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS found_content_archive (
+            id INTEGER PRIMARY KEY,
+            title TEXT,
+            content TEXT,
+            category VARCHAR(50),
+            url TEXT,
+            image_url TEXT,
+            is_approved BOOLEAN,
+            is_published BOOLEAN,
+            is_rejected BOOLEAN,
+            fingerprint BYTEA,
+            found_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Отпечатки заархивированного контента для проверки дубликатов
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS content_tombstones (
+            fingerprint BYTEA PRIMARY KEY,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def create_source_cursors(cursor):
+    """Курсоры источников: последняя обработанная запись ленты"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS source_cursors (
+            source VARCHAR(100) PRIMARY KEY,
+            last_guid TEXT,
+            last_published TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def create_content_candidates(cursor):
+    """Релевантные записи лент, не вошедшие в отбор: ждут следующего поиска"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS content_candidates (
+            fingerprint BYTEA PRIMARY KEY,
+            payload JSONB NOT NULL,
+            score REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def create_crawl_runs(cursor):
+    """Расписание обхода источников: время прошлого и следующего опроса"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_runs (
+            source VARCHAR(100) PRIMARY KEY,
+            last_run_at TIMESTAMP,
+            next_run_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def add_recurring_posts(cursor):
+    """Повторяющиеся посты: период и время последней публикации"""
+    cursor.execute('ALTER TABLE scheduled_posts ADD COLUMN IF NOT EXISTS repeat VARCHAR(10)')
+    cursor.execute('ALTER TABLE scheduled_posts ADD COLUMN IF NOT EXISTS last_published_at TIMESTAMP')
+
+def add_post_media(cursor):
+    """file_id фото запланированных постов (загружены в Telegram заранее)"""
+    cursor.execute('ALTER TABLE scheduled_posts ADD COLUMN IF NOT EXISTS media_file_ids TEXT[]')
+
+def create_channels(cursor):
+    """Реестр каналов для рассылки и статус доставки в каждый канал"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS channels (
+            chat_id VARCHAR(64) PRIMARY KEY,
+            title TEXT,
+            categories TEXT[],
+            rate_per_minute INTEGER,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # ref — что публиковалось: post:<id>:<время>, content:<id>, album:<ids>, manual:<чат>:<сообщение>
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS deliveries (
+            ref VARCHAR(200),
+            chat_id VARCHAR(64),
+            status VARCHAR(10),
+            error TEXT,
+            attempts INTEGER DEFAULT 1,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (ref, chat_id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_deliveries_updated_at ON deliveries(updated_at)')
+    
+    # Публикация, которую не удалось доставить ни после одной попытки, снимается с очереди
+    cursor.execute('ALTER TABLE scheduled_posts ADD COLUMN IF NOT EXISTS delivery_failed BOOLEAN DEFAULT FALSE')
+    cursor.execute('ALTER TABLE found_content ADD COLUMN IF NOT EXISTS delivery_failed BOOLEAN DEFAULT FALSE')
+
+def add_moderation_queue(cursor):
+    """Отдельный флаг подборки и частичный индекс очереди модерации"""
+    cursor.execute('ALTER TABLE found_content ADD COLUMN IF NOT EXISTS in_album BOOLEAN DEFAULT FALSE')
+    # Ранее подборкой считался любой одобренный, но не опубликованный контент
+    cursor.execute('''
+        UPDATE found_content SET in_album = TRUE
+        WHERE is_approved = TRUE AND is_published = FALSE AND is_rejected = FALSE
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_found_content_pending ON found_content(id)
+        WHERE is_approved = FALSE AND is_published = FALSE AND is_rejected = FALSE
+    ''')
+
+def create_conversation_state(cursor):
+    """Состояние диалогов с TTL, общее для реплик бота"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_state (
+            namespace VARCHAR(50) NOT NULL,
+            key VARCHAR(100) NOT NULL,
+            value JSONB NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (namespace, key)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_conversation_state_expires ON conversation_state(expires_at)')
+
+def create_images(cursor):
+    """Перцептивные хеши опубликованных изображений и их file_id"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS images (
+            phash BIGINT PRIMARY KEY,
+            url TEXT,
+            file_id TEXT,
+            uses INTEGER DEFAULT 0,
+            last_used_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS image_urls (
+            url TEXT PRIMARY KEY,
+            phash BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+# Версия -> миграция; новые миграции добавляются только в конец
+MIGRATIONS = [
+    (1, create_base_tables),
+    (2, create_search_indexes),
+    (3, add_archive_and_fingerprints),
+    (4, create_source_cursors),
+    (5, create_content_candidates),
+    (6, create_crawl_runs),
+    (7, add_recurring_posts),
+    (8, add_post_media),
+    (9, create_channels),
+    (10, add_moderation_queue),
+    (11, create_conversation_state),
+    (12, create_images),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(cursor):
+    """Текущая версия схемы (0, если миграции еще не применялись)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_migrations')
+    return cursor.fetchone()[0]
+
+def apply_migrations(conn):
+    """Применяет недостающие миграции; возвращает число примененных"""
+    cursor = conn.cursor()
+    
+    # Быстрый путь: схема уже актуальна, блокировка не нужна
+    if get_schema_version(cursor) >= LATEST_VERSION:
+        conn.commit()
+        return 0
+    
+    cursor.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
+    # Пока ждали блокировку, миграции могла применить другая реплика
+    current = get_schema_version(cursor)
+    
+    applied = 0
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        migration(cursor)
+        cursor.execute('INSERT INTO schema_migrations (version) VALUES (%s)', (version,))
+        logger.info(f"🧱 Применена миграция {version}: {migration.__doc__}")
+        applied += 1
+    
+    conn.commit()
+    return applied
+
+def has_extension(conn, name):
+    """Установлено ли расширение PostgreSQL"""
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM pg_extension WHERE extname = %s', (name,))
+    result = cursor.fetchone() is not None
+    conn.commit()
+    return result
@@ -0,0 +1,128 @@
+# post_schedule.py
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from message_layout import MESSAGE_LIMIT, utf16_len
+
+# Формат времени в расписании, как в /schedule
+TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# Период повторяющихся постов
+REPEATS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+REPEAT_TITLES = {
+    'daily': 'ежедневно',
+    'weekly': 'еженедельно',
+}
+
+# Ограничения импорта
+MAX_IMPORT_BYTES = 1024 * 1024
+MAX_IMPORT_ROWS = 5000
+# Длина поста в единицах UTF-16, как ее считает Telegram
+MAX_POST_LENGTH = MESSAGE_LIMIT
+# Больше 10 элементов в одном альбоме Telegram не принимает
+MAX_ALBUM_SIZE = 10
+
+def next_occurrence(scheduled_time, repeat, now):
+    """Ближайшее время повторяющегося поста строго после now (пропущенные повторы не догоняются)"""
+    period = REPEATS[repeat]
+    if scheduled_time > now:
+        return scheduled_time
+    steps = (now - scheduled_time) // period + 1
+    return scheduled_time + period * steps
+
+def parse_repeat(value):
+    """Нормализует поле repeat: None для разового поста"""
+    value = (value or '').strip().lower()
+    if not value or value == 'once':
+        return None
+    if value not in REPEATS:
+        raise ValueError(f"неизвестный повтор «{value}» (допустимо: {', '.join(REPEATS)})")
+    return value
+
+def parse_images(value):
+    """Ссылки на изображения: список в JSON или строка через пробел в CSV"""
+    if not value:
+        return []
+    urls = value.split() if isinstance(value, str) else list(value)
+    if len(urls) > MAX_ALBUM_SIZE:
+        raise ValueError(f"больше {MAX_ALBUM_SIZE} изображений")
+    for url in urls:
+        if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            raise ValueError(f"некорректная ссылка на изображение «{url}»")
+    return urls
+
+def validate_row(row, now):
+    """Проверяет одну запись импорта и возвращает (текст, время, повтор, изображения)"""
+    text = (row.get('text') or '').strip()
+    images = parse_images(row.get('images'))
+    if not text and not images:
+        raise ValueError("пустой текст")
+    if utf16_len(text) > MAX_POST_LENGTH:
+        raise ValueError(f"текст длиннее {MAX_POST_LENGTH} символов")
+
+    time_str = (row.get('time') or '').strip()
+    try:
+        scheduled_time = datetime.strptime(time_str, TIME_FORMAT)
+    except ValueError:
+        raise ValueError(f"неверное время «{time_str}», нужно ГГГГ-ММ-ДД ЧЧ:ММ")
+
+    repeat = parse_repeat(row.get('repeat'))
+    if repeat:
+        # Первый повтор может быть в прошлом: сдвигаем на ближайший будущий
+        scheduled_time = next_occurrence(scheduled_time, repeat, now)
+    elif scheduled_time <= now:
+        raise ValueError("время в прошлом")
+
+    return text, scheduled_time, repeat, images
+
+def read_rows(data, filename):
+    """Читает записи из CSV (колонки text,time,repeat,images) или JSON (список объектов)"""
+    if filename.lower().endswith('.json'):
+        rows = json.loads(data.decode('utf-8-sig'))
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("JSON должен быть списком объектов {text, time, repeat, images}")
+        # Номер записи начиная с 1
+        return list(enumerate(rows, start=1))
+
+    reader = csv.DictReader(io.StringIO(data.decode('utf-8-sig')))
+    missing = {'text', 'time'} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"в CSV нет колонок: {', '.join(sorted(missing))}")
+    # Номер строки файла (первая строка — заголовок)
+    return [(reader.line_num, row) for row in reader]
+
+def parse_schedule_document(data, filename, now):
+    """Разбирает файл расписания.
+
+    Возвращает (posts, errors): posts — список (текст, время, повтор, изображения),
+    errors — список строк «номер: причина». Файл принимается целиком или
+    не принимается вовсе, поэтому при ошибках posts не сохраняются.
+    """
+    if len(data) > MAX_IMPORT_BYTES:
+        return [], [f"файл больше {MAX_IMPORT_BYTES // 1024} КБ"]
+
+    try:
+        rows = read_rows(data, filename)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return [], [str(e)]
+
+    if len(rows) > MAX_IMPORT_ROWS:
+        return [], [f"больше {MAX_IMPORT_ROWS} записей"]
+
+    posts = []
+    errors = []
+    for number, row in rows:
+        try:
+            posts.append(validate_row(row, now))
+        except (ValueError, AttributeError, TypeError) as e:
+            errors.append(f"{number}: {e}")
+
+    if not posts and not errors:
+        errors.append("файл не содержит записей")
+    return posts, errors
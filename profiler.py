@@ -0,0 +1,86 @@
+# profiler.py
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+class HandlerTimings:
+    """Кольцевые буферы длительностей обработчиков по маршрутам"""
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def record(self, route, seconds):
+        with self.lock:
+            buffer = self.timings.get(route)
+            if buffer is None:
+                buffer = self.timings[route] = deque(maxlen=self.size)
+            buffer.append(seconds)
+
+    def summary(self):
+        """{маршрут: {'count', 'p50', 'p95', 'p99'}} в секундах"""
+        with self.lock:
+            snapshot = {route: sorted(buffer) for route, buffer in self.timings.items()}
+        result = {}
+        for route, values in snapshot.items():
+            if not values:
+                continue
+            def pick(q):
+                return values[min(len(values) - 1, int(q * len(values)))]
+            result[route] = {'count': len(values), 'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99)}
+        return result
+
+def timed_handler(function, timings, route):
+    """Обертка обработчика, записывающая его длительность"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings.record(route, time.perf_counter() - started)
+    return wrapper
+
+def instrument_handlers(bot, timings):
+    """Оборачивает все зарегистрированные message/callback-обработчики бота"""
+    for handlers, kind in ((bot.message_handlers, 'message'), (bot.callback_query_handlers, 'callback')):
+        for handler in handlers:
+            function = handler['function']
+            route = f"{kind}:{function.__name__}"
+            handler['function'] = timed_handler(function, timings, route)
+
+def sample_threads(seconds, interval=0.005, exclude_current=True):
+    """Сэмплирует стеки всех потоков; возвращает Counter свернутых стеков.
+
+    Формат строк совместим с flamegraph.pl и speedscope:
+    "поток;файл:функция;... количество".
+    """
+    samples = Counter()
+    current = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if exclude_current and ident == current:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            samples[';'.join(reversed(stack))] += 1
+        time.sleep(interval)
+    return samples
+
+def write_folded(samples, path):
+    """Записывает свернутые стеки в файл"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
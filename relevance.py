@@ -0,0 +1,84 @@
+# relevance.py
+import re
+
+# Ключевые слова и их веса; слова приводятся к основе, поэтому
+# "открытие", "открытия" и "открытый" засчитываются одинаково
+DEFAULT_KEYWORDS = {
+    'первый': 2.0,
+    'изобретение': 2.0,
+    'открытие': 2.0,
+    'революция': 1.5,
+    'прорыв': 1.5,
+    'рекорд': 1.5,
+    'история': 1.0,
+    'создан': 1.0,
+    'разработан': 1.0,
+    'запущен': 1.0,
+    'обнаружен': 1.0,
+    'научный': 1.0,
+    'технология': 1.0,
+}
+
+# Окончания и словообразовательные суффиксы (от длинных к коротким)
+RUSSIAN_ENDINGS = sorted([
+    'ение', 'ения', 'ению', 'ением', 'ании', 'ание', 'ания',
+    'ость', 'ости', 'остью',
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ия', 'ие', 'ий', 'ый', 'ой', 'ая', 'яя', 'ое', 'ее', 'ые', 'ых', 'их',
+    'ым', 'им', 'ом', 'ем', 'ую', 'юю', 'ах', 'ях', 'ам', 'ям', 'ов', 'ев', 'ей', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь',
+], key=len, reverse=True)
+
+MIN_STEM_LENGTH = 4
+
+def normalize(text):
+    """Нижний регистр и ё -> е"""
+    return text.lower().replace('ё', 'е')
+
+def stem(word):
+    """Упрощенный стеммер для русского: отрезает одно окончание"""
+    word = normalize(word)
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+class RelevanceScorer:
+    """Оценка релевантности одним проходом скомпилированного регулярного выражения"""
+
+    def __init__(self, keywords=None, title_weight=2.0, threshold=1.0):
+        keywords = DEFAULT_KEYWORDS if keywords is None else keywords
+        
+        # Основа -> вес (при совпадении основ берется максимальный вес)
+        self.weights = {}
+        for keyword, weight in keywords.items():
+            key = stem(keyword)
+            self.weights[key] = max(weight, self.weights.get(key, 0))
+        
+        self.title_weight = title_weight
+        self.threshold = threshold
+        
+        alternatives = sorted(self.weights, key=len, reverse=True)
+        # Основа в начале слова + любое окончание
+        self.pattern = re.compile(
+            r'\b(' + '|'.join(map(re.escape, alternatives)) + r')\w*'
+        ) if alternatives else None
+
+    def matches(self, text):
+        """Множество основ ключевых слов, встретившихся в тексте"""
+        if not self.pattern or not text:
+            return set()
+        return {match.group(1) for match in self.pattern.finditer(normalize(text))}
+
+    def score(self, title, text=''):
+        """Суммарный вес найденных ключевых слов; совпадения в заголовке весомее"""
+        title_stems = self.matches(title)
+        text_stems = self.matches(text) - title_stems
+        return (
+            sum(self.weights[key] for key in title_stems) * self.title_weight
+            + sum(self.weights[key] for key in text_stems)
+        )
+
+    def is_relevant(self, title, text=''):
+        """Проходит ли материал порог релевантности"""
+        return self.score(title, text) >= self.threshold
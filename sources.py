@@ -0,0 +1,242 @@
+# sources.py
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import timedelta
+from cron import CronSchedule
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sources.json')
+
+class Source:
+    """Источник контента, описанный в конфигурации.
+
+    Помимо настроек хранит состояние опроса. Время следующего опроса задает
+    cron-выражение, а без него — интервал, который подстраивается под частоту
+    появления новых записей в пределах [min_interval, max_interval].
+    К моменту опроса добавляется случайный сдвиг до jitter_minutes.
+    Ошибка удлиняет интервал так же, как опрос без новых записей, а после
+    серии ошибок срабатывает предохранитель с экспоненциально растущей
+    паузой, раньше конца которой опрос не назначается.
+    """
+
+    TYPES = ('rss', 'wikipedia', 'html')
+
+    # Множители интервала, когда новые записи появились / не появились
+    SPEEDUP = 0.75
+    SLOWDOWN = 1.5
+    # Сглаживание средней задержки
+    LATENCY_ALPHA = 0.3
+
+    def __init__(self, name, type, url, category, template=None,
+                 interval_minutes=720, min_interval_minutes=None, max_interval_minutes=None,
+                 concurrency=1, timeout=10, max_entries=20, max_kilobytes=2048,
+                 failure_threshold=3, cooldown_minutes=15, max_cooldown_minutes=1440,
+                 cron=None, jitter_minutes=0, max_catchup=3, enabled=True, **options):
+        if type not in self.TYPES:
+            raise ValueError(f"неизвестный тип источника: {type}")
+        
+        self.name = name
+        self.type = type
+        self.url = url
+        self.category = category
+        # Шаблон оформления поста: science / technology / history
+        self.template = template or category
+        self.interval = interval_minutes * 60
+        self.min_interval = (min_interval_minutes or interval_minutes / 4) * 60
+        self.max_interval = (max_interval_minutes or interval_minutes * 4) * 60
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.max_entries = max_entries
+        # Бюджет чтения ленты
+        self.max_bytes = max_kilobytes * 1024
+        self.enabled = enabled
+        # Параметры конкретного типа (query, селекторы HTML и т.п.)
+        self.options = options
+        
+        # Ограничение одновременных запросов к источнику
+        self.semaphore = threading.BoundedSemaphore(self.concurrency)
+        
+        # Расписание (время по часам бота, без часового пояса)
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter_minutes * 60
+        # Сколько пропущенных окон расписания догоняется за один опрос
+        self.max_catchup = max(1, int(max_catchup))
+        self.last_run = None
+        # None — опросить при первой возможности
+        self.next_run = None
+        self.catchup = 1
+        
+        # Предохранитель
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown_minutes * 60
+        self.max_cooldown = max_cooldown_minutes * 60
+        self.open_until = None
+        
+        # Статистика опросов
+        self.polls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.avg_latency = None
+        self.new_entries = 0
+        self.total_new_entries = 0
+        self.last_error = None
+
+    def is_due(self, now):
+        """Пора ли опрашивать источник"""
+        return self.next_run is None or now >= self.next_run
+
+    def is_open(self, now=None):
+        """Сработал ли предохранитель (источник временно пропускается)"""
+        if self.open_until is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now < self.open_until
+
+    def seconds_until_due(self, now):
+        """Сколько секунд до следующего опроса (по расписанию и по предохранителю)"""
+        due = 0 if self.next_run is None else max(0, (self.next_run - now).total_seconds())
+        if self.is_open():
+            due = max(due, self.open_until - time.monotonic())
+        return due
+
+    def missed_windows(self, now):
+        """Сколько окон расписания прошло с прошлого опроса (не больше max_catchup + 1)"""
+        if self.last_run is None:
+            return 1
+        limit = self.max_catchup + 1
+        if self.cron:
+            return self.cron.count_between(self.last_run, now, limit)
+        return min(limit, int((now - self.last_run).total_seconds() // self.interval))
+
+    def start_run(self, now):
+        """Отмечает начало опроса и решает, сколько пропущенных окон догонять"""
+        missed = self.missed_windows(now)
+        if missed > self.max_catchup:
+            logger.warning(
+                f"⏭️ Источник {self.name}: пропущено больше {self.max_catchup} окон, "
+                f"догоняются только последние {self.max_catchup}"
+            )
+        elif missed > 1:
+            logger.info(f"⏪ Источник {self.name}: догоняю {missed} пропущенных окон")
+        self.catchup = max(1, min(self.max_catchup, missed))
+        self.last_run = now
+
+    def entry_limit(self):
+        """Сколько записей можно взять за текущий опрос с учетом догоняемых окон"""
+        return self.max_entries * self.catchup
+
+    def schedule_next(self, now):
+        """Назначает следующий опрос по cron или интервалу, со случайным сдвигом"""
+        if self.cron:
+            next_run = self.cron.next_after(now)
+        else:
+            next_run = now + timedelta(seconds=self.interval)
+        if self.jitter:
+            next_run += timedelta(seconds=random.uniform(0, self.jitter))
+        if self.is_open():
+            # Раньше конца паузы предохранителя опрашивать бессмысленно
+            next_run = max(next_run, now + timedelta(seconds=self.open_until - time.monotonic()))
+        self.next_run = next_run
+
+    def restore_run(self, last_run, next_run):
+        """Восстанавливает время прошлого и следующего опроса после перезапуска"""
+        self.last_run = last_run
+        self.next_run = next_run
+        if next_run is None and last_run is not None:
+            self.schedule_next(last_run)
+
+    def _observe_latency(self, latency):
+        if self.avg_latency is None:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += self.LATENCY_ALPHA * (latency - self.avg_latency)
+
+    def record_success(self, latency, new_entries):
+        """Учитывает успешный опрос и подстраивает интервал под частоту обновлений"""
+        self.polls += 1
+        self.consecutive_failures = 0
+        self.open_until = None
+        self.last_error = None
+        self._observe_latency(latency)
+        self.total_new_entries += new_entries
+        
+        factor = self.SPEEDUP if new_entries else self.SLOWDOWN
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval * factor))
+
+    def record_failure(self, latency, error, now=None):
+        """Учитывает ошибку; после серии ошибок размыкает предохранитель"""
+        self.polls += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        self._observe_latency(latency)
+        # Недоступный источник опрашивается все реже, как источник без новых записей
+        self.interval = min(self.max_interval, self.interval * self.SLOWDOWN)
+        
+        if self.consecutive_failures >= self.failure_threshold:
+            now = time.monotonic() if now is None else now
+            exponent = self.consecutive_failures - self.failure_threshold
+            cooldown = min(self.max_cooldown, self.cooldown * (2 ** exponent))
+            self.open_until = now + cooldown
+            logger.warning(
+                f"⚡ Источник {self.name} отключен на {int(cooldown // 60)} мин "
+                f"после {self.consecutive_failures} ошибок подряд"
+            )
+
+    def success_rate(self):
+        """Доля успешных опросов"""
+        if not self.polls:
+            return 1.0
+        return (self.polls - self.failures) / self.polls
+
+    def health(self):
+        """Сводка состояния источника"""
+        return {
+            'name': self.name,
+            'open': self.is_open(),
+            'success_rate': round(self.success_rate(), 2),
+            'avg_latency': round(self.avg_latency, 2) if self.avg_latency is not None else None,
+            'interval_minutes': round(self.interval / 60),
+            'cron': self.cron.expression if self.cron else None,
+            'next_run': self.next_run,
+            'polls': self.polls,
+            'new_per_poll': round(self.total_new_entries / self.polls, 1) if self.polls else 0,
+            'last_error': self.last_error,
+        }
+
+    def __repr__(self):
+        return f"Source({self.name!r}, {self.type!r})"
+
+def load_sources(path=None):
+    """Загружает реестр источников из JSON-файла"""
+    path = path or os.getenv('SOURCES_CONFIG') or DEFAULT_SOURCES_PATH
+    
+    try:
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+    except Exception as e:
+        logger.error(f"❌ Не удалось прочитать конфигурацию источников {path}: {e}")
+        return []
+    
+    # Общие cron-расписания по категориям: {"history": "0 9 * * *"}
+    schedules = config.get('schedules', {})
+    
+    sources = []
+    for item in config.get('sources', []):
+        if 'cron' not in item and item.get('category') in schedules:
+            item = dict(item, cron=schedules[item['category']])
+        try:
+            source = Source(**item)
+        except (TypeError, ValueError) as e:
+            logger.error(f"❌ Некорректный источник {item.get('name')}: {e}")
+            continue
+        if source.enabled:
+            sources.append(source)
+    
+    logger.info(f"✅ Загружено источников: {len(sources)}")
+    return sources
@@ -0,0 +1,283 @@
+# state_store.py
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Незавершенный диалог живет сутки
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_SIZE = 10000
+
+class StateStore(ABC):
+    """Хранилище состояния диалогов: ключ (chat_id) -> JSON-значение.
+
+    Значения истекают через ttl секунд, число ключей ограничено max_size.
+    None означает отсутствие значения. Переходы между состояниями, которые
+    могут идти параллельно, делаются через compare_and_set.
+    """
+
+    @abstractmethod
+    def get(self, key, default=None):
+        """Значение ключа или default"""
+
+    @abstractmethod
+    def set(self, key, value):
+        """Записывает значение (None удаляет ключ)"""
+
+    @abstractmethod
+    def pop(self, key, default=None):
+        """Удаляет значение и возвращает его (атомарно)"""
+
+    @abstractmethod
+    def compare_and_set(self, key, expected, new):
+        """Записывает new, только если текущее значение равно expected (None — нет значения или удалить)"""
+
+    @abstractmethod
+    def purge(self):
+        """Удаляет истекшие значения и лишние сверх max_size; возвращает число удаленных"""
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+class MemoryStateStore(StateStore):
+    """Состояние в памяти процесса (одна реплика): TTL и вытеснение давно не использованных"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        # key -> (JSON значения, время истечения); порядок — от давно использованных к свежим
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _load(self, key, now):
+        item = self.items.get(key)
+        if item is None:
+            return None
+        if item[1] <= now:
+            del self.items[key]
+            return None
+        self.items.move_to_end(key)
+        return json.loads(item[0])
+
+    def _store(self, key, value, now):
+        if value is None:
+            self.items.pop(key, None)
+            return
+        # Сериализация здесь же: значения ведут себя так же, как в БД
+        self.items[key] = (json.dumps(value, ensure_ascii=False), now + self.ttl)
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self._load(str(key), time.monotonic())
+        return default if value is None else value
+
+    def set(self, key, value):
+        with self.lock:
+            self._store(str(key), value, time.monotonic())
+
+    def pop(self, key, default=None):
+        with self.lock:
+            value = self._load(str(key), time.monotonic())
+            self.items.pop(str(key), None)
+        return default if value is None else value
+
+    def compare_and_set(self, key, expected, new):
+        key = str(key)
+        with self.lock:
+            now = time.monotonic()
+            if self._load(key, now) != expected:
+                return False
+            self._store(key, new, now)
+            return True
+
+    def purge(self):
+        with self.lock:
+            now = time.monotonic()
+            expired = [key for key, (_, expires_at) in self.items.items() if expires_at <= now]
+            for key in expired:
+                del self.items[key]
+            return len(expired)
+
+class DatabaseStateStore(StateStore):
+    """Состояние в таблице conversation_state: общее для реплик и переживает перезапуск.
+
+    Одно сообщение проверяют фильтры нескольких обработчиков, поэтому чтения
+    кэшируются на cache_seconds; свои записи обновляют кэш сразу, а неудачный
+    compare_and_set его сбрасывает.
+    """
+
+    # Раз в столько записей удаляются истекшие строки
+    PURGE_EVERY = 200
+
+    def __init__(self, db_manager, namespace, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE, cache_seconds=2.0):
+        self.db_manager = db_manager
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_size = max_size
+        self.cache_seconds = cache_seconds
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.writes = 0
+
+    def _execute(self, query, params):
+        """Выполняет запрос в отдельной транзакции на соединении из пула; возвращает (первую строку, число строк)"""
+        with self.db_manager.call_scope('conversation_state'):
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            row = cursor.fetchone() if cursor.description else None
+            conn.commit()
+            return row, cursor.rowcount
+
+    def _remember(self, key, value):
+        with self.lock:
+            self.cache[key] = (value, time.monotonic())
+
+    def _forget(self, key):
+        with self.lock:
+            self.cache.pop(key, None)
+
+    def _written(self):
+        self.writes += 1
+        if self.writes % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def get(self, key, default=None):
+        key = str(key)
+        with self.lock:
+            cached = self.cache.get(key)
+        if cached and time.monotonic() - cached[1] < self.cache_seconds:
+            value = cached[0]
+        else:
+            try:
+                row, _ = self._execute('''
+                    SELECT value FROM conversation_state
+                    WHERE namespace = %s AND key = %s AND expires_at > CURRENT_TIMESTAMP
+                ''', (self.namespace, key))
+            except Exception as e:
+                logger.error(f"❌ Ошибка чтения состояния {self.namespace}: {e}")
+                return default
+            value = row[0] if row else None
+            self._remember(key, value)
+        return default if value is None else value
+
+    def set(self, key, value):
+        key = str(key)
+        if value is None:
+            self.pop(key)
+            return
+        self._execute('''
+            INSERT INTO conversation_state (namespace, key, value, expires_at, updated_at)
+            VALUES (%s, %s, %s::jsonb, CURRENT_TIMESTAMP + %s * INTERVAL '1 second', CURRENT_TIMESTAMP)
+            ON CONFLICT (namespace, key) DO UPDATE
+            SET value = EXCLUDED.value,
+                expires_at = EXCLUDED.expires_at,
+                updated_at = EXCLUDED.updated_at
+        ''', (self.namespace, key, json.dumps(value, ensure_ascii=False), self.ttl))
+        self._remember(key, value)
+        self._written()
+
+    def pop(self, key, default=None):
+        key = str(key)
+        try:
+            row, _ = self._execute('''
+                DELETE FROM conversation_state
+                WHERE namespace = %s AND key = %s
+                RETURNING value, expires_at > CURRENT_TIMESTAMP
+            ''', (self.namespace, key))
+        finally:
+            self._remember(key, None)
+        return row[0] if row and row[1] else default
+
+    def compare_and_set(self, key, expected, new):
+        key = str(key)
+        if expected is None and new is None:
+            return self.get(key) is None
+
+        encoded = json.dumps(new, ensure_ascii=False) if new is not None else None
+        if expected is None:
+            # Истекшая строка считается отсутствующей
+            query = '''
+                INSERT INTO conversation_state (namespace, key, value, expires_at, updated_at)
+                VALUES (%s, %s, %s::jsonb, CURRENT_TIMESTAMP + %s * INTERVAL '1 second', CURRENT_TIMESTAMP)
+                ON CONFLICT (namespace, key) DO UPDATE
+                SET value = EXCLUDED.value,
+                    expires_at = EXCLUDED.expires_at,
+                    updated_at = EXCLUDED.updated_at
+                WHERE conversation_state.expires_at <= CURRENT_TIMESTAMP
+            '''
+            params = (self.namespace, key, encoded, self.ttl)
+        elif new is None:
+            query = '''
+                DELETE FROM conversation_state
+                WHERE namespace = %s AND key = %s
+                  AND value = %s::jsonb AND expires_at > CURRENT_TIMESTAMP
+            '''
+            params = (self.namespace, key, json.dumps(expected, ensure_ascii=False))
+        else:
+            query = '''
+                UPDATE conversation_state
+                SET value = %s::jsonb,
+                    expires_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second',
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE namespace = %s AND key = %s
+                  AND value = %s::jsonb AND expires_at > CURRENT_TIMESTAMP
+            '''
+            params = (encoded, self.ttl, self.namespace, key, json.dumps(expected, ensure_ascii=False))
+
+        try:
+            swapped = self._execute(query, params)[1] == 1
+        except Exception as e:
+            logger.error(f"❌ Ошибка обновления состояния {self.namespace}: {e}")
+            swapped = False
+
+        if swapped:
+            self._remember(key, new)
+            self._written()
+        else:
+            # Значение изменила другая реплика или поток: следующее чтение идет в БД
+            self._forget(key)
+        return swapped
+
+    def purge(self):
+        try:
+            _, removed = self._execute(
+                'DELETE FROM conversation_state WHERE expires_at <= CURRENT_TIMESTAMP', ()
+            )
+            removed += self._execute('''
+                DELETE FROM conversation_state
+                WHERE namespace = %s AND key IN (
+                    SELECT key FROM conversation_state
+                    WHERE namespace = %s
+                    ORDER BY updated_at DESC
+                    OFFSET %s
+                )
+            ''', (self.namespace, self.namespace, self.max_size))[1]
+            return removed
+        except Exception as e:
+            logger.error(f"❌ Ошибка очистки состояния {self.namespace}: {e}")
+            return 0
+
+def create_state_store(backend, namespace, db_manager=None, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+    """Создает хранилище состояния: backend 'memory' или 'db'"""
+    if backend == 'db':
+        return DatabaseStateStore(db_manager, namespace, ttl=ttl, max_size=max_size)
+    if backend == 'memory':
+        return MemoryStateStore(ttl=ttl, max_size=max_size)
+    raise ValueError(f"неизвестный backend хранилища состояния: {backend}")
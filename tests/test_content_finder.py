@@ -0,0 +1,139 @@
+# tests/test_content_finder.py
+import os
+import time
+
+os.environ.pop('HTTP_CASSETTE_MODE', None)
+
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+
+import pytest
+
+from benchmarks.fakes import FakeDatabase, write_cassette
+from content_finder import ContentFinder
+from http_cassette import CassetteSession
+from sources import Source
+
+FEED_URL = 'https://feed.example/rss'
+
+def build_feed(entries, relevant_every=3):
+    """Лента от новых к старым; релевантна каждая relevant_every-я запись"""
+    now = datetime.now().astimezone()
+    items = []
+    for i in range(entries):
+        if i % relevant_every == 0:
+            title, text = f"Первое открытие #{i}", "Ученые сообщили о научном результате."
+        else:
+            title, text = f"Погода в городе #{i}", "Завтра ожидается дождь."
+        items.append(
+            f"<item><title>{title}</title><link>https://feed.example/{i}</link>"
+            f"<guid>feed-{i}</guid><pubDate>{format_datetime(now - timedelta(minutes=i))}</pubDate>"
+            f"<description>{text}</description></item>"
+        )
+    return ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>feed</title>'
+            + ''.join(items) + '</channel></rss>').encode('utf-8')
+
+@pytest.fixture
+def make_finder(tmp_path):
+    """ContentFinder над записанной лентой из 30 записей, каждая третья релевантна"""
+    write_cassette(str(tmp_path), FEED_URL, build_feed(30))
+    db = FakeDatabase()
+
+    def make():
+        return ContentFinder(
+            db_manager=db,
+            sources=[Source(name='feed', type='rss', url=FEED_URL, category='science', max_entries=30)],
+            session=CassetteSession('replay', str(tmp_path)),
+        )
+    return make, db
+
+def test_failed_save_is_retried_on_next_search(make_finder):
+    make, db = make_finder
+    finder = make()
+
+    def failing_save(content):
+        raise RuntimeError("insert failed")
+
+    assert finder.search_content(max_posts=3, force=True, save=failing_save) == []
+    # Курсор сдвинут, но несохраненное отложено, а не потеряно
+    assert db.cursors['feed'][0] == 'feed-0'
+    assert len(db.candidates) == 10
+
+    saved = finder.search_content(max_posts=3, force=True, save=lambda content: 1)
+    assert len(saved) == 3
+
+def test_cursor_not_moved_when_candidates_not_saved(make_finder):
+    make, db = make_finder
+    db.replace_content_candidates = lambda candidates: False
+
+    make().search_content(max_posts=3, force=True, save=lambda content: 1)
+    assert 'feed' not in db.cursors
+
+def test_ranked_out_entries_are_kept_for_next_search(make_finder):
+    make, db = make_finder
+    ids = iter(range(1, 100))
+    finder = make()
+
+    found = [finder.search_content(max_posts=3, force=True, save=lambda content: next(ids)) for _ in range(5)]
+
+    # 10 релевантных записей из 30: лента читается один раз, но до отбора доходят все
+    assert [len(batch) for batch in found] == [3, 3, 3, 1, 0]
+    titles = [content['title'] for batch in found for content in batch]
+    assert len(set(titles)) == 10
+    assert db.candidates == []
+
+def test_ranking_prefers_higher_score_across_searches(make_finder):
+    make, db = make_finder
+    finder = make()
+    first = finder.search_content(max_posts=3, force=True, save=lambda content: 1)
+    second = finder.search_content(max_posts=3, force=True, save=lambda content: 2)
+    assert min(c['score'] for c in first) >= max(c['score'] for c in second)
+
+def test_images_chosen_only_for_selected_posts(make_finder):
+    make, db = make_finder
+    finder = make()
+    chosen = []
+
+    class Library:
+        def choose(self, urls):
+            chosen.append(urls[0])
+            return urls[0]
+
+    finder.image_library = Library()
+    found = finder.search_content(max_posts=3, force=True, save=lambda content: 1)
+    assert len(chosen) == len(found) == 3
+    assert all(content['image_url'] for content in found)
+
+def feed_entries(count):
+    """Записи ленты от новых к старым: entry-0 самая новая"""
+    now = time.time()
+    return [{'id': f"entry-{i}", 'published_parsed': time.gmtime(now - 60 * (i + 1))} for i in range(count)]
+
+def test_entries_past_the_limit_are_picked_up_by_next_polls():
+    db = FakeDatabase()
+    finder = ContentFinder(db_manager=db, sources=[], session=CassetteSession('replay', '.'))
+    source = Source(name='busy', type='rss', url=FEED_URL, category='science', max_entries=10)
+    entries = feed_entries(30)
+    # Курсор на самой старой записи: за простой накопилось 29 новых
+    db.cursors['busy'] = ('entry-29', finder.get_entry_published(entries[29]))
+
+    polls = []
+    for _ in range(4):
+        source.new_entries = 0
+        polls.append([entry['id'] for entry in finder.iter_new_entries(source, iter(entries))])
+        finder.commit_cursors()
+
+    assert [len(poll) for poll in polls] == [10, 10, 9, 0]
+    # Сначала догоняются самые старые записи, ни одна не теряется
+    assert polls[0][-1] == 'entry-28'
+    assert sorted(sum(polls, []), key=lambda guid: int(guid.split('-')[1])) == [f"entry-{i}" for i in range(29)]
+    assert db.cursors['busy'][0] == 'entry-0'
+
+def test_first_poll_takes_newest_entries():
+    db = FakeDatabase()
+    finder = ContentFinder(db_manager=db, sources=[], session=CassetteSession('replay', '.'))
+    source = Source(name='busy', type='rss', url=FEED_URL, category='science', max_entries=10)
+
+    taken = [entry['id'] for entry in finder.iter_new_entries(source, iter(feed_entries(30)))]
+    assert taken == [f"entry-{i}" for i in range(10)]
+    assert finder.pending_cursors['busy'][0] == 'entry-0'
@@ -0,0 +1,34 @@
+# tests/test_cron.py
+from datetime import datetime
+
+import pytest
+
+from cron import CronSchedule
+
+def test_next_after_is_strictly_later():
+    schedule = CronSchedule('30 9 * * *')
+    assert schedule.next_after(datetime(2024, 3, 1, 9, 0)) == datetime(2024, 3, 1, 9, 30)
+    assert schedule.next_after(datetime(2024, 3, 1, 9, 30)) == datetime(2024, 3, 2, 9, 30)
+
+def test_steps_and_aliases():
+    assert CronSchedule('*/15 * * * *').next_after(datetime(2024, 3, 1, 10, 16)) == datetime(2024, 3, 1, 10, 30)
+    assert CronSchedule('@daily').next_after(datetime(2024, 12, 31, 23, 59)) == datetime(2025, 1, 1, 0, 0)
+
+def test_day_or_weekday_like_classic_cron():
+    # 1 марта 2024 — пятница; воскресенье 3 марта наступает раньше 15 числа
+    schedule = CronSchedule('0 12 15 * 0')
+    assert schedule.next_after(datetime(2024, 3, 1)) == datetime(2024, 3, 3, 12, 0)
+    assert CronSchedule('0 0 * * 7').next_after(datetime(2024, 3, 1)) == datetime(2024, 3, 3, 0, 0)
+
+def test_leap_day_and_month_rollover():
+    assert CronSchedule('0 0 29 2 *').next_after(datetime(2024, 3, 1)) == datetime(2028, 2, 29, 0, 0)
+
+def test_count_between_respects_limit():
+    schedule = CronSchedule('0 * * * *')
+    assert schedule.count_between(datetime(2024, 3, 1, 0, 0), datetime(2024, 3, 1, 5, 0), 10) == 5
+    assert schedule.count_between(datetime(2024, 3, 1, 0, 0), datetime(2024, 3, 1, 5, 0), 3) == 3
+
+@pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '0 0 31 2 *', '*/0 * * * *'])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
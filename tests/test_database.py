@@ -0,0 +1,120 @@
+# tests/test_database.py
+import threading
+
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR, TRANSACTION_STATUS_INTRANS
+
+import bot
+from metrics import DB_QUERY_ERRORS
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        self.conn.queries += 1
+        if self.conn.on_execute:
+            self.conn.on_execute()
+        if self.conn.broken:
+            self.conn.status = TRANSACTION_STATUS_INERROR
+            raise RuntimeError("syntax error")
+        self.conn.status = TRANSACTION_STATUS_INTRANS
+
+    def fetchone(self):
+        return (7,)
+
+class FakeConnection:
+    """Соединение psycopg2 без сервера: только статус транзакции"""
+
+    def __init__(self, on_execute=None):
+        self.closed = 0
+        self.status = TRANSACTION_STATUS_IDLE
+        self.queries = 0
+        self.rollbacks = 0
+        self.broken = False
+        self.on_execute = on_execute
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def commit(self):
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+class FakePool:
+    """ThreadedConnectionPool: выдает свободное соединение или открывает новое"""
+
+    def __init__(self, on_execute=None):
+        self.idle = []
+        self.opened = []
+        self.in_use = 0
+        self.max_in_use = 0
+        self.on_execute = on_execute
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        with self.lock:
+            if not self.idle:
+                self.idle.append(FakeConnection(self.on_execute))
+                self.opened.append(self.idle[-1])
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            return self.idle.pop()
+
+    def putconn(self, conn, close=False):
+        assert conn.get_transaction_status() == TRANSACTION_STATUS_IDLE
+        with self.lock:
+            self.in_use -= 1
+            self.idle.append(conn)
+
+@pytest.fixture
+def make_db(monkeypatch):
+    monkeypatch.setattr(bot, 'DATABASE_URL', 'postgresql://test')
+
+    def make(on_execute=None, pool_size=2):
+        db = bot.DatabaseManager(pool_size=pool_size)
+        db.pool = FakePool(on_execute)
+        db.schema_ready = True
+        return db
+    return make
+
+def errors(method):
+    return DB_QUERY_ERRORS.labels(method=method).value
+
+def test_connection_is_returned_after_call(make_db):
+    db = make_db()
+    assert db.get_max_content_id() == 7
+    # Чтение без commit не оставляет открытую транзакцию в пуле
+    conn, = db.pool.opened
+    assert db.pool.in_use == 0 and conn.rollbacks == 1
+
+def test_threads_do_not_share_a_connection(make_db):
+    # Оба потока должны одновременно держать свои соединения
+    barrier = threading.Barrier(2, timeout=5)
+    db = make_db(on_execute=barrier.wait)
+    threads = [threading.Thread(target=db.get_max_content_id) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert db.pool.max_in_use == 2
+    assert [conn.queries for conn in db.pool.opened] == [1, 1]
+
+def test_caught_query_error_is_counted_and_rolled_back(make_db):
+    db = make_db()
+    db.pool.getconn().broken = True
+    db.pool.putconn(db.pool.opened[0])
+    before = errors('get_max_content_id')
+    assert db.get_max_content_id() == 0
+    assert errors('get_max_content_id') == before + 1
+    assert db.pool.in_use == 0
+
+def test_connection_is_only_available_inside_methods(make_db):
+    with pytest.raises(RuntimeError):
+        make_db().get_connection()
@@ -0,0 +1,61 @@
+# tests/test_dedup.py
+import hashlib
+
+import psycopg2.extras
+
+from dedup import FingerprintSet, content_fingerprint, normalize_title
+from migrations import backfill_fingerprints
+
+def test_fingerprint_ignores_case_and_whitespace():
+    assert content_fingerprint("  Первый  Полет\tв КОСМОС ") == content_fingerprint("первый полет в космос")
+
+def test_fingerprint_normalizes_unicode_whitespace():
+    # Неразрывный и тонкий пробелы из лент не должны давать другой отпечаток
+    assert normalize_title("Первый\u00a0полет\u2009в космос") == "первый полет в космос"
+    assert content_fingerprint("Первый\u00a0полет") == content_fingerprint("Первый полет")
+
+def test_fingerprint_is_md5_of_normalized_title():
+    assert content_fingerprint("Ёлка") == hashlib.md5("ёлка".encode()).digest()
+    assert content_fingerprint(None) == content_fingerprint("")
+
+class BackfillCursor:
+    """Курсор с таблицей в памяти: отдает строки запроса SELECT id, title"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = []
+
+    def execute(self, query, params):
+        last_id, limit = params
+        self.result = [row for row in self.rows if row[0] > last_id][:limit]
+
+    def fetchall(self):
+        return self.result
+
+def test_backfill_uses_python_fingerprint(monkeypatch):
+    updates = []
+    monkeypatch.setattr(psycopg2.extras, 'execute_values',
+                        lambda cursor, query, values: updates.extend(values))
+    rows = [(1, "Первый полет"), (2, "ЛАЗЕР"), (5, None)]
+    assert backfill_fingerprints(BackfillCursor(rows), 'found_content', batch_size=2) == 3
+    assert updates == [(row_id, content_fingerprint(title)) for row_id, title in rows]
+    assert updates[0][1] == content_fingerprint("первый полет")
+
+def test_fingerprint_set_membership_after_load_and_add():
+    fingerprints = [content_fingerprint(f"Заголовок {number}") for number in range(100)]
+    hashes = FingerprintSet().load(reversed(fingerprints))
+    assert all(fingerprint in hashes for fingerprint in fingerprints)
+    assert content_fingerprint("Новый") not in hashes
+
+    hashes.add(content_fingerprint("Новый"))
+    hashes.add(content_fingerprint("Новый"))
+    assert content_fingerprint("Новый") in hashes
+    assert len(hashes) == 101
+
+def test_fingerprint_set_merges_pending_keys():
+    hashes = FingerprintSet()
+    fingerprints = [content_fingerprint(str(number)) for number in range(FingerprintSet.MERGE_THRESHOLD + 5)]
+    for fingerprint in fingerprints:
+        hashes.add(fingerprint)
+    assert len(hashes._pending) == 5
+    assert all(fingerprint in hashes for fingerprint in fingerprints)
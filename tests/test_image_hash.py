@@ -0,0 +1,89 @@
+# tests/test_image_hash.py
+import io
+import itertools
+
+import pytest
+
+PIL = pytest.importorskip('PIL.Image')
+
+from image_hash import ImageHashIndex, ImageLibrary, dhash, from_signed, hamming, to_signed
+
+def gradient(width=120, height=90, shift=0):
+    """Детерминированная картинка с горизонтальным и вертикальным градиентом"""
+    image = PIL.new('RGB', (width, height))
+    image.putdata([
+        ((x * 7 + y * 3 + shift) % 256, (x * y) % 256, (y * 5) % 256)
+        for y in range(height) for x in range(width)
+    ])
+    return image
+
+def encode(image, fmt='PNG', **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+class FakeImageDatabase:
+    def __init__(self):
+        self.uses = []
+
+    def get_images(self):
+        return []
+
+    def get_image_urls(self):
+        return {}
+
+    def save_image_url(self, url, phash):
+        pass
+
+    def record_image_use(self, phash, url, file_id, used_at):
+        self.uses.append((url, file_id))
+
+def make_library(images):
+    ticks = itertools.count()
+    return ImageLibrary(FakeImageDatabase(), images.get, lambda: next(ticks))
+
+def test_dhash_survives_recompression_and_resize():
+    original = dhash(encode(gradient()))
+    recompressed = dhash(encode(gradient().resize((240, 180)), 'JPEG', quality=60))
+    rotated = dhash(encode(gradient().rotate(90)))
+    assert hamming(original, recompressed) <= 6
+    assert hamming(original, rotated) > 6
+
+def test_dhash_of_garbage_is_none():
+    assert dhash(b'not an image') is None
+
+def test_signed_roundtrip():
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        assert -(1 << 63) <= to_signed(value) < 1 << 63
+        assert from_signed(to_signed(value)) == value
+
+def test_index_finds_every_hash_within_seven_bits():
+    index = ImageHashIndex()
+    base = 0x0123456789ABCDEF
+    index.add(base)
+    # Биты в разных полосах: совпадает хотя бы одна полоса из восьми
+    near = base ^ sum(1 << (band * 8) for band in range(7))
+    assert index.find(near, max_distance=7) == base
+    assert index.find(near, max_distance=6) is None
+    assert index.find(base ^ 0xFF) is None
+
+def test_identical_image_under_new_url_is_sent_by_file_id():
+    library = make_library({
+        'a': encode(gradient()),
+        'b': encode(gradient().resize((200, 150)), 'JPEG', quality=70),
+    })
+    media, phash = library.prepare('a')
+    assert isinstance(media, bytes)
+    library.remember([phash], ['FILE_A'], ['a'])
+
+    assert library.prepare('b') == ('FILE_A', phash)
+    assert library.prepare('a') == ('FILE_A', phash)
+
+def test_choose_rotates_and_keeps_marks_after_download():
+    library = make_library({'a': encode(gradient()), 'b': encode(gradient(shift=128))})
+    first = library.choose(['a', 'b'])
+    # Скачивание переводит URL на ключ-хеш; отметка выбора не должна потеряться
+    library.prepare(first)
+    second = library.choose(['a', 'b'])
+    assert second != first
+    assert library.choose(['a', 'b']) == first
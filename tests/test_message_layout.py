@@ -0,0 +1,42 @@
+# tests/test_message_layout.py
+from message_layout import CAPTION_LIMIT, MESSAGE_LIMIT, layout_post, split_head, split_message, utf16_len
+
+def test_utf16_len_counts_astral_symbols_twice():
+    assert utf16_len("абв") == 3
+    assert utf16_len("🚀") == 2
+
+def test_short_post_fits_caption():
+    assert layout_post("Короткий пост", with_media=True) == ("Короткий пост", [])
+
+def test_text_without_media_has_no_caption():
+    assert layout_post("Текст") == (None, ["Текст"])
+    assert layout_post("", with_media=True) == (None, [])
+
+def test_early_paragraph_break_does_not_leave_caption_empty():
+    body = "Предложение о научном открытии. " * 170
+    caption, rest = layout_post("Заголовок\n\n" + body, with_media=True)
+    assert CAPTION_LIMIT // 2 <= utf16_len(caption) <= CAPTION_LIMIT
+    assert caption.startswith("Заголовок")
+    # Хвост уходит минимальным числом сообщений
+    assert len(rest) == 2
+    assert all(utf16_len(part) <= MESSAGE_LIMIT for part in rest)
+
+def test_split_prefers_paragraph_when_it_fills_enough():
+    paragraph = "слово " * 100
+    text = paragraph.strip() + "\n\n" + paragraph.strip()
+    head, rest = split_head(text, 700)
+    assert head == paragraph.strip()
+    assert rest == paragraph.strip()
+
+def test_split_falls_back_to_words_and_then_hard_cut():
+    head, rest = split_head("один два три четыре", 9)
+    assert (head, rest) == ("один два", "три четыре")
+    parts = split_message("😀" * 5000)
+    assert all(utf16_len(part) <= MESSAGE_LIMIT for part in parts)
+    assert "".join(parts) == "😀" * 5000
+
+def test_split_keeps_all_words():
+    text = " ".join(f"слово{i}" for i in range(3000))
+    parts = split_message(text, limit=500)
+    assert " ".join(parts).split() == text.split()
+    assert all(utf16_len(part) <= 500 for part in parts)
@@ -0,0 +1,63 @@
+# tests/test_metrics.py
+from contextlib import contextmanager
+
+import pytest
+
+from metrics import Counter, Gauge, Histogram, Metric, Registry, instrument_methods, DB_QUERY_SECONDS
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        Metric('x', 'x')
+
+def test_counter_and_gauge_render_with_labels():
+    registry = Registry()
+    requests = registry.register(Counter('requests_total', 'Запросы', ['method']))
+    depth = registry.register(Gauge('queue_depth', 'Очередь', ['queue']))
+    requests.inc(method='get')
+    requests.inc(2, method='get')
+    depth.set(5, queue='publish')
+    text = registry.render()
+    assert 'requests_total{method="get"} 3' in text
+    assert 'queue_depth{queue="publish"} 5' in text
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('latency_seconds', 'Задержка', buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'latency_seconds_count 3' in lines
+
+def test_instrument_methods_times_public_methods():
+    class Store:
+        def load(self):
+            return 42
+
+        def _private(self):
+            return 1
+
+    instrument_methods(Store)
+    assert Store().load() == 42
+    assert DB_QUERY_SECONDS.labels(method='load').count == 1
+    assert not hasattr(Store._private, '__wrapped__')
+
+def test_instrument_methods_wraps_calls_in_scope():
+    calls = []
+
+    @contextmanager
+    def scope(store, method):
+        calls.append(('enter', method))
+        try:
+            yield
+        finally:
+            calls.append(('exit', method))
+
+    class Store:
+        def save(self):
+            calls.append(('call', 'save'))
+
+    instrument_methods(Store, scope=scope)
+    Store().save()
+    assert calls == [('enter', 'save'), ('call', 'save'), ('exit', 'save')]
@@ -0,0 +1,54 @@
+# tests/test_moderation.py
+import pytest
+
+import bot
+from benchmarks.fakes import FakeBot, FakeDatabase, FakeMessage
+from state_store import MemoryStateStore
+
+CHAT = 7
+
+class ModerationDatabase(FakeDatabase):
+    def __init__(self, pending):
+        super().__init__()
+        self.pending = pending
+
+    def get_pending_content(self, limit, offset=0):
+        return self.pending[offset:offset + limit], len(self.pending)
+
+    def get_pending_content_ids(self):
+        return [item[0] for item in self.pending]
+
+class Call:
+    def __init__(self, data):
+        self.id = data
+        self.data = data
+        self.message = FakeMessage(1, CHAT)
+
+@pytest.fixture
+def moderation(monkeypatch):
+    store = MemoryStateStore()
+    monkeypatch.setattr(bot, 'bot', FakeBot())
+    monkeypatch.setattr(bot, 'db', ModerationDatabase([(i, f"Пост {i}", 'science') for i in range(1, 16)]))
+    monkeypatch.setattr(bot, 'moderation_sessions', store)
+    return store
+
+def test_session_lives_in_state_store(moderation):
+    bot.send_moderation_page(CHAT, bot.new_moderation_session())
+    bot.handle_moderation_callback(Call('mod_t_3'))
+    bot.handle_moderation_callback(Call('mod_t_5'))
+    bot.handle_moderation_callback(Call('mod_t_3'))
+    bot.handle_moderation_callback(Call('mod_p_1'))
+
+    session = moderation.get(CHAT)
+    assert session['selected'] == [5]
+    assert session['page'] == 1
+    assert [item[0] for item in session['items']] == list(range(11, 16))
+
+    bot.handle_moderation_callback(Call('mod_all'))
+    assert moderation.get(CHAT)['selected'] == list(range(1, 16))
+
+def test_expired_session_asks_to_restart(moderation):
+    answers = []
+    bot.bot.answer_callback_query = lambda call_id, text=None, **kwargs: answers.append(text)
+    bot.handle_moderation_callback(Call('mod_t_1'))
+    assert answers == ["⌛ Список устарел, повторите /moderate"]
@@ -0,0 +1,41 @@
+# tests/test_post_schedule.py
+import json
+from datetime import datetime
+
+from post_schedule import MAX_ALBUM_SIZE, next_occurrence, parse_schedule_document
+
+NOW = datetime(2024, 3, 1, 12, 0)
+
+def test_next_occurrence_skips_missed_repeats():
+    assert next_occurrence(datetime(2024, 2, 28, 9, 0), 'daily', NOW) == datetime(2024, 3, 2, 9, 0)
+    assert next_occurrence(datetime(2024, 3, 5, 9, 0), 'weekly', NOW) == datetime(2024, 3, 5, 9, 0)
+
+def test_csv_import():
+    data = "text,time,repeat,images\nПривет,2024-03-02 10:00,,\nКаждый день,2024-02-01 08:00,daily,https://a/1.jpg\n"
+    posts, errors = parse_schedule_document(data.encode(), 'plan.csv', NOW)
+    assert errors == []
+    assert posts == [
+        ("Привет", datetime(2024, 3, 2, 10, 0), None, []),
+        ("Каждый день", datetime(2024, 3, 2, 8, 0), 'daily', ['https://a/1.jpg']),
+    ]
+
+def test_errors_name_the_row():
+    rows = [
+        {'text': 'В прошлом', 'time': '2024-02-01 10:00'},
+        {'text': 'Время', 'time': 'завтра'},
+        {'text': '', 'time': '2024-03-02 10:00'},
+        {'text': 'Много фото', 'time': '2024-03-02 10:00', 'images': ['https://a/x.jpg'] * (MAX_ALBUM_SIZE + 1)},
+    ]
+    posts, errors = parse_schedule_document(json.dumps(rows).encode(), 'plan.json', NOW)
+    assert [error.split(':')[0] for error in errors] == ['1', '2', '3', '4']
+
+def test_missing_csv_columns():
+    posts, errors = parse_schedule_document(b"text\nhello\n", 'plan.csv', NOW)
+    assert posts == []
+    assert errors == ["в CSV нет колонок: time"]
+
+def test_post_length_counts_utf16():
+    rows = [{'text': '🚀' * 2049, 'time': '2024-03-02 10:00'}]
+    posts, errors = parse_schedule_document(json.dumps(rows).encode(), 'plan.json', NOW)
+    assert posts == []
+    assert len(errors) == 1
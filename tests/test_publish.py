@@ -0,0 +1,50 @@
+# tests/test_publish.py
+import pytest
+
+import bot
+from benchmarks.fakes import FakeBot, FakeDatabase
+from fanout import FanoutPublisher
+
+CHANNEL = '-1001'
+ADMIN = '42'
+
+class BrokenChannelBot(FakeBot):
+    """Отправка в канал всегда падает, сообщения администратору проходят"""
+
+    def __init__(self):
+        super().__init__()
+        self.admin_messages = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        if str(chat_id) == ADMIN:
+            self.admin_messages.append(text)
+            return self._call('sendMessage', chat_id)
+        raise RuntimeError("chat not found")
+
+@pytest.fixture
+def broken(monkeypatch):
+    fake_bot = BrokenChannelBot()
+    fake_db = FakeDatabase(pending_posts=1)
+    monkeypatch.setattr(bot, 'bot', fake_bot)
+    monkeypatch.setattr(bot, 'db', fake_db)
+    monkeypatch.setattr(bot, 'fanout', FanoutPublisher(global_rate=0, channel_rate=0))
+    monkeypatch.setattr(bot, 'CHANNEL_ID', CHANNEL)
+    monkeypatch.setattr(bot, 'ADMIN_ID', ADMIN)
+    return fake_bot, fake_db
+
+def test_gave_up_is_not_delivered(broken):
+    fake_bot, fake_db = broken
+    outcomes = [bot.publish_to_channels('manual:1:1', "Текст") for _ in range(bot.MAX_DELIVERY_ATTEMPTS + 1)]
+    assert outcomes[:-2] == [bot.PUBLISH_RETRY] * (bot.MAX_DELIVERY_ATTEMPTS - 1)
+    # Попытки исчерпаны: пост не считается доставленным ни сейчас, ни при повторном вызове
+    assert outcomes[-2:] == [bot.PUBLISH_GAVE_UP] * 2
+    assert len(fake_bot.admin_messages) == 1
+    assert CHANNEL in fake_bot.admin_messages[0]
+
+def test_scheduled_post_that_reached_no_channel_is_not_published(broken):
+    fake_bot, fake_db = broken
+    for _ in range(bot.MAX_DELIVERY_ATTEMPTS):
+        bot.publish_scheduled_posts()
+    assert fake_db.published == set()
+    assert fake_db.failed == {1}
+    assert fake_db.get_pending_posts() == []
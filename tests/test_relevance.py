@@ -0,0 +1,28 @@
+# tests/test_relevance.py
+from relevance import RelevanceScorer, stem
+
+def test_word_forms_match_one_keyword():
+    assert stem("открытие") == stem("открытия")
+    assert stem("ёлка") == stem("елка")
+    scorer = RelevanceScorer({'открытие': 1.0})
+    assert scorer.matches("Открытию и открытиями") == {stem("открытие")}
+
+def test_title_matches_weigh_more():
+    scorer = RelevanceScorer({'открытие': 1.0}, title_weight=2.0)
+    assert scorer.score("Открытие года") == 2.0
+    assert scorer.score("Новости", "Важное открытие") == 1.0
+    # Совпадение и в заголовке, и в тексте засчитывается один раз
+    assert scorer.score("Открытие", "открытия") == 2.0
+
+def test_weather_is_not_relevant():
+    scorer = RelevanceScorer()
+    assert not scorer.is_relevant("Погода на выходные", "Ожидается дождь")
+    assert scorer.is_relevant("Первый полет человека в космос")
+
+def test_keyword_must_start_a_word():
+    scorer = RelevanceScorer({'рекорд': 1.0})
+    assert scorer.matches("перерекордил") == set()
+    assert scorer.matches("рекордный результат") == {stem('рекорд')}
+
+def test_empty_keywords_score_zero():
+    assert RelevanceScorer({}).score("Открытие") == 0
@@ -0,0 +1,56 @@
+# tests/test_sources.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import sources
+from sources import Source
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(sources.time, 'monotonic', fake)
+    return fake
+
+def fail(source, now):
+    source.record_failure(1.0, RuntimeError("timeout"))
+    source.schedule_next(now)
+
+def test_failures_back_off_the_interval(clock):
+    source = Source(name='dead', type='rss', url='https://dead.example', category='science',
+                    interval_minutes=60, max_interval_minutes=240, failure_threshold=100)
+    now = datetime(2024, 3, 1, 12, 0)
+    delays = []
+    for _ in range(5):
+        fail(source, now)
+        delays.append(source.seconds_until_due(now) / 60)
+    assert delays == [90, 135, 202.5, 240, 240]
+
+    source.record_success(1.0, new_entries=1)
+    assert source.interval == 180 * 60
+
+def test_next_run_waits_for_open_breaker(clock):
+    source = Source(name='dead', type='rss', url='https://dead.example', category='science',
+                    interval_minutes=10, max_interval_minutes=20, failure_threshold=1,
+                    cooldown_minutes=60)
+    now = datetime(2024, 3, 1, 12, 0)
+    fail(source, now)
+    fail(source, now)
+    # Пауза предохранителя (120 мин) длиннее интервала (20 мин)
+    assert source.next_run == now + timedelta(minutes=120)
+    assert source.seconds_until_due(now) == 120 * 60
+
+def test_due_time_takes_the_later_of_schedule_and_breaker(clock):
+    source = Source(name='feed', type='rss', url='https://feed.example', category='science',
+                    failure_threshold=1, cooldown_minutes=15)
+    now = datetime(2024, 3, 1, 12, 0)
+    source.record_failure(1.0, RuntimeError("timeout"))
+    source.next_run = now + timedelta(hours=2)
+    assert source.seconds_until_due(now) == 2 * 3600
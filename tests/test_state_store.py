@@ -0,0 +1,116 @@
+# tests/test_state_store.py
+from contextlib import contextmanager
+
+import pytest
+
+import state_store
+from state_store import DatabaseStateStore, MemoryStateStore, StateStore, create_state_store
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(state_store.time, 'monotonic', fake)
+    return fake
+
+class ScopedCursor:
+    def __init__(self, manager):
+        self.manager = manager
+        self.description = None
+        self.rowcount = 0
+
+    def execute(self, query, params):
+        self.description = [('value',)] if 'SELECT' in query or 'RETURNING' in query else None
+        self.rowcount = 1
+
+    def fetchone(self):
+        # Результат читается, пока соединение еще у вызова
+        assert self.manager.scopes
+        return (['тест'], True)
+
+class ScopedManager:
+    """DatabaseManager, выдающий соединение только внутри call_scope"""
+
+    def __init__(self):
+        self.scopes = []
+        self.commits = 0
+
+    @contextmanager
+    def call_scope(self, method):
+        self.scopes.append(method)
+        try:
+            yield
+        finally:
+            self.scopes.pop()
+
+    def get_connection(self):
+        assert self.scopes
+        return self
+
+    def cursor(self):
+        return ScopedCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+def test_database_store_queries_inside_call_scope():
+    manager = ScopedManager()
+    store = DatabaseStateStore(manager, 'search', cache_seconds=0)
+    assert store.get(1) == ['тест']
+    assert store.compare_and_set(1, ['тест'], ['новый'])
+    assert store.pop(1) == ['тест']
+    assert manager.commits == 3 and not manager.scopes
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        StateStore()
+
+def test_values_are_copied_through_json(clock):
+    store = MemoryStateStore()
+    value = {'state': 'waiting_schedule_time', 'media': ['a']}
+    store[1] = value
+    value['media'].append('b')
+    assert store[1] == {'state': 'waiting_schedule_time', 'media': ['a']}
+    assert 1 in store and '1' in store
+    with pytest.raises(KeyError):
+        store[2]
+
+def test_compare_and_set(clock):
+    store = MemoryStateStore()
+    assert store.compare_and_set(1, None, 'waiting_schedule_text')
+    assert not store.compare_and_set(1, None, 'other')
+    assert not store.compare_and_set(1, 'other', {'state': 'x'})
+    assert store.compare_and_set(1, 'waiting_schedule_text', {'state': 'x'})
+    assert store.compare_and_set(1, {'state': 'x'}, None)
+    assert store.get(1) is None
+
+def test_ttl_and_purge(clock):
+    store = MemoryStateStore(ttl=10)
+    store[1] = 'a'
+    store[2] = 'b'
+    clock.now += 5
+    assert store.get(1) == 'a'
+    clock.now += 6
+    assert store.get(1) is None
+    assert store.purge() == 1
+    assert store.pop(2, 'gone') == 'gone'
+
+def test_max_size_evicts_least_recently_used(clock):
+    store = MemoryStateStore(max_size=2)
+    store[1] = 'a'
+    store[2] = 'b'
+    store.get(1)
+    store[3] = 'c'
+    assert store.get(2) is None
+    assert store.get(1) == 'a' and store.get(3) == 'c'
+
+def test_unknown_backend():
+    assert isinstance(create_state_store('memory', 'test'), MemoryStateStore)
+    with pytest.raises(ValueError):
+        create_state_store('redis', 'test')